@@ -0,0 +1,98 @@
+# Module: aiodb
+# Purpose: Async access to the SQLite catalogue for the ASGI server (asgi.py)
+# Features:
+#   - Coroutines over db.py: each call runs on a small, fixed pool of database threads
+#     (each keeps its pooled connection, see db.get_connection), so a slow query or a
+#     locked database holds one of those threads, never the event loop or a thread per
+#     client connection; excess calls wait as futures, not threads
+#   - run() sends any other blocking call (job table reads, file writes) to the same
+#     pool; the caller's context variables go with it, so SQL time is still attributed
+#     to the request in metrics.py
+#   - Pool created on first use and re-created after fork (one per worker process)
+# Data structures:
+#   - concurrent.futures.ThreadPoolExecutor; int owning pid
+
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import db
+
+# Threads (and SQLite connections) per process. SQLite serialises writers and WAL
+# readers scale with cores, so more threads than this only queue inside SQLite.
+DB_THREADS = int(os.environ.get("NURSERYMATE_DB_THREADS", "4"))
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(max_workers=DB_THREADS, thread_name_prefix="aiodb")
+            _executor_pid = os.getpid()
+        return _executor
+
+
+# Function: run
+# Purpose: Await a blocking call on the database threads
+# Inputs: function and its arguments
+# Returns: the function's result (exceptions are re-raised in the caller)
+
+
+async def run(function, *args, **kwargs):
+    call = functools.partial(contextvars.copy_context().run, function, *args, **kwargs)
+    return await asyncio.get_running_loop().run_in_executor(_get_executor(), call)
+
+
+async def fetch_plant(plant_id):
+    return await run(db.fetch_plant, plant_id)
+
+
+async def fetch_similar_plants(plant_id, limit):
+    return await run(db.fetch_similar_plants, plant_id, limit)
+
+
+async def fetch_plants():
+    return await run(db.fetch_plants)
+
+
+async def catalogue_state():
+    return await run(db.catalogue_state)
+
+
+# Function: fetchall / fetchone
+# Purpose: Ad-hoc read queries on the pooled connection (parameterised SQL only)
+# Returns: list[dict] / dict | None
+
+
+async def fetchall(sql, params=()):
+    return await run(_fetchall, sql, params)
+
+
+async def fetchone(sql, params=()):
+    rows = await run(_fetchall, sql, params, 1)
+    return rows[0] if rows else None
+
+
+def _fetchall(sql, params, limit=None):
+    cursor = db.get_connection().execute(sql, params)
+    rows = cursor.fetchall() if limit is None else cursor.fetchmany(limit)
+    return [dict(row) for row in rows]
+
+
+# Function: shutdown
+# Purpose: Stop the database threads (server shutdown); queued calls finish first
+
+
+def shutdown():
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
@@ -5,6 +5,8 @@
 #   - Plant data management (add/remove, view, query)
 #   - Plant recommendations (through filtering)
 #   - PDF plant care summary generation
+#   - Streaming CSV/JSON lines export of the catalogue and of survey results
+#     (/export/..., or python export_plants.py)
 # Data:
 #   - SQLite database 'plants.db'
 #   - Table: plants(
@@ -15,20 +17,77 @@
 #       image_url TEXT, soil_type TEXT
 #     )
 # Structure:
-#   - Flask app with route functions
+#   - Flask app with route functions (WSGI: python app.py, or any WSGI server via the
+#     factory, e.g. gunicorn "app:create_app()")
+#   - create_app: per-process setup (config overrides, schema migration, warm-up steps)
+#   - asgi.py: async serving mode over the same app (hot routes as coroutines)
+#   - Heavy libraries (ReportLab, Pillow) are imported on first use, not at import
+#   - Page CSS/JS live in assets/ and are served as hashed, precompressed bundles
+#     (build_assets.py; templates use asset_url)
 #   - Functions for DB access/validation
 #   - Data structures: dict (records/form/session), list (collections), BytesIO (PDF)
 
-from flask import Flask, render_template, request, redirect, url_for, session, flash, send_file
+import time
+
+_import_started = time.perf_counter()  # Data type: float (start of this module's import, for startup_report)
+
+from flask import Flask, render_template, request, redirect, url_for, session, flash, send_file, jsonify, make_response
+from flask import get_flashed_messages, stream_template, before_render_template, template_rendered, send_from_directory
+import json
+import mimetypes
 import sqlite3
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+import csv
+import db
 from werkzeug.utils import secure_filename
 import os
-from reportlab.lib.styles import getSampleStyleSheet
 import io
+import images
+import summaries
+import search
+import result_cache
+import http_cache
+import build_assets
+import import_plants
+import export_plants
+import jobs
+import metrics
+from recommend import MATCH_THRESHOLD, SURVEY_OPTIONS, get_index, invalidate_index
+from query_builder import query_survey
 
 app = Flask(__name__)
 app.secret_key = 'your_secret_key_here'  # Data type: str (used by Flask session signing)
+app.config["MATCH_THRESHOLD"] = MATCH_THRESHOLD  # Data type: float (minimum match ratio shown on /results)
+app.config["RESULTS_TOP_K"] = None  # Data type: int | None (cap on results shown, None = all)
+app.config["RECOMMENDATION_BACKEND"] = "index"  # Data type: str ("index" = in-memory NumPy index, "sql" = indexed SQLite query)
+app.config["RECOMMENDATION_BATCH_LIMIT"] = 10000  # Data type: int (max site profiles per API request)
+app.config["SEARCH_MAX_RESULTS"] = 50  # Data type: int (cap on /search results per request)
+app.config["CHANGE_FEED_CHUNK_LINES"] = 500  # Data type: int (JSON lines per chunk streamed by /api/changes)
+app.config["EXPORT_GZIP"] = True  # Data type: bool (gzip /export downloads on the fly for clients that accept it)
+app.config["SIMILAR_PLANTS_SHOWN"] = 4  # Data type: int (substitutes listed on /plant/<id>, up to similar.SIMILAR_COUNT)
+app.config["DASHBOARD_PAGE_SIZE"] = 200  # Data type: int (plants listed per dashboard page)
+app.config["BATCH_MAX_IDS"] = 10000  # Data type: int (max plants per batch remove/edit)
+app.config["JOB_WORKERS"] = 2  # Data type: int (background job threads per process, see jobs.py)
+app.config["RESULT_CACHE_BACKEND"] = "memory"  # Data type: str | None ("memory", "sqlite" = shared by all workers, None = off)
+app.config["RESULT_CACHE_PATH"] = "result_cache.db"  # Data type: str (file used by the "sqlite" backend)
+app.config["RESULT_CACHE_MAX_ENTRIES"] = 256  # Data type: int (cached survey results kept, LRU)
+app.config["RESULT_CACHE_TTL"] = 600  # Data type: int (seconds a cached results page stays valid)
+# Data type: dict endpoint -> Cache-Control value (responses also carry ETag/Last-Modified, so
+# "no-cache" means "store, but revalidate" and repeat visits cost a 304)
+app.config["CACHE_CONTROL"] = {
+    "results": "public, no-cache",
+    "plant_details": "public, max-age=60",
+    "generate_summary": "public, max-age=300",
+    "catalogue_changes": "no-cache",
+    "export": "no-cache",
+}
+app.config["STATIC_IMMUTABLE_MAX_AGE"] = 31536000  # Data type: int (seconds; fingerprinted static URLs)
+app.config["METRICS_ENABLED"] = True  # Data type: bool (serve Prometheus metrics on /metrics)
+app.config["SERVER_TIMING"] = False  # Data type: bool (add a Server-Timing header: sql/match/render/pdf durations)
+app.config["ASYNC_WORKER_THREADS"] = 16  # Data type: int (asgi.py: threads for sync views, matching and rendering)
+app.config["ASYNC_JOB_WAIT_MAX"] = 30  # Data type: int (asgi.py: seconds /jobs/<id>?wait= may hold a request open)
+# Data type: tuple[str] (steps create_app runs once per process, in order; see warm_up_step)
+app.config["WARM_UP"] = ("assets", "schema", "index", "search", "templates", "result_cache")
+app.config["WARM_UP_SURVEYS"] = []  # Data type: list[str] (/results query strings rendered into the result cache at startup)
 
 # Admin credentials (in a real app, use hashed passwords and secure storage), stored as plain strings here for simplicity
 valid_username = "admin"
@@ -39,38 +98,33 @@ valid_password = "password123"
 # Purpose: Retrieve all plants from the database
 # Returns: list[dict] -> each dict is a plant record for easy template rendering
 # Control structures:
-#   - Sequence: connect → query → fetch → close
-#   - Iteration: build list of dicts from fetched rows
+#   - Sequence: pooled connection → query → map rows (see db.py)
 # Data structures/types:
-#   - SQLite rows (tuple) → converted to dict
+#   - sqlite3.Row → converted to dict
 #   - list (collection of plant dicts), dict (field -> value)
 
 
 def get_all_plants():
-    conn = sqlite3.connect('plants.db')
-    c = conn.cursor()
-    c.execute("SELECT id, scientific_name, common_name, flowering_time, height, ecological_function, sunlight, water_level, salt_wind_tolerance, type, planting_space, image_url, soil_type FROM plants")
-    plants = c.fetchall()
-    conn.close()
-    
-    plant_list = []
-    for p in plants:  # Iteration over query results
-        plant_list.append({
-            "id": p[0],
-            "scientific_name": p[1],
-            "common_name": p[2],
-            "flowering_time": p[3],
-            "height": p[4],
-            "ecological_function": p[5],
-            "sunlight": p[6],
-            "water_level": p[7],
-            "salt_wind_tolerance": p[8],
-            "type": p[9],
-            "planting_space": p[10],
-            "image_url": p[11],
-            "soil_type": p[12]
-        })
-    return plant_list
+    return db.fetch_plants()
+
+
+# Function: parse_height
+# Purpose: Validate a height entered in the dashboard (add or bulk edit) and format it for storage
+# Inputs: height (str, metres)
+# Returns: str with "m" appended (e.g. "1.5m")
+# Control structures:
+#   - Selection: not a number → ValueError; outside 0–100 (or NaN) → ValueError
+
+
+def parse_height(height):
+    try:
+        height_value = float(height)
+    except (ValueError, TypeError):
+        raise ValueError("Height must be a valid number.")
+    if not 0 <= height_value <= 100:
+        raise ValueError("Height must be between 0 and 100 meters.")
+    # Store as TEXT with unit suffix for consistent display
+    return f"{height_value}m"
 
 
 # Function: add_plant
@@ -78,10 +132,10 @@ def get_all_plants():
 # Inputs: all fields as str; height validated as numeric (float) then stored with unit suffix
 # Returns: None
 # Control structures:
-#   - Selection: existence checks; range checks; error handling via exceptions
+#   - Selection: existence checks; range checks; duplicate scientific name; error handling via exceptions
 # Data types/structures:
 #   - float(height) for validation (range 0–100), then str with "m" appended for storage
-#   - SQLite parameterized INSERT (so values aren't concatenated directly into SQL, rather taken as inputs)
+#   - dict plant record → SQLite parameterized INSERT (so values aren't concatenated directly into SQL, rather taken as inputs)
 
 
 def add_plant(scientific_name, common_name, flowering_time, height, ecological_function, sunlight, water_level, salt_wind_tolerance, type_, planting_space, image_url, soil_type):
@@ -90,24 +144,26 @@ def add_plant(scientific_name, common_name, flowering_time, height, ecological_f
         raise ValueError("All fields must be provided.")
     
     # Selection: numeric validation and range checking
-    try:
-        height_value = float(height)
-        if height_value < 0 or height_value > 100:
-            raise ValueError("Height must be between 0 and 100 meters.")
-    except (ValueError, TypeError):
-        raise ValueError("Height must be a valid number.")
-
-    # Store as TEXT with unit suffix for consistent display
-    height_str = f"{height_value}m"
+    height_str = parse_height(height)
 
-    conn = sqlite3.connect('plants.db')
-    c = conn.cursor()
-    c.execute(
-        "INSERT INTO plants (scientific_name, common_name, flowering_time, height, ecological_function, sunlight, water_level, salt_wind_tolerance, type, planting_space, image_url, soil_type) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-        (scientific_name, common_name, flowering_time, height_str, ecological_function, sunlight, water_level, salt_wind_tolerance, type_, planting_space, image_url, soil_type)
-    )
-    conn.commit()
-    conn.close()
+    try:
+        db.insert_plant({
+            "scientific_name": scientific_name,
+            "common_name": common_name,
+            "flowering_time": flowering_time,
+            "height": height_str,
+            "ecological_function": ecological_function,
+            "sunlight": sunlight,
+            "water_level": water_level,
+            "salt_wind_tolerance": salt_wind_tolerance,
+            "type": type_,
+            "planting_space": planting_space,
+            "image_url": image_url,
+            "soil_type": soil_type
+        })
+    except sqlite3.IntegrityError:  # Selection: scientific_name is unique
+        raise ValueError(f"A plant named '{scientific_name}' already exists.")
+    invalidate_index()
 
 
 # Function: get_plant_by_id
@@ -116,7 +172,7 @@ def add_plant(scientific_name, common_name, flowering_time, height, ecological_f
 # Control structures:
 #   - Selection: validate plant_id; return None if invalid/not found
 # Data types/structures:
-#   - int (plant_id), tuple (row), dict (mapped record)
+#   - int (plant_id), sqlite3.Row (row), dict (mapped record)
 
 
 def get_plant_by_id(plant_id):
@@ -124,29 +180,7 @@ def get_plant_by_id(plant_id):
     if not isinstance(plant_id, int) or plant_id <= 0:
         return None
     
-    conn = sqlite3.connect('plants.db')
-    c = conn.cursor()
-    c.execute("SELECT id, scientific_name, common_name, flowering_time, height, ecological_function, sunlight, water_level, salt_wind_tolerance, type, planting_space, image_url, soil_type FROM plants WHERE id = ?", (plant_id,))
-    plant = c.fetchone()
-    conn.close()
-    
-    if plant:  # Selection: exist/not-exist
-        return {
-            "id": plant[0],
-            "scientific_name": plant[1],
-            "common_name": plant[2],
-            "flowering_time": plant[3],
-            "height": plant[4],
-            "ecological_function": plant[5],
-            "sunlight": plant[6],
-            "water_level": plant[7],
-            "salt_wind_tolerance": plant[8],
-            "type": plant[9],
-            "planting_space": plant[10],
-            "image_url": plant[11],
-            "soil_type": plant[12]
-        }
-    return None
+    return db.fetch_plant(plant_id)
 
 
 # Function: remove_plant    
@@ -154,141 +188,352 @@ def get_plant_by_id(plant_id):
 # Inputs: plant_id (int)
 # Outputs: None
 # Control structures:
-#   - Sequence: connect → delete → commit → close
+#   - Sequence: delete in a write transaction → invalidate index and cached PDFs
 # Data types:
 #   - int (plant_id)
 
 
 def remove_plant(plant_id):
-    conn = sqlite3.connect('plants.db')
-    c = conn.cursor()
-    c.execute("DELETE FROM plants WHERE id = ?", (plant_id,))
-    conn.commit()
-    conn.close()
+    db.delete_plant(plant_id)
+    invalidate_index()
+    summaries.invalidate(plant_id)
+
+
+# Function: remove_plants
+# Purpose: Delete many plants at once
+# Inputs: plant_ids (list[int])
+# Returns: int number removed
+# Control structures:
+#   - Sequence: one executemany transaction → one invalidation of the index and cached PDFs
+
+
+def remove_plants(plant_ids):
+    removed = db.delete_plants(plant_ids)
+    if removed:
+        invalidate_index()
+        summaries.invalidate()
+    return removed
+
+
+# Function: edit_plants
+# Purpose: Set the same field value(s) on many plants (e.g. water_level for every sedge)
+# Inputs: plant_ids (list[int]); changes (dict column -> str, see db.BULK_EDIT_COLUMNS)
+# Returns: int number updated
+# Control structures:
+#   - Selection: every value must be non-empty, and a height valid as in add_plant (ValueError)
+#   - Sequence: one executemany transaction → one index invalidation
+#     (cached PDFs are keyed on the row hash, so edited rows are re-rendered anyway)
+
+
+def edit_plants(plant_ids, changes):
+    changes = {column: (value or "").strip() for column, value in changes.items()}
+    if not all(changes.values()):
+        raise ValueError("A value must be provided for every edited field.")
+    if "height" in changes:
+        changes["height"] = parse_height(changes["height"])
+    updated = db.update_plants(plant_ids, changes)
+    if updated:
+        invalidate_index()
+    return updated
+
+
+# Function: import_plants_file
+# Purpose: Add (or update, matched on scientific name) plants from an uploaded CSV/TSV file
+# Inputs: upload (Werkzeug FileStorage); header row uses column names or supplier spellings
+# Returns: int number of plants added or changed (rows identical to the catalogue are skipped)
+# Control structures:
+#   - Selection: delimiter by file extension (.tsv/.txt → tab, otherwise comma)
+#   - Sequence: stream rows → one executemany transaction (import_plants.py) → one invalidation,
+#     only when some plant was written
+#   - Selection: a large catalogue's similar plants are rebuilt in a background job
+
+
+def import_plants_file(upload):
+    extension = os.path.splitext(upload.filename or "")[1].lower()
+    delimiter = "\t" if extension in (".tsv", ".txt") else ","
+    lines = io.TextIOWrapper(upload.stream, encoding="utf-8-sig", newline="")
+    try:
+        count = import_plants.import_plants_to_db(import_plants.iter_delimited(lines, delimiter), report=False)
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise ValueError(f"Could not read {upload.filename}: {e}")
+    if count:
+        invalidate_index()
+        summaries.invalidate()
+        if db.similar_plants_stale():
+            enqueue_job("similar_plants", {})
+    return count
+
+
+# Function: enqueue_job
+# Purpose: Queue slow work (images, PDFs) for the background workers
+# Inputs: kind (str, see jobs.py handlers), payload (dict)
+# Returns: str job id
+
+
+def enqueue_job(kind, payload):
+    jobs.start_workers(app.config["JOB_WORKERS"])
+    return jobs.enqueue(kind, payload)
+
+
+# Function: job_accepted
+# Purpose: Response for a queued job: 202 + status URL for API clients, else a redirect
+#          to the status page, which downloads the result when it is ready
+# Returns: Flask response
+
+
+def job_accepted(job_id):
+    status_url = url_for("job_status", job_id=job_id)
+    if request.accept_mimetypes.best == "application/json":
+        response = jsonify(job_id=job_id, status=jobs.QUEUED, status_url=status_url)
+        response.status_code = 202
+        response.headers["Location"] = status_url
+        return response
+    return redirect(status_url, code=303)
+
+
+# Function: parse_plant_ids
+# Purpose: Validate a list of plant ids from a form or JSON body
+# Returns: list[int] (order kept, duplicates dropped)
+# Control structures:
+#   - Selection: ValueError on non-integers or too many ids
+
+
+def parse_plant_ids(values):
+    try:
+        ids = list(dict.fromkeys(int(value) for value in values))
+    except (TypeError, ValueError):
+        raise ValueError("Plant ids must be integers.")
+    if len(ids) > app.config["BATCH_MAX_IDS"]:
+        raise ValueError(f"At most {app.config['BATCH_MAX_IDS']} plants per batch.")
+    return ids
+
+
+# Function: survey_form
+# Purpose: Survey answers from a form or query string, normalised once for both the
+#          matchers and the result cache key: surrounding whitespace trimmed, blank → None
+#          (case is left alone; matching and the key are case-insensitive)
+# Inputs: values (request.form / request.args MultiDict)
+# Returns: dict criterion -> str | None
+
+
+def survey_form(values):
+    return {criterion: (values.get(criterion) or "").strip() or None for criterion in (
+        "soil_type", "sunlight", "water_level", "salt_wind_tolerance", "type", "ecological_function", "planting_space",
+    )}
 
 
 # Function: query_plants
-# Purpose: Filter plants according to user criteria
-# Returns: list[dict] with minimal fields (id, scientific_name, image_url)
-# Inputs: form_data (dict of optional criteria)
-# Outputs: list of dicts with keys 'id', 'scientific_name', 'image_url'
-# Control structures:
-#   - Sequence: fetch all → filter → return filtered
-#   - Iteration: over all plants; per-plant evaluation
-#   - Selection: multiple conditional checks inside matches()
+# Purpose: Rank plants against user criteria
+# Returns: list[dict] with minimal fields (id, scientific_name, image_url, score), best match first
+# Inputs: form_data (dict of optional criteria); threshold (float, minimum match ratio); top_k (int | None)
+# Outputs: list of dicts with keys 'id', 'scientific_name', 'image_url', 'score'
+# Control structures:
+#   - Selection: backend chosen by app.config["RECOMMENDATION_BACKEND"]
+#       "index": compiled in-memory index (rebuilt only if the catalogue changed) → score → rank
+#       "sql":   generated query over indexed normalised columns; pruning happens inside SQLite
+#   - Sequence: matching time, rows scanned (index backend) and rows matched → metrics
 # Data structures/types:
 #   - dict form_data (criteria)
-#   - dict value_mappings (nested dict[str -> list[str]] for keyword matching)
-#   - list comprehension to produce filtered list
-#   - floats/ints not required here; strings compared case-insensitively
-
-
-def query_plants(form_data):
-    conn = sqlite3.connect('plants.db')
-    c = conn.cursor()
-    c.execute("SELECT id, scientific_name, image_url, flowering_time, height, ecological_function, sunlight, water_level, salt_wind_tolerance, type, planting_space, soil_type FROM plants")
-    plants = c.fetchall()
-    print(f"Total plants fetched from database: {len(plants)}")
-
-    def matches(plant):
-        (id, scientific_name, image_url, flowering_time, height, ecological_function, sunlight, water_level, salt_wind_tolerance, type_, planting_space, soil_type) = plant
-        match_count = 0     # Data type: int
-        total_criteria = 0  # Data type: int
-
-        # Data structure: nested dict of lists for flexible mapping
-        value_mappings = {
-            "water_level": {
-                "Dry or drought-prone": ["dry", "drought"],
-                "Moderate moisture (well-watered)": ["moderate", "well-watered"],
-                "Wet or swampy": ["wet", "swampy"]
-            },
-            "salt_wind_tolerance": {
-                "Yes — coastal or exposed site": ["yes", "coastal"],
-                "No — sheltered inland site": ["no", "sheltered"]
-            },
-            "type": {
-                "Groundcover or creeping": ["groundcover", "creeping"],
-                "Tufting or grass-like": ["tufting", "grass"],
-                "Small herb or dainty flower": ["small herb", "dainty flower", "herb"],
-                "Shrub or tree": ["shrub", "tree"]
-            }
-        }
-
-        # Selection used for each optional criterion; case-insensitive substring or keyword matching
-        if form_data.get("flowering_time"):
-            total_criteria += 1
-            if form_data["flowering_time"].lower() in flowering_time.lower():
-                match_count += 1
-        if form_data.get("ecological_function"):
-            total_criteria += 1
-            if form_data["ecological_function"].lower() in ecological_function.lower():
-                match_count += 1
-        if form_data.get("sunlight"):
-            total_criteria += 1
-            form_sunlight = form_data["sunlight"].lower()
-            plant_sunlight = sunlight.lower()
-            if ("full sun" in form_sunlight and "full sun" in plant_sunlight) or \
-               ("partial shade" in form_sunlight and ("partial" in plant_sunlight or "shade" in plant_sunlight)) or \
-               ("full shade" in form_sunlight and ("shade" in plant_sunlight or "partial" in plant_sunlight)):
-                match_count += 1
-        if form_data.get("water_level"):
-            total_criteria += 1
-            form_water = form_data["water_level"].lower()
-            plant_water = water_level.lower()
-            if form_water in value_mappings["water_level"]:
-                # Iteration over synonyms
-                for keyword in value_mappings["water_level"][form_water]:  
-                    if keyword in plant_water:
-                        match_count += 1
-                        break
-        if form_data.get("salt_wind_tolerance"):
-            total_criteria += 1
-            form_tolerance = form_data["salt_wind_tolerance"].lower()
-            plant_tolerance = salt_wind_tolerance.lower()
-            if "yes" in form_tolerance and ("yes" in plant_tolerance or "coastal" in plant_tolerance):
-                match_count += 1
-            elif "no" in form_tolerance and ("no" in plant_tolerance or "sheltered" in plant_tolerance):
-                match_count += 1
-        if form_data.get("type"):
-            total_criteria += 1
-            form_type = form_data["type"].lower()
-            plant_type = type_.lower()
-            if form_type in value_mappings["type"]:
-                # Iteration over synonyms
-                for keyword in value_mappings["type"][form_type]:  
-                    if keyword in plant_type:
-                        match_count += 1
-                        break
-        if form_data.get("planting_space"):
-            total_criteria += 1
-            form_space = form_data["planting_space"].lower()
-            plant_space = planting_space.lower()
-            if ("small" in form_space and "small" in plant_space) or \
-               ("medium" in form_space and "medium" in plant_space) or \
-               ("large" in form_space and "large" in plant_space) or \
-               ("low" in form_space and "low" in plant_space):
-                match_count += 1
-        if form_data.get("soil_type"):
-            total_criteria += 1
-            form_soil = form_data["soil_type"].lower()
-            plant_soil = soil_type.lower()
-            if form_soil in plant_soil:
-                match_count += 1
-
-        # Selection: so that there are results for every filterng scenario
-        # Arithmetic operations: division, comparison
-        if total_criteria == 0:
-            return True
-        return (match_count / total_criteria) >= 0.4
-
-    # Iteration via list comprehension filters only matching plants and maps to dicts
-    filtered_plants = [
-        {"id": p[0], "scientific_name": p[1], "image_url": p[2]}
-        for p in plants if matches(p)
-    ]
-    
-    conn.close()
-    return filtered_plants
+#   - RecommendationIndex: columnar NumPy tag arrays, see recommend.py
+#   - float score (fraction of selected criteria matched, 0.0–1.0)
+
+
+def query_plants(form_data, threshold=MATCH_THRESHOLD, top_k=None):
+    backend = app.config["RECOMMENDATION_BACKEND"]
+    if backend == "sql":
+        # Rows SQLite examines are not observable from Python; only matches are counted
+        with metrics.timed(metrics.MATCH_SECONDS, "match", backend=backend):
+            plants = query_survey(form_data, threshold=threshold, top_k=top_k)
+    else:
+        index = get_index()
+        with metrics.timed(metrics.MATCH_SECONDS, "match", backend=backend):
+            plants = index.rank(form_data, threshold=threshold, top_k=top_k)
+        metrics.ROWS_SCANNED.inc(len(index), backend=backend)
+    metrics.ROWS_MATCHED.inc(len(plants), backend=backend)
+    return plants
+
+
+# Template helper: responsive_image
+# Purpose: Sources for a <picture> element so pages fetch a right-sized, modern-format variant
+# Inputs: image_url (str | None) as stored in the DB
+# Returns: dict {"src": str, "srcset": str, "sources": [{"type": str, "srcset": str}]}
+# Control structures:
+#   - Selection: fall back to the original file when no derivatives exist yet
+# Data structures:
+#   - manifest dict from images.variants_for; list of srcset entries "url 320w"
+
+
+@app.template_global()
+def responsive_image(image_url):
+    if not image_url:
+        return {"src": url_for("static", filename="images/placeholder.jpg"), "srcset": "", "sources": []}
+    manifest = images.variants_for(image_url)
+    if manifest is None:
+        return {"src": url_for("static", filename=image_url.replace("/static/", "")), "srcset": "", "sources": []}
+
+    def srcset(fmt):
+        return ", ".join(f"{url_for('static', filename=name)} {width}w" for width, name in manifest["variants"][fmt])
+
+    fallback = manifest["variants"]["jpeg"]
+    src = next((name for width, name in fallback if width >= 320), fallback[-1][1])
+    return {
+        "src": url_for("static", filename=src),
+        "srcset": srcset("jpeg"),
+        "sources": [{"type": images.MIME_TYPES[fmt], "srcset": srcset(fmt)} for fmt in manifest["variants"] if fmt != "jpeg"],
+    }
+
+
+# Template helper: asset_url
+# Purpose: URL of a built CSS/JS bundle (content-hashed name, served immutable and precompressed)
+# Inputs: name (str) source file in assets/css or assets/js, e.g. "survey.css"
+# Returns: str
+# Control structures:
+#   - Selection: in debug mode the sources are re-checked on every call (edits show up live)
+
+
+@app.template_global()
+def asset_url(name):
+    return url_for("static", filename=build_assets.asset_path(name, reload=app.debug))
+
+
+# Function: send_static
+# Purpose: Static file view; built bundles are sent precompressed (brotli, else gzip)
+#          when the client accepts it, with Vary: Accept-Encoding
+# Inputs: filename (str path under static/)
+# Control structures:
+#   - Selection: bundle + accepted encoding + variant on disk → compressed file;
+#     anything else → Flask's static file handling
+# Data structures:
+#   - build_assets.ENCODINGS (Content-Encoding -> file suffix, preferred first)
+
+
+def send_static(filename):
+    if not filename.startswith(build_assets.DIST_PREFIX):
+        return app.send_static_file(filename)
+    available = [encoding for encoding, suffix in build_assets.ENCODINGS.items()
+                 if os.path.isfile(os.path.join(app.static_folder, filename + suffix))]
+    encoding = request.accept_encodings.best_match(available) if available else None
+    if encoding is not None:
+        variant = filename + build_assets.ENCODINGS[encoding]
+        response = send_from_directory(app.static_folder, variant, mimetype=mimetypes.guess_type(filename)[0])
+        response.headers["Content-Encoding"] = encoding
+    else:
+        response = app.send_static_file(filename)
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+app.view_functions["static"] = send_static
+
+
+# Function: get_result_cache
+# Purpose: Survey result cache configured from app.config, created on first use
+# Returns: result_cache.ResultCache | None (caching disabled)
+# Data structures:
+#   - app.extensions["result_cache"] (one cache per app/process)
+
+
+def get_result_cache():
+    if "result_cache" not in app.extensions:
+        backend = app.config["RESULT_CACHE_BACKEND"]
+        app.extensions["result_cache"] = result_cache.create_cache(
+            backend,
+            path=app.config["RESULT_CACHE_PATH"],
+            max_entries=app.config["RESULT_CACHE_MAX_ENTRIES"],
+            ttl=app.config["RESULT_CACHE_TTL"],
+        ) if backend else None
+    return app.extensions["result_cache"]
+
+
+# Function: page_etag
+# Purpose: ETag for a rendered page: the build id and asset bundle version (pages embed
+#          the bundle URLs) plus whatever the page depends on
+# Returns: str
+
+
+def page_etag(*parts):
+    build = http_cache.build_id(os.path.join(app.root_path, app.template_folder), app.static_folder)
+    return http_cache.entity_tag(build, build_assets.manifest(reload=app.debug)["version"], *parts)
+
+
+# Function: static_url_fingerprint
+# Purpose: Add ?v=<content hash> to every url_for("static", ...) so the URL changes with the file
+# Inputs: endpoint (str), values (dict of URL arguments, modified in place)
+
+
+@app.url_defaults
+def static_url_fingerprint(endpoint, values):
+    if endpoint == "static" and "v" not in values and "filename" in values:
+        fingerprint = http_cache.static_fingerprint(app.static_folder, values["filename"])
+        if fingerprint:
+            values["v"] = fingerprint
+
+
+# Function: static_cache_policy
+# Purpose: Long-lived, immutable caching for fingerprinted static files
+# Control structures:
+#   - Selection: only when ?v= matches the file (or the path is content-addressed);
+#     other static requests keep Flask's default revalidation
+
+
+@app.after_request
+def static_cache_policy(response):
+    if request.endpoint == "static" and response.status_code in (200, 206, 304):
+        filename = (request.view_args or {}).get("filename", "")
+        if http_cache.is_immutable(app.static_folder, filename, request.args.get("v")):
+            response.headers["Cache-Control"] = f"public, max-age={app.config['STATIC_IMMUTABLE_MAX_AGE']}, immutable"
+    return response
+
+
+# Function: start_request_metrics / finish_request_metrics
+# Purpose: Per-route latency histogram and optional Server-Timing header
+# Control structures:
+#   - Selection: Server-Timing only when app.config["SERVER_TIMING"] (it reveals internals)
+# Notes:
+#   - Streamed pages (dashboard) are measured to the first byte; their template
+#     time is recorded when the stream finishes
+
+
+@app.before_request
+def start_request_metrics():
+    metrics.start_request()
+
+
+@app.after_request
+def finish_request_metrics(response):
+    phases = metrics.finish_request(request.endpoint, request.method, response.status_code)
+    if app.config["SERVER_TIMING"] and phases:
+        response.headers["Server-Timing"] = metrics.server_timing(phases)
+    return response
+
+
+@before_render_template.connect_via(app)
+def template_render_started(sender, template, context, **extra):
+    metrics.template_started()
+
+
+@template_rendered.connect_via(app)
+def template_render_finished(sender, template, context, **extra):
+    metrics.template_finished(template.name)
+
+
+# Function: cache_metrics
+# Purpose: Hit/miss counts and sizes of the result and PDF caches (this process), for /metrics
+# Returns: iterable of metric families (see metrics.collector)
+
+
+@metrics.collector
+def cache_metrics():
+    caches = {"summaries": summaries.cache_stats()}
+    cache = get_result_cache()
+    if cache is not None:
+        caches["results"] = cache.stats()
+    yield ("nurserymate_cache_hits_total", "counter", "Cache lookups served from the cache.",
+           [({"cache": name}, stats["hits"]) for name, stats in caches.items()])
+    yield ("nurserymate_cache_misses_total", "counter", "Cache lookups that missed.",
+           [({"cache": name}, stats["misses"]) for name, stats in caches.items()])
+    yield ("nurserymate_cache_entries", "gauge", "Entries currently cached.",
+           [({"cache": name}, stats["entries"]) for name, stats in caches.items()])
 
 
 # Route: Home page
@@ -319,15 +564,7 @@ def home():
 @app.route("/form", methods=["GET", "POST"])
 def form():
     if request.method == "POST":  # Selection: POST-handling branch
-        form_data = {
-            "soil_type": request.form.get("soil_type"),
-            "sunlight": request.form.get("sunlight"),
-            "water_level": request.form.get("water_level"),
-            "salt_wind_tolerance": request.form.get("salt_wind_tolerance"),
-            "type": request.form.get("type"),
-            "ecological_function": request.form.get("ecological_function"),
-            "planting_space": request.form.get("planting_space"),
-        }
+        form_data = survey_form(request.form)
         return redirect(url_for("results", **form_data))  # Sequence: build URL with dict unpacking
     return render_template("form.html")
 
@@ -337,43 +574,310 @@ def form():
 # Method(s): GET
 # Purpose: Display full details for a single plant
 # Inputs: plant_id (int path parameter). User clicks link from results page
-# Outputs: render template with plant record (dict)
+# Outputs: render template with plant record (dict) and similar plants; 304 when the client's copy is current
 # Control structures:
-#   - Sequence: fetch record → render template
+#   - Sequence: fetch record and its precomputed similar plants (see similar.py) →
+#     conditional check (ETag from the row hash and the similar plants) → render template
 # Data types/structures:
 #   - int path parameter (plant_id)
-#   - dict plant record passed to template
+#   - dict plant record and list[dict] similar plants passed to template
 
 
 @app.route("/plant/<int:plant_id>")
 def plant_details(plant_id):
     plant = get_plant_by_id(plant_id)
-    return render_template("plant_details.html", plant=plant)
+    if not plant:
+        return render_template("plant_details.html", plant=plant)
+
+    similar_plants = db.fetch_similar_plants(plant_id, app.config["SIMILAR_PLANTS_SHOWN"])
+    # Selection: the page also changes once image derivatives exist
+    has_variants = images.variants_for(plant["image_url"]) is not None
+    etag = page_etag("plant", summaries.row_hash(plant), has_variants, similar_plants)
+    modified = http_cache.last_modified(db.catalogue_state()[1])
+    policy = app.config["CACHE_CONTROL"]["plant_details"]
+    cached = http_cache.not_modified(etag, modified, policy)
+    if cached is not None:
+        return cached
+    response = make_response(render_template("plant_details.html", plant=plant, similar_plants=similar_plants))
+    return http_cache.apply_validators(response, etag, modified, policy)
 
 
 # Route: Results
 # URL: "/results"
 # Method(s): GET
-# Purpose: Run query based on criteria from query string and show results
+# Purpose: Run query based on criteria from query string and show ranked results (best first)
+# Outputs: results page; X-Cache header "HIT" or "MISS" when the result cache is enabled;
+#          304 when the client's copy is current (ETag = build + catalogue version + survey key
+#          + image-derivative state, as the page embeds each plant's image variants)
 # Control structures:
-#   - Sequence: collect args → query → render
+#   - Sequence: collect args → conditional check → cache lookup → (miss) query → render → store
+#   - Selection: cached page reused only for the current catalogue version (see result_cache.py)
 # Data structures:
 #   - dict form_data; list[dict] plants
 
 
 @app.route("/results", methods=["GET"])
 def results():
-    form_data = {
-        "soil_type": request.args.get("soil_type"),
-        "sunlight": request.args.get("sunlight"),
-        "water_level": request.args.get("water_level"),
-        "salt_wind_tolerance": request.args.get("salt_wind_tolerance"),
-        "type": request.args.get("type"),
-        "ecological_function": request.args.get("ecological_function"),
-        "planting_space": request.args.get("planting_space"),
+    form_data = survey_form(request.args)
+    threshold, top_k = app.config["MATCH_THRESHOLD"], app.config["RESULTS_TOP_K"]
+    key = result_cache.survey_key(form_data, threshold, top_k)
+    version, updated_at = db.catalogue_state()  # read first: a concurrent write can only make the entry stale
+    derivatives = images.derivatives_state()
+    etag = page_etag("results", version, key, derivatives)
+    modified = http_cache.last_modified(updated_at)
+    policy = app.config["CACHE_CONTROL"]["results"]
+    cached = http_cache.not_modified(etag, modified, policy)
+    if cached is not None:
+        return cached
+
+    cache = get_result_cache()
+    key = result_cache.page_key(key, derivatives)
+    entry = cache.get(key, version) if cache is not None else None
+    if entry is not None:
+        html, status = entry.html, "HIT"
+    else:
+        plants = query_plants(form_data, threshold=threshold, top_k=top_k)
+        html, status = render_template("results_final.html", plants=plants), "MISS"
+        if cache is not None:
+            cache.put(key, version, [p["id"] for p in plants], html)
+    response = make_response(html)
+    if cache is not None:
+        response.headers["X-Cache"] = status
+    return http_cache.apply_validators(response, etag, modified, policy)
+
+
+# Route: Batch recommendations API
+# URL: "/api/recommendations"
+# Method(s): POST
+# Purpose: Rank plants for many site profiles in one request (JSON in, JSON out)
+# Inputs: JSON body {"profiles": [dict, ...], "threshold": float (optional), "top_k": int (optional)}
+#         each profile uses the same keys form() collects; unknown keys are ignored
+# Outputs: JSON {"catalogue_size": int, "results": [{"plant_ids": [int], "scores": [float]}, ...]}
+#          results are in the same order as profiles; 400 with {"error": str} on bad input
+# Control structures:
+#   - Selection: validate body, profiles, threshold and top_k
+#   - Sequence: one index snapshot → one vectorised batch scoring pass → serialise
+# Data structures:
+#   - list[dict] profiles; list[list[dict]] ranked matches
+
+
+@app.route("/api/recommendations", methods=["POST"])
+def api_recommendations():
+    try:
+        profiles, threshold, top_k = parse_recommendation_request(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    return jsonify(rank_profiles(profiles, threshold, top_k))
+
+
+# Function: parse_recommendation_request
+# Purpose: Validate a batch recommendations body (see api_recommendations)
+# Returns: (list[dict] profiles, float threshold, int | None top_k)
+# Control structures:
+#   - Selection: ValueError with the message returned to the client
+
+
+def parse_recommendation_request(body):
+    if not isinstance(body, dict) or not isinstance(body.get("profiles"), list):
+        raise ValueError("Body must be a JSON object with a 'profiles' list.")
+
+    profiles = []
+    for profile in body["profiles"]:  # Iteration: validate and keep known survey keys only
+        if not isinstance(profile, dict):
+            raise ValueError("Each profile must be a JSON object.")
+        values = {key: profile.get(key) for key in SURVEY_OPTIONS}
+        if any(value is not None and not isinstance(value, str) for value in values.values()):
+            raise ValueError("Profile values must be strings or null.")
+        profiles.append(values)
+    if len(profiles) > app.config["RECOMMENDATION_BATCH_LIMIT"]:
+        raise ValueError(f"At most {app.config['RECOMMENDATION_BATCH_LIMIT']} profiles per request.")
+
+    threshold = body.get("threshold", app.config["MATCH_THRESHOLD"])
+    top_k = body.get("top_k", app.config["RESULTS_TOP_K"])
+    if isinstance(threshold, bool) or not isinstance(threshold, (int, float)) or not 0 <= threshold <= 1:
+        raise ValueError("threshold must be a number between 0 and 1.")
+    if top_k is not None and (isinstance(top_k, bool) or not isinstance(top_k, int) or top_k <= 0):
+        raise ValueError("top_k must be a positive integer.")
+    return profiles, threshold, top_k
+
+
+# Function: rank_profiles
+# Purpose: Score a validated batch against one index snapshot
+# Returns: dict {"catalogue_size": int, "results": [{"plant_ids", "scores"}, ...]}
+
+
+def rank_profiles(profiles, threshold, top_k):
+    index = get_index()  # one catalogue snapshot shared by the whole batch
+    with metrics.timed(metrics.MATCH_SECONDS, "match", backend="index"):
+        ranked = index.rank_batch(profiles, threshold=threshold, top_k=top_k)
+    metrics.ROWS_SCANNED.inc(len(index) * len(profiles), backend="index")
+    metrics.ROWS_MATCHED.inc(sum(map(len, ranked)), backend="index")
+    return {
+        "catalogue_size": len(index),
+        "results": [
+            {"plant_ids": [p["id"] for p in matches], "scores": [round(p["score"], 4) for p in matches]}
+            for matches in ranked
+        ],
     }
-    plants = query_plants(form_data)
-    return render_template("results_final.html", plants=plants)
+
+
+# Route: Plant search
+# URL: "/search"
+# Method(s): GET
+# Purpose: Full-text search by name, ecological function or soil type (dashboard search box)
+# Inputs: query args q (str), limit (int, optional)
+# Outputs: JSON {"query": str, "results": [{"id", "scientific_name", "common_name", "image_url", "match"}]}
+# Control structures:
+#   - Selection: clamp limit to 1..SEARCH_MAX_RESULTS
+#   - Sequence: prefix search → typo-tolerant fallback (see search.py)
+# Data structures:
+#   - list[dict] results
+
+
+@app.route("/search", methods=["GET"])
+def search_route():
+    text = request.args.get("q", "")
+    limit = request.args.get("limit", search.SEARCH_LIMIT, type=int)
+    limit = max(1, min(limit, app.config["SEARCH_MAX_RESULTS"]))
+    return jsonify(query=text, results=search.search_plants(text, limit=limit))
+
+
+# Route: Catalogue changes (delta sync)
+# URL: "/api/changes"
+# Method(s): GET
+# Purpose: Keep copies of the catalogue (satellite nurseries, council portal) in sync by
+#          sending only the plants added, edited or removed since the version they hold
+# Inputs: query arg since (int catalogue version; 0 or omitted = the whole catalogue)
+# Outputs: JSON lines (application/x-ndjson), one compact object per line:
+#   {"op":"upsert","version":int,"changed_at":int,"id":int, ...plant columns}
+#   {"op":"delete","version":int,"deleted_at":int,"id":int,"scientific_name":str}
+#   {"op":"end","version":int,"changes":int}  (always last: the next call's since)
+#   X-Catalogue-Version header; 304 when nothing changed since the same call (ETag);
+#   400 for a bad since, 409 when since is newer than the catalogue (re-sync from 0)
+# Control structures:
+#   - Sequence: one read transaction (db.iter_changes) → lines streamed in chunks
+#   - Selection: validate since against the current version before streaming
+# Data structures:
+#   - generator of (kind, dict) records; list[str] lines per chunk
+
+
+@app.route("/api/changes", methods=["GET"])
+def catalogue_changes():
+    since = request.args.get("since", "0")
+    if not (since.isascii() and since.isdigit()):  # Selection: a typo must not mean "send everything"
+        return jsonify(error="since must be a catalogue version (a non-negative integer)."), 400
+    since = int(since)
+    changes = db.iter_changes(since)
+    _, current = next(changes)
+    if since > current["version"]:
+        changes.close()
+        return jsonify(error="since is newer than the catalogue; re-sync from 0.",
+                       version=current["version"]), 409
+
+    etag = http_cache.entity_tag("changes", since, current["version"])
+    policy = app.config["CACHE_CONTROL"]["catalogue_changes"]
+    cached = http_cache.not_modified(etag, None, policy)
+    if cached is not None:
+        changes.close()
+        return cached
+    response = app.response_class(change_feed_lines(changes, current["version"]), mimetype="application/x-ndjson")
+    response.headers["X-Catalogue-Version"] = str(current["version"])
+    return http_cache.apply_validators(response, etag, None, policy)
+
+
+# Function: change_feed_lines
+# Purpose: Serialise db.iter_changes records as JSON lines, CHANGE_FEED_CHUNK_LINES per chunk
+# Returns: generator of str chunks
+
+
+def change_feed_lines(changes, version):
+    lines = []
+    count = 0
+    for kind, record in changes:  # Iteration: one line per change, flushed in chunks
+        if kind == "upsert":
+            line = dict(op="upsert", version=record.pop("changed_version"), changed_at=record.pop("changed_at"),
+                        **record)
+        else:
+            line = dict(op="delete", version=record["version"], deleted_at=record["deleted_at"],
+                        id=record["plant_id"], scientific_name=record["scientific_name"])
+        lines.append(json.dumps(line, separators=(",", ":"), ensure_ascii=False))
+        count += 1
+        if len(lines) >= app.config["CHANGE_FEED_CHUNK_LINES"]:
+            yield "\n".join(lines) + "\n"
+            lines.clear()
+    lines.append(json.dumps({"op": "end", "version": version, "changes": count}, separators=(",", ":")))
+    yield "\n".join(lines) + "\n"
+
+
+# Route: Catalogue export
+# URL: "/export/catalogue.csv", "/export/catalogue.jsonl"
+# Method(s): GET
+# Purpose: Download the whole catalogue (daily analyst pulls) without buffering it in the worker
+# Outputs: CSV (plants column names as header) or JSON lines, one plant per row in id order;
+#          streamed with chunked transfer, gzip when accepted; 304 when the catalogue
+#          version is unchanged since the client's copy (ETag)
+# Control structures:
+#   - Sequence: conditional check → rows streamed from one read transaction (export_plants.py)
+
+
+@app.route("/export/catalogue.<any(csv, jsonl):fmt>", methods=["GET"])
+def export_catalogue(fmt):
+    version, updated_at = db.catalogue_state()
+    return export_response("catalogue", fmt, version, updated_at, export_plants.catalogue_rows,
+                           export_plants.CATALOGUE_COLUMNS)
+
+
+# Route: Survey results export
+# URL: "/export/results.csv", "/export/results.jsonl"
+# Method(s): GET
+# Purpose: Download the matches for any /results query with their full records
+# Inputs: the same query args as /results (survey answers)
+# Outputs: CSV or JSON lines with rank, score and the plant columns, best match first;
+#          streamed and cached like /export/catalogue
+# Control structures:
+#   - Sequence: conditional check → rank (index or SQL backend) → records streamed in rank order
+
+
+@app.route("/export/results.<any(csv, jsonl):fmt>", methods=["GET"])
+def export_results(fmt):
+    form_data = survey_form(request.args)
+    threshold, top_k = app.config["MATCH_THRESHOLD"], app.config["RESULTS_TOP_K"]
+    key = result_cache.survey_key(form_data, threshold, top_k)
+    version, updated_at = db.catalogue_state()  # read first: a concurrent write can only make the tag stale
+    return export_response("results", fmt, version, updated_at,
+                           lambda: export_plants.result_rows(query_plants(form_data, threshold=threshold, top_k=top_k)),
+                           export_plants.RESULT_COLUMNS, key)
+
+
+# Function: export_response
+# Purpose: Streaming download response shared by the /export routes
+# Inputs: name (str, file name stem), fmt ("csv" | "jsonl"), catalogue version and updated_at,
+#         rows (callable returning the row generator; only called when a body is sent),
+#         columns (tuple), *tag_parts (extra ETag inputs)
+# Returns: Response (304 when the client's copy is current)
+# Control structures:
+#   - Selection: gzip when EXPORT_GZIP and the client accepts it (part of the ETag, Vary set)
+
+
+def export_response(name, fmt, version, updated_at, rows, columns, *tag_parts):
+    compress = app.config["EXPORT_GZIP"] and request.accept_encodings["gzip"] > 0
+    encoding = "gzip" if compress else "identity"
+    etag = http_cache.entity_tag("export", name, fmt, version, encoding, *tag_parts)
+    modified = http_cache.last_modified(updated_at)
+    policy = app.config["CACHE_CONTROL"]["export"]
+    cached = http_cache.not_modified(etag, modified, policy)
+    if cached is None:
+        response = app.response_class(export_plants.stream(rows(), fmt, columns, compress=compress),
+                                      mimetype=export_plants.FORMATS[fmt])
+        if compress:
+            response.headers["Content-Encoding"] = "gzip"
+        response.headers["Content-Disposition"] = f'attachment; filename="{name}-v{version}.{fmt}"'
+        response.headers["X-Catalogue-Version"] = str(version)
+        response = http_cache.apply_validators(response, etag, modified, policy)
+    else:
+        response = cached
+    response.vary.add("Accept-Encoding")
+    return response
 
 
 # Route: Login
@@ -408,17 +912,25 @@ def login():
 # URL: "/adminDashboard"
 # Method(s): GET, POST
 # Purpose: Manage plants (add/remove) and list all plants
-# Inputs: form fields for new plant (str); remove_id (int)
-# Outputs: render template with all plants; flash messages on actions
+# Inputs: form fields for new plant (str); plant_ids (repeated int, selected rows) with
+#         remove_plant or bulk_edit (edit_field, edit_value); plants_file (CSV/TSV upload);
+#         remove_id (int, single remove); query args q (str, optional search),
+#         after (int, keyset cursor: last plant id of the previous page)
+# Outputs: streamed page of plants (or the search matches for q); POST → flash message and
+#          redirect back to the same page (post/redirect/get, so a reload never resubmits)
 # Control structures:
 #   - Selection: require login; redirect if not authenticated
 #   - Selection: POST vs GET
-#   - Selection: handle remove vs add_plant actions
+#   - Selection: handle bulk edit vs remove vs CSV import vs add_plant actions
+#     (each batch is one transaction and one cache invalidation)
 #   - Selection: presence of image file; ensure path normalization
+#   - Sequence: GET streams the template, so the first rows reach the browser while
+#     later ones are still being read
 # Data structures/types:
 #   - dict-like session; form fields (str)
-#   - file upload object (Werkzeug FileStorage) → saved as path str in DB
-#   - list[dict] plants for template
+#   - file upload object (Werkzeug FileStorage) → saved as path str in DB; derivatives built
+#     by images.py in a background job (jobs.py)
+#   - db.PlantPage (lazy rows, id/name columns only) or list[dict] search matches for template
 
 
 @app.route("/adminDashboard", methods=["GET", "POST"])
@@ -428,13 +940,37 @@ def adminDashboard():
         return redirect(url_for('login'))
 
     if request.method == "POST":  # Selection: request method
-        if "remove_id" in request.form:  
-            plant_id = request.form.get("remove_id")
-            if plant_id:
-                remove_plant(int(plant_id))
-                flash("Plant removed successfully.")
-            else:
+        if "bulk_edit" in request.form:  # Selection: one field set on every selected plant
+            try:
+                plant_ids = parse_plant_ids(request.form.getlist("plant_ids"))
+                field = request.form.get("edit_field", "")
+                if not plant_ids:
+                    raise ValueError("Select at least one plant to edit.")
+                updated = edit_plants(plant_ids, {field: request.form.get("edit_value")})
+                flash(f"Updated {field.replace('_', ' ')} on {updated} plant(s).")
+            except ValueError as e:
+                flash(f"Error editing plants: {str(e)}")
+        elif "remove_plant" in request.form or "remove_id" in request.form:
+            try:
+                plant_ids = parse_plant_ids(request.form.getlist("plant_ids") + request.form.getlist("remove_id"))
+            except ValueError as e:
+                plant_ids = None
+                flash(f"Error removing plants: {str(e)}")
+            if plant_ids:
+                removed = remove_plants(plant_ids)
+                flash("Plant removed successfully." if removed == 1 else f"{removed} plants removed.")
+            elif plant_ids is not None:
                 flash("No plant ID provided. Please select a plant to remove.")
+        elif "import_csv" in request.form:  # Selection: CSV/TSV upload of new rows
+            upload = request.files.get("plants_file")
+            if not upload or not upload.filename:
+                flash("Choose a CSV file to import.")
+            else:
+                try:
+                    count = import_plants_file(upload)
+                    flash(f"Imported {upload.filename}: {count} plant(s) added or changed.")
+                except ValueError as e:
+                    flash(f"Error importing plants: {str(e)}")
         elif "add_plant" in request.form:  
             # Extract form inputs (Data types: str for all)
             scientific_name = request.form.get("scientific_name")
@@ -470,9 +1006,62 @@ def adminDashboard():
                 flash("Plant added successfully.")
             except ValueError as e:
                 flash(f"Error adding plant: {str(e)}")
+            else:
+                # Selection: thumbnails/WebP/AVIF variants are built by a background job
+                upload_path = images.source_path(image_url)
+                if upload_path:
+                    enqueue_job("image_derivatives", {"path": upload_path})
+                    flash("Image thumbnails are being generated in the background.")
+        return redirect(url_for("adminDashboard", **request.args))
+
+    query = request.args.get("q", "").strip()
+    page = None
+    if query:  # Selection: narrow the list to search matches
+        plants = search.search_plants(query, limit=app.config["SEARCH_MAX_RESULTS"])
+    else:
+        after_id = max(request.args.get("after", 0, type=int), 0)
+        plants = page = db.PlantPage(after_id, app.config["DASHBOARD_PAGE_SIZE"], columns=("id", "scientific_name"))
+    # Flashes are read before streaming starts: the session cookie cannot change once headers are sent
+    messages = get_flashed_messages()
+    return stream_template("dashboard.html", plants=plants, page=page, query=query, messages=messages,
+                           edit_columns=db.BULK_EDIT_COLUMNS)
+
+
+# Route: Batch plant operations API
+# URL: "/api/plants/batch"
+# Method(s): POST
+# Purpose: Remove or edit many plants in one request (scripts, seasonal updates)
+# Inputs: JSON body, one of:
+#           {"delete": [int, ...]}
+#           {"update": {"ids": [int, ...], "changes": {column: str, ...}}}
+# Outputs: JSON {"deleted": int} | {"updated": int}; 401 if not logged in; 400 with {"error": str}
+# Control structures:
+#   - Selection: require admin session; validate operation, ids and columns
+#   - Sequence: one executemany transaction → one cache invalidation
 
-    plants = get_all_plants()  # list[dict]
-    return render_template("dashboard.html", plants=plants)
+
+@app.route("/api/plants/batch", methods=["POST"])
+def api_plants_batch():
+    if not session.get('logged_in'):
+        return jsonify(error="Login required."), 401
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict) or len(body.keys() & {"delete", "update"}) != 1:
+        return jsonify(error="Body must be a JSON object with exactly one of 'delete' or 'update'."), 400
+
+    try:
+        if "delete" in body:
+            if not isinstance(body["delete"], list):
+                raise ValueError("'delete' must be a list of plant ids.")
+            return jsonify(deleted=remove_plants(parse_plant_ids(body["delete"])))
+        update = body["update"]
+        if not isinstance(update, dict) or not isinstance(update.get("ids"), list) \
+                or not isinstance(update.get("changes"), dict):
+            raise ValueError("'update' must be an object with 'ids' (list) and 'changes' (object).")
+        if any(not isinstance(value, str) for value in update["changes"].values()):
+            raise ValueError("Changed values must be strings.")
+        return jsonify(updated=edit_plants(parse_plant_ids(update["ids"]), update["changes"]))
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
 
 
 # Route: Logout
@@ -491,91 +1080,249 @@ def logout():
 
 # Route: Generate plant care summary (PDF)
 # URL: "/generate_summary/<int:plant_id>"
-# Method(s): POST
-# Purpose: Build a PDF in-memory and return as download
+# Method(s): GET, POST
+# Purpose: Return the plant's care summary PDF as a download
 # Inputs: User clicks button on plant details page
 # Outputs: PDF file (BytesIO) with plant care summary
 # Control structures:
 #   - Selection: validate ID; 404 if not found
-#   - Sequence: fetch → compose story → build PDF → return file
+#   - Sequence: fetch → cached PDF → return file
+#   - Selection: GET is conditional (ETag = row hash), so repeat downloads cost a 304
+#   - Sequence: not rendered yet → rendered inline (one page: a few ms); only booklets are
+#     large enough to go through the job queue
 # Data structures/types:
 #   - BytesIO buffer (in-memory file)
-#   - tuple row from DB; accessed by index
-#   - reportlab Flowables: Paragraph, Spacer
+#   - dict plant record from DB; bytes PDF from summaries.py cache
 
 
-@app.route("/generate_summary/<int:plant_id>", methods=["POST"])
+@app.route("/generate_summary/<int:plant_id>", methods=["GET", "POST"])
 def generate_summary(plant_id):
     if not isinstance(plant_id, int) or plant_id <= 0:  # Selection
         return "Invalid plant ID", 400
     
-    conn = sqlite3.connect("plants.db")
-    c = conn.cursor()
-    c.execute("SELECT scientific_name, common_name, flowering_time, height, ecological_function, sunlight, water_level, salt_wind_tolerance, type, planting_space FROM plants WHERE id=?", (plant_id,))
-    plant = c.fetchone()
-    conn.close()
+    plant = db.fetch_plant(plant_id)
 
     if not plant:  # Selection
         return "Plant not found", 404
 
-    buffer = io.BytesIO()  # Data type: in-memory bytes buffer
-    doc = SimpleDocTemplate(buffer)
-    styles = getSampleStyleSheet()
-    story = []  # list of Flowables
+    etag = http_cache.entity_tag("summary", summaries.row_hash(plant))
+    modified = http_cache.last_modified(db.catalogue_state()[1])
+    policy = app.config["CACHE_CONTROL"]["generate_summary"]
+    cached = http_cache.not_modified(etag, modified, policy)
+    if cached is not None:
+        return cached
+
+    pdf = summaries.get_summary(plant)
+    response = send_file(io.BytesIO(pdf), as_attachment=True, download_name=f"{plant['common_name']}_care_summary.pdf",
+                         mimetype="application/pdf", etag=etag, last_modified=modified)
+    response.headers["Cache-Control"] = policy
+    return response
+
+
+# Route: Generate care booklet (PDF, or ZIP of PDF volumes for very large sets)
+# URL: "/generate_booklet"
+# Method(s): POST
+# Purpose: One care booklet for a whole planting list (e.g. every plant on the results page)
+# Inputs: form field plant_ids (repeated int)
+# Outputs: 303 to the job status page (202 JSON for API clients); 400 if no valid ids, 404 if none exist
+# Control structures:
+#   - Iteration: parse ids, check records exist (unknown ids skipped)
+#   - Sequence: queue a booklet job (volumes rendered across the process pool, see jobs.py)
+# Data structures/types:
+#   - list[int] plant ids; list[dict] plant records; bytes document
 
-    story.append(Paragraph(f"<b>{plant[1]} ({plant[0]})</b>", styles["Title"]))
-    story.append(Spacer(1, 12))
-    story.append(Paragraph(f"<b>Flowering Time:</b> {plant[2]}", styles["Normal"]))
-    story.append(Paragraph(f"<b>Height:</b> {plant[3]}", styles["Normal"]))
-    story.append(Paragraph(f"<b>Ecological Function:</b> {plant[4]}", styles["Normal"]))
-    story.append(Paragraph(f"<b>Sunlight:</b> {plant[5]}", styles["Normal"]))
-    story.append(Paragraph(f"<b>Water Level:</b> {plant[6]}", styles["Normal"]))
-    story.append(Paragraph(f"<b>Salt/Wind Tolerance:</b> {plant[7]}", styles["Normal"]))
-    story.append(Paragraph(f"<b>Type:</b> {plant[8]}", styles["Normal"]))
-    story.append(Paragraph(f"<b>Planting Space:</b> {plant[9]}", styles["Normal"]))
 
-    doc.build(story)
-    buffer.seek(0)
+@app.route("/generate_booklet", methods=["POST"])
+def generate_booklet():
+    plant_ids = [int(value) for value in request.form.getlist("plant_ids") if value.isdigit()]
+    if not plant_ids:
+        return "No plant IDs provided", 400
 
-    return send_file(buffer, as_attachment=True, download_name=f"{plant[1]}_care_summary.pdf", mimetype="application/pdf")
+    plant_ids = [plant_id for plant_id in plant_ids if db.fetch_plant(plant_id)]
+    if not plant_ids:
+        return "Plants not found", 404
+
+    return job_accepted(enqueue_job("booklet", {"plant_ids": plant_ids}))
+
+
+# Route: Metrics
+# URL: "/metrics"
+# Method(s): GET
+# Purpose: Prometheus scrape endpoint: request latency, per-phase time (SQL, matching,
+#          templates, PDFs), rows scanned vs matched, cache hit rates
+# Outputs: text/plain exposition format; 404 when app.config["METRICS_ENABLED"] is off
+
+
+@app.route("/metrics")
+def metrics_route():
+    if not app.config["METRICS_ENABLED"]:
+        return "Not found", 404
+    response = make_response(metrics.render())
+    response.headers["Content-Type"] = metrics.CONTENT_TYPE
+    return response
+
+
+# Route: Background job status
+# URL: "/jobs/<job_id>"
+# Method(s): GET
+# Purpose: Poll a queued job (booklet, image derivatives, similar-plants rebuild)
+# Inputs: job_id (str path parameter); ?format=json or Accept: application/json for JSON
+# Outputs: JSON {"id", "kind", "status", "error", "created", "started", "finished", "result_url"}
+#          or an HTML page that polls and starts the download when the job is done; 404 if unknown
+# Control structures:
+#   - Selection: JSON vs HTML; result_url only once a document is available
+
+
+@app.route("/jobs/<job_id>")
+def job_status(job_id):
+    return job_status_response(jobs.get_job(job_id))
+
+
+# Function: job_status_response
+# Purpose: JSON or HTML status for a job record (shared with the async route in asgi.py)
+# Inputs: job (dict from jobs.get_job | None)
+
+
+def job_status_response(job):
+    if job is None:
+        return jsonify(error="Job not found."), 404
+    status = {key: job[key] for key in ("id", "kind", "status", "error", "created", "started", "finished")}
+    status["result_url"] = (url_for("job_result", job_id=job["id"])
+                            if job["status"] == jobs.DONE and job["result_name"] else None)
+    if request.args.get("format") == "json" or request.accept_mimetypes.best == "application/json":
+        return jsonify(status)
+    return render_template("job_status.html", job=status)
+
+
+# Route: Background job result
+# URL: "/jobs/<job_id>/result"
+# Method(s): GET
+# Purpose: Download the document produced by a finished job
+# Outputs: file download; 404 if unknown; 409 with the job status if not finished
+
+
+@app.route("/jobs/<job_id>/result")
+def job_result(job_id):
+    result = jobs.get_result(job_id)
+    if result is None:
+        job = jobs.get_job(job_id)
+        if job is None:
+            return jsonify(error="Job not found."), 404
+        return jsonify(error="Job has no result yet.", status=job["status"]), 409
+    document, mimetype, name = result
+    return send_file(io.BytesIO(document), as_attachment=True, download_name=name, mimetype=mimetype)
+
+
+# Function: warm_up_step
+# Purpose: Register a named per-process setup step (enabled by listing its name in
+#          app.config["WARM_UP"]); create_app runs each once per process and times it
+# Data structures:
+#   - dict name -> function; dict name -> seconds taken (startup report)
+
+_warm_up_steps = {}
+_startup = {"pid": None, "import_seconds": None, "steps": {}}
+
+
+def warm_up_step(name):
+    def register(function):
+        _warm_up_steps[name] = function
+        return function
+    return register
+
+
+# Function: create_app
+# Purpose: Application factory: the configured, warmed-up app for this process
+# Inputs: config (dict | None) overrides applied to app.config before warming up
+# Returns: Flask app (routes live on the module's app, so there is one per process)
+# Control structures:
+#   - Iteration: app.config["WARM_UP"] steps in order, skipping steps already run here
+#   - Selection: a forked worker re-runs every step (its parent's state is not reused)
+
+
+def create_app(config=None):
+    if config:
+        app.config.update(config)
+    if _startup["pid"] != os.getpid():
+        _startup.update(pid=os.getpid(), steps={})
+    for name in app.config["WARM_UP"]:
+        if name not in _startup["steps"]:
+            started = time.perf_counter()
+            _warm_up_steps[name]()
+            _startup["steps"][name] = time.perf_counter() - started
+    app.logger.info("Startup: %s", ", ".join(
+        f"{name} {seconds * 1000:.0f} ms" for name, seconds in startup_report()["phases"].items()))
+    return app
+
+
+# Function: startup_report
+# Purpose: Cold-start cost of this process: module import time and each warm-up step
+# Returns: dict {"phases": {name: seconds}, "total": seconds}
+
+
+def startup_report():
+    phases = {"import": _startup["import_seconds"], **_startup["steps"]}
+    return {"phases": phases, "total": sum(phases.values())}
+
+
+@metrics.collector
+def startup_metrics():
+    yield ("nurserymate_startup_seconds", "gauge", "Time spent importing the app and in each warm-up step.",
+           [({"phase": name}, seconds) for name, seconds in startup_report()["phases"].items()])
+
+
+@warm_up_step("assets")
+def warm_up_assets():
+    build_assets.manifest()  # build bundles whose sources changed (normally a no-op)
+
+
+@warm_up_step("schema")
+def warm_up_schema():
+    init_db()  # create/migrate the schema once, before any request
+
+
+@warm_up_step("index")
+def warm_up_index():
+    get_index()  # compile (or map the shared snapshot of) the recommendation index
+
+
+@warm_up_step("search")
+def warm_up_search():
+    search.load_vocabulary()  # name words and trigrams for typo-tolerant search
+
+
+@warm_up_step("templates")
+def warm_up_templates():
+    for name in app.jinja_env.list_templates():  # Iteration: compile every template now
+        app.jinja_env.get_template(name)
+
+
+@warm_up_step("result_cache")
+def warm_up_result_cache():
+    if app.config["WARM_UP_SURVEYS"]:
+        client = app.test_client()
+        for query in app.config["WARM_UP_SURVEYS"]:  # Iteration: render and cache common surveys
+            client.get("/results", query_string=query)
 
 
 # Function: init_db
 # Purpose: Create plants table if it doesn't exist
 # Control structures:
-#   - Sequence: connect → execute DDL → commit → close
+#   - Sequence: execute DDL in a write transaction (schema lives in db.py)
 # Data structures/types:
 #   - SQLite schema (TEXT columns for categorical/flexible text; height TEXT for unit-suffixed values)
 #   - INTEGER PRIMARY KEY AUTOINCREMENT for unique IDs
 
 
 def init_db():
-    conn = sqlite3.connect('plants.db')
-    c = conn.cursor()
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS plants (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            scientific_name TEXT NOT NULL,
-            common_name TEXT,
-            flowering_time TEXT,
-            height TEXT,
-            ecological_function TEXT,
-            sunlight TEXT,
-            water_level TEXT,
-            salt_wind_tolerance TEXT,
-            type TEXT,
-            planting_space TEXT,
-            image_url TEXT,
-            soil_type TEXT
-        )
-    ''')
-    conn.commit()
-    conn.close()
+    db.init_schema()
 
 
 # App entrypoint
 
 
+_startup["import_seconds"] = time.perf_counter() - _import_started
+
 if __name__ == "__main__":
-    init_db()
+    create_app()
+    jobs.start_workers(app.config["JOB_WORKERS"])
     app.run(debug=True)
@@ -0,0 +1,480 @@
+# Module: asgi
+# Purpose: Async (ASGI) serving mode for NurseryMate
+# Features:
+#   - ASGI 3 application over the Flask app in app.py; serve it with any ASGI server,
+#     e.g. `uvicorn asgi:application --workers 4`, or `python asgi.py`
+#   - Kiosk and mobile routes run as coroutines: /results, /plant/<id>, /search,
+#     /api/recommendations, /generate_summary/<id>, /jobs/<id>, /jobs/<id>/result and
+#     static files. Database reads await the aiodb thread pool; matching, rendering and
+#     file reads await a bounded worker pool; PDFs are awaited from the summaries
+#     process pool. An open connection costs a coroutine, not a thread
+#   - Request bodies are received on the event loop (spooled to a temporary file above
+#     BODY_MEMORY_LIMIT), so slow uploads and slow readers hold no thread
+#   - Every other route (admin, login, forms, batch APIs) runs unchanged as WSGI on the
+#     worker pool and is streamed back from the thread that produced it
+#   - Same hooks, sessions, caching headers and metrics as the WSGI app
+#   - /jobs/<id>?wait=<seconds> long-polls until the job finishes (at most
+#     app.config["ASYNC_JOB_WAIT_MAX"]) instead of the client polling every second
+#   - Lifespan: app.create_app (schema, index, warm-up) and job workers are ready
+#     before the first request
+# Data structures:
+#   - dict endpoint -> coroutine view; WSGI environ dict built from the ASGI scope
+
+import argparse
+import asyncio
+import contextvars
+import functools
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import jsonify, make_response, render_template, request, send_file
+from werkzeug.exceptions import HTTPException
+from werkzeug.wsgi import FileWrapper
+
+import aiodb
+import app as views
+import http_cache
+import images
+import jobs
+import result_cache
+import search
+import summaries
+
+flask_app = views.app
+
+BODY_MEMORY_LIMIT = 1024 * 1024   # larger request bodies are spooled to disk
+FILE_CHUNK_SIZE = 64 * 1024       # bytes per read when streaming files (one worker hop each)
+JOB_POLL_INTERVAL = 0.25          # seconds between job checks while long-polling
+
+_workers = None
+_workers_pid = None
+_workers_lock = threading.Lock()
+
+
+def _get_workers():
+    global _workers, _workers_pid
+    with _workers_lock:
+        if _workers is None or _workers_pid != os.getpid():
+            _workers = ThreadPoolExecutor(max_workers=flask_app.config["ASYNC_WORKER_THREADS"],
+                                          thread_name_prefix="asgi")
+            _workers_pid = os.getpid()
+        return _workers
+
+
+# Function: in_worker
+# Purpose: Await a blocking or CPU-bound call on the worker pool, with the caller's
+#          context (Flask request, metrics) available in the thread
+# Returns: the function's result
+
+
+async def in_worker(function, *args, **kwargs):
+    call = functools.partial(contextvars.copy_context().run, function, *args, **kwargs)
+    return await asyncio.get_running_loop().run_in_executor(_get_workers(), call)
+
+
+# Function: cache_call
+# Purpose: Result cache access: in line for the memory backend, on the database
+#          threads for the shared SQLite backend
+
+
+async def cache_call(cache, method, *args):
+    if isinstance(cache.backend, result_cache.MemoryBackend):
+        return getattr(cache, method)(*args)
+    return await aiodb.run(getattr(cache, method), *args)
+
+
+# Route: Results (async)
+# Purpose: views.results with the catalogue state and cache read on the database
+#          threads and matching + rendering on the worker pool
+
+
+async def results():
+    form_data = views.survey_form(request.args)
+    threshold, top_k = flask_app.config["MATCH_THRESHOLD"], flask_app.config["RESULTS_TOP_K"]
+    key = result_cache.survey_key(form_data, threshold, top_k)
+    version, updated_at = await aiodb.catalogue_state()  # read first: a concurrent write can only make the entry stale
+    derivatives = images.derivatives_state()
+    etag = views.page_etag("results", version, key, derivatives)
+    modified = http_cache.last_modified(updated_at)
+    policy = flask_app.config["CACHE_CONTROL"]["results"]
+    cached = http_cache.not_modified(etag, modified, policy)
+    if cached is not None:
+        return cached
+
+    cache = views.get_result_cache()
+    key = result_cache.page_key(key, derivatives)
+    entry = await cache_call(cache, "get", key, version) if cache is not None else None
+    if entry is not None:
+        html, status = entry.html, "HIT"
+    else:
+        plants, html = await in_worker(_render_results, form_data, threshold, top_k)
+        status = "MISS"
+        if cache is not None:
+            await cache_call(cache, "put", key, version, [p["id"] for p in plants], html)
+    response = make_response(html)
+    if cache is not None:
+        response.headers["X-Cache"] = status
+    return http_cache.apply_validators(response, etag, modified, policy)
+
+
+def _render_results(form_data, threshold, top_k):
+    plants = views.query_plants(form_data, threshold=threshold, top_k=top_k)
+    return plants, render_template("results_final.html", plants=plants)
+
+
+# Route: Plant details (async)
+
+
+async def plant_details(plant_id):
+    plant = await aiodb.fetch_plant(plant_id)
+    if not plant:
+        return await in_worker(render_template, "plant_details.html", plant=plant)
+
+    similar_plants = await aiodb.fetch_similar_plants(plant_id, flask_app.config["SIMILAR_PLANTS_SHOWN"])
+    has_variants = await in_worker(lambda: images.variants_for(plant["image_url"]) is not None)
+    etag = views.page_etag("plant", summaries.row_hash(plant), has_variants, similar_plants)
+    modified = http_cache.last_modified((await aiodb.catalogue_state())[1])
+    policy = flask_app.config["CACHE_CONTROL"]["plant_details"]
+    cached = http_cache.not_modified(etag, modified, policy)
+    if cached is not None:
+        return cached
+    response = make_response(await in_worker(render_template, "plant_details.html", plant=plant,
+                                             similar_plants=similar_plants))
+    return http_cache.apply_validators(response, etag, modified, policy)
+
+
+# Route: Batch recommendations API (async)
+
+
+async def api_recommendations():
+    try:
+        profiles, threshold, top_k = views.parse_recommendation_request(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    return jsonify(await in_worker(views.rank_profiles, profiles, threshold, top_k))
+
+
+# Route: Plant search (async)
+
+
+async def search_route():
+    text = request.args.get("q", "")
+    limit = request.args.get("limit", search.SEARCH_LIMIT, type=int)
+    limit = max(1, min(limit, flask_app.config["SEARCH_MAX_RESULTS"]))
+    return jsonify(query=text, results=await aiodb.run(search.search_plants, text, limit=limit))
+
+
+# Route: Generate plant care summary (async)
+# Purpose: views.generate_summary, except a summary that is not cached yet is rendered
+#          in the process pool and awaited, so no thread waits on ReportLab
+
+
+async def generate_summary(plant_id):
+    if plant_id <= 0:
+        return "Invalid plant ID", 400
+    plant = await aiodb.fetch_plant(plant_id)
+    if not plant:
+        return "Plant not found", 404
+
+    etag = http_cache.entity_tag("summary", summaries.row_hash(plant))
+    modified = http_cache.last_modified((await aiodb.catalogue_state())[1])
+    policy = flask_app.config["CACHE_CONTROL"]["generate_summary"]
+    cached = http_cache.not_modified(etag, modified, policy)
+    if cached is not None:
+        return cached
+
+    pdf = await summaries.get_summary_async(plant)
+    response = send_file(io.BytesIO(pdf), as_attachment=True, download_name=f"{plant['common_name']}_care_summary.pdf",
+                         mimetype="application/pdf", etag=etag, last_modified=modified)
+    response.headers["Cache-Control"] = policy
+    return response
+
+
+# Route: Background job status (async)
+# Inputs: ?wait=<seconds> holds the request until the job finishes or the wait ends
+# Control structures:
+#   - Iteration: re-check the job every JOB_POLL_INTERVAL while it is queued/running
+
+
+async def job_status(job_id):
+    wait = min(request.args.get("wait", 0, type=float), flask_app.config["ASYNC_JOB_WAIT_MAX"])
+    deadline = time.monotonic() + wait
+    job = await aiodb.run(jobs.get_job, job_id)
+    while job is not None and job["status"] in (jobs.QUEUED, jobs.RUNNING) and time.monotonic() < deadline:
+        await asyncio.sleep(JOB_POLL_INTERVAL)
+        job = await aiodb.run(jobs.get_job, job_id)
+    return await in_worker(views.job_status_response, job)
+
+
+# Route: Background job result (async)
+
+
+async def job_result(job_id):
+    result = await aiodb.run(jobs.get_result, job_id)
+    if result is None:
+        job = await aiodb.run(jobs.get_job, job_id)
+        if job is None:
+            return jsonify(error="Job not found."), 404
+        return jsonify(error="Job has no result yet.", status=job["status"]), 409
+    document, mimetype, name = result
+    return send_file(io.BytesIO(document), as_attachment=True, download_name=name, mimetype=mimetype)
+
+
+# Route: Static files (async)
+# Purpose: The static view (precompressed bundles included) on the worker pool; the
+#          file is then streamed in FILE_CHUNK_SIZE reads, so a slow client holds no thread
+
+
+async def static(filename):
+    return await in_worker(views.send_static, filename)
+
+
+# Data structure: Flask endpoint -> coroutine view (same URL rules as the WSGI app)
+ASYNC_VIEWS = {
+    "results": results,
+    "plant_details": plant_details,
+    "api_recommendations": api_recommendations,
+    "search_route": search_route,
+    "generate_summary": generate_summary,
+    "job_status": job_status,
+    "job_result": job_result,
+    "static": static,
+}
+
+
+def file_wrapper(file, buffer_size=8192):
+    return FileWrapper(file, max(buffer_size, FILE_CHUNK_SIZE))
+
+
+# Function: build_environ
+# Purpose: WSGI environ for an ASGI HTTP scope (PEP 3333 string rules)
+# Inputs: scope (dict), body (file object positioned at 0), length (int)
+# Returns: dict
+
+
+def build_environ(scope, body, length):
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1] or 80),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "REMOTE_PORT": str(client[1]),
+        "CONTENT_LENGTH": str(length),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": body,
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+        "wsgi.file_wrapper": file_wrapper,
+    }
+    for name, value in scope.get("headers", ()):
+        name = name.decode("latin-1").upper().replace("-", "_")
+        if name == "CONTENT_LENGTH":
+            continue  # Selection: the body is already buffered; its real length is used
+        key = name if name == "CONTENT_TYPE" else "HTTP_" + name
+        value = value.decode("latin-1")
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+# Function: receive_body
+# Purpose: Read the whole request body without blocking a thread
+# Returns: (file object at position 0, int length); file None if the client went away
+
+
+async def receive_body(receive):
+    body = tempfile.SpooledTemporaryFile(max_size=BODY_MEMORY_LIMIT)
+    length = 0
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            body.close()
+            return None, 0
+        chunk = message.get("body", b"")
+        body.write(chunk)
+        length += len(chunk)
+        if not message.get("more_body"):
+            break
+    body.seek(0)
+    return body, length
+
+
+def _start_message(status, headers):
+    return {
+        "type": "http.response.start",
+        "status": int(str(status).split(" ", 1)[0]),
+        "headers": [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers],
+    }
+
+
+# Function: send_response
+# Purpose: Send a Flask response from a coroutine view
+# Control structures:
+#   - Selection: in-memory bodies are sent directly; files are read on the worker pool
+
+
+async def send_response(send, response, environ):
+    app_iter, status, headers = response.get_wsgi_response(environ)
+    await send(_start_message(status, headers))
+    try:
+        if response.direct_passthrough or not response.is_sequence:
+            chunks = iter(app_iter)
+            while (chunk := await in_worker(next, chunks, None)) is not None:
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        else:
+            for chunk in app_iter:
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+    finally:
+        if hasattr(app_iter, "close"):
+            await in_worker(app_iter.close)
+    await send({"type": "http.response.body", "body": b""})
+
+
+# Function: dispatch_async
+# Purpose: Run a coroutine view inside a Flask request context, with the same
+#          before/after hooks and error handling as Flask.full_dispatch_request
+
+
+async def dispatch_async(view, environ, send):
+    ctx = flask_app.request_context(environ)
+    ctx.push()
+    error = None
+    try:
+        try:
+            try:
+                rv = flask_app.preprocess_request()
+                if rv is None:
+                    rv = await view(**request.view_args)
+            except Exception as e:
+                rv = flask_app.handle_user_exception(e)
+            response = flask_app.finalize_request(rv)
+        except Exception as e:
+            error = e
+            response = flask_app.handle_exception(e)
+        await send_response(send, response, environ)
+    finally:
+        ctx.pop(error)
+
+
+# Function: dispatch_wsgi
+# Purpose: Run the unchanged Flask WSGI app for routes without a coroutine view
+# Control structures:
+#   - Sequence: call and iterate in one worker thread (streamed templates keep their
+#     context), each chunk handed to the event loop and awaited from the thread
+
+
+async def dispatch_wsgi(environ, send):
+    loop = asyncio.get_running_loop()
+
+    def send_from_thread(message):
+        asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+    def run():
+        started = []
+
+        def start_response(status, headers, exc_info=None):
+            started[:] = [status, headers]
+
+        iterable = flask_app.wsgi_app(environ, start_response)
+        try:
+            sent_start = False
+            for chunk in iterable:
+                if not sent_start:
+                    send_from_thread(_start_message(*started))
+                    sent_start = True
+                if chunk:
+                    send_from_thread({"type": "http.response.body", "body": chunk, "more_body": True})
+            if not sent_start:
+                send_from_thread(_start_message(*started))
+        finally:
+            if hasattr(iterable, "close"):
+                iterable.close()
+        send_from_thread({"type": "http.response.body", "body": b""})
+
+    await loop.run_in_executor(_get_workers(), run)
+
+
+# Function: lifespan
+# Purpose: Startup (schema, index, job workers) and shutdown (thread pools) events
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            try:
+                await in_worker(views.create_app)  # schema, index and other warm-up steps
+                jobs.start_workers(flask_app.config["JOB_WORKERS"])
+            except Exception as e:
+                await send({"type": "lifespan.startup.failed", "message": str(e)})
+                return
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            aiodb.shutdown()
+            if _workers is not None:
+                _workers.shutdown(wait=False)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+# Function: application
+# Purpose: ASGI 3 entry point
+# Control structures:
+#   - Selection: coroutine view for the matched endpoint, else the WSGI app
+#     (which also produces 404/405/redirect responses for unmatched URLs)
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await lifespan(receive, send)
+    if scope["type"] != "http":
+        return  # websockets are not served
+
+    body, length = await receive_body(receive)
+    if body is None:
+        return
+    try:
+        environ = build_environ(scope, body, length)
+        try:
+            endpoint, _ = flask_app.url_map.bind_to_environ(environ).match()
+        except HTTPException:
+            endpoint = None
+        view = ASYNC_VIEWS.get(endpoint)
+        if view is not None:
+            await dispatch_async(view, environ, send)
+        else:
+            await dispatch_wsgi(environ, send)
+    finally:
+        body.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve NurseryMate with uvicorn (async mode)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1, help="worker processes")
+    args = parser.parse_args(argv)
+    try:
+        import uvicorn
+    except ImportError:
+        sys.exit("python asgi.py needs uvicorn (pip install uvicorn); "
+                 "any other ASGI server can serve asgi:application")
+    uvicorn.run("asgi:application", host=args.host, port=args.port, workers=args.workers)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,34 @@
+// Select/deselect every plant on the current page
+document.getElementById("select-all").addEventListener("change", function () {
+    for (const box of document.querySelectorAll('input[name="plant_ids"]')) {
+        box.checked = this.checked;
+    }
+});
+
+// Search-as-you-type suggestions from /search (the form still works without JS);
+// the endpoint URL comes from the input's data-search-url attribute
+(function () {
+    const input = document.getElementById("plant-search");
+    const list = document.getElementById("search-suggestions");
+    let timer = null;
+    let latest = 0;
+    input.addEventListener("input", function () {
+        clearTimeout(timer);
+        timer = setTimeout(async function () {
+            const request = ++latest;
+            const q = input.value.trim();
+            if (!q) { list.replaceChildren(); return; }
+            const response = await fetch(input.dataset.searchUrl + "?limit=8&q=" + encodeURIComponent(q));
+            const data = await response.json();
+            if (request !== latest) return;  // a newer keystroke already answered
+            list.replaceChildren(...data.results.map(function (plant) {
+                const item = document.createElement("li");
+                const link = document.createElement("a");
+                link.href = "/plant/" + plant.id;
+                link.textContent = plant.scientific_name + (plant.common_name ? " (" + plant.common_name + ")" : "");
+                item.appendChild(link);
+                return item;
+            }));
+        }, 150);
+    });
+})();
@@ -0,0 +1,29 @@
+// Form validation
+document.querySelector('form').addEventListener('submit', function(e) {
+  let isValid = true;
+  const selects = document.querySelectorAll('select[required]');
+
+  selects.forEach(select => {
+    const errorDiv = document.getElementById(select.id + '_error');
+    if (select.value === '') {
+      errorDiv.style.display = 'block';
+      isValid = false;
+    } else {
+      errorDiv.style.display = 'none';
+    }
+  });
+
+  if (!isValid) {
+    e.preventDefault();
+  }
+});
+
+// Clear error messages on change
+document.querySelectorAll('select').forEach(select => {
+  select.addEventListener('change', function() {
+    const errorDiv = document.getElementById(this.id + '_error');
+    if (errorDiv) {
+      errorDiv.style.display = 'none';
+    }
+  });
+});
@@ -0,0 +1,15 @@
+# Package: benchmarks
+# Purpose: Synthetic catalogues and timing suites for NurseryMate's hot paths
+# Usage (from the repository root):
+#   python -m benchmarks.catalogue 100000 --out plants_100k.tsv   # synthetic supplier list
+#   python -m benchmarks.run --sizes 70 10000 100000 --output bench.json
+#   python -m benchmarks.run --compare benchmarks/baseline.json   # exit 1 on regression
+#   python -m benchmarks.loadtest --ramp 1 2 4 8 16 --duration 30  # find a worker's saturation point
+#   python -m benchmarks.startup --runs 5                         # worker cold-start and import-time report
+#   python -m benchmarks.search_bench --rows 100000               # search p95 and typo recall; exit 1 over limits
+# Baseline: benchmarks/baseline.json is a run.py report for 70, 10,000 and 100,000 plants
+# (default sizes and budget); its "meta" records the commit, Python, SQLite and machine
+# (committed one: 1-CPU x86_64 Linux VM, Intel Xeon, Python 3.11.7, SQLite 3.40.1).
+# Timings only compare on the machine that recorded them: on another host, record one
+# first with `python -m benchmarks.run --output benchmarks/baseline.json` and compare
+# against that (--metric min is steadier on shared hosts).
@@ -0,0 +1,211 @@
+# Module: benchmarks.catalogue
+# Purpose: Realistic synthetic plant catalogues (70 to 1M+ rows) for benchmarks
+# Features:
+#   - Field values drawn from the seed catalogue (import_plants.SEED_DATA) and
+#     recombined, so the free text keeps the formats the normaliser sees in real
+#     supplier lists: "~0.5–1 m", "1-1.15m (h) 1-2m (w)", "Sept-Dec", "Full sun/partial",
+#     "Dry/sandy/loamy, clay", stray spaces, en dash vs hyphen, mixed case
+#   - Unique scientific names (the importer upserts on them)
+#   - Deterministic for a given seed; streamed (only the set of used names is kept)
+#   - Survey profiles drawn from the real survey options, for query benchmarks
+# Data structures:
+#   - dict column -> list of seed values (duplicates kept, so frequencies match the seed)
+#   - dict plant records with import_plants.IMPORT_COLUMNS
+
+import argparse
+import csv
+import json
+import random
+import re
+import sys
+
+import db
+import import_plants
+from recommend import SURVEY_OPTIONS
+
+SEED_PLANTS = import_plants.parse_plant_data(import_plants.SEED_DATA)
+
+MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sept", "Oct", "Nov", "Dec")
+MONTH_SPELLINGS = {"Sept": ("Sept", "Sep"), "Jun": ("Jun", "June"), "Jul": ("Jul", "July")}
+SYLLABLES = ("ca", "la", "ri", "na", "to", "phy", "ce", "ro", "so", "mi", "tha", "ne", "lo", "bu", "da",
+             "ga", "sti", "pa", "me", "ti", "ra", "le", "on", "an", "us", "ia", "eu", "xo", "dro", "ste")
+EPITHET_ENDINGS = ("a", "us", "um", "is", "ata", "ensis", "ifolia", "oides", "ii", "ana")
+RANKS = ("subsp.", "var.")
+
+# Columns sampled (and lightly mangled) straight from the seed
+SAMPLED_COLUMNS = ("sunlight", "water_level", "salt_wind_tolerance", "type", "planting_space")
+
+
+def _pool(column):
+    return [plant[column] for plant in SEED_PLANTS if plant[column]]
+
+
+def _phrases(column, pattern):
+    return [part.strip() for plant in SEED_PLANTS for part in re.split(pattern, plant[column]) if part.strip()]
+
+
+_POOLS = {column: _pool(column) for column in SAMPLED_COLUMNS + ("image_url",)}
+_GENERA = sorted({plant["scientific_name"].split()[0].capitalize() for plant in SEED_PLANTS})
+_COMMON_FIRST = [plant["common_name"].split()[0] for plant in SEED_PLANTS if len(plant["common_name"].split()) > 1]
+_COMMON_LAST = [plant["common_name"].split()[-1] for plant in SEED_PLANTS]
+_FUNCTION_PHRASES = _phrases("ecological_function", r",")
+_SOIL_FIRST = [plant["soil_type"].split(",")[0].strip() for plant in SEED_PLANTS if plant["soil_type"]]
+_SOIL_EXTRA = [part.strip() for plant in SEED_PLANTS for part in plant["soil_type"].split(",")[1:] if part.strip()]
+
+
+# Function: mess
+# Purpose: Apply the kinds of inconsistency found in hand-maintained lists
+# Returns: str
+
+
+def mess(rng, value):
+    roll = rng.random()
+    if roll < 0.08:  # en dash vs hyphen in ranges ("1–3m" / "1-3m")
+        value = re.sub(r"(?<=\d)[–-](?=\d)", rng.choice(("–", "-")), value)
+    elif roll < 0.12:
+        value = value.lower()
+    elif roll < 0.15:
+        value = value.replace("/", " / ")
+    if rng.random() < 0.05:
+        value += " "
+    return value
+
+
+def _word(rng, low, high):
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(low, high)))
+
+
+def _genus(rng):
+    # Half real seed genera (realistic prefix clustering), half invented
+    return rng.choice(_GENERA) if rng.random() < 0.5 else _word(rng, 2, 3).capitalize() + rng.choice(("a", "ia", "us"))
+
+
+def _month(rng, index):
+    name = MONTHS[index % 12]
+    return rng.choice(MONTH_SPELLINGS.get(name, (name,)))
+
+
+def flowering_time(rng):
+    roll = rng.random()
+    if roll < 0.05:
+        return rng.choice(("All year", "All months", "All year "))
+    if roll < 0.08:
+        return ", ".join(_month(rng, i) for i in sorted(rng.sample(range(12), 3)))
+    start = rng.randrange(12)
+    return f"{_month(rng, start)}{rng.choice(('-', '-', '–'))}{_month(rng, start + rng.randint(1, 7))}"
+
+
+def height(rng):
+    low = round(rng.choice((0.05, 0.1, 0.2, 0.3, 0.5, 0.8, 1, 1.5, 2, 3, 5, 8, 10, 15)), 2)
+    high = round(low * rng.choice((1.5, 2, 3)), 2)
+    dash = rng.choice(("–", "-"))
+    formats = (
+        f"~{low}{dash}{high} m",
+        f"{low}{dash}{high}m",
+        f"~{high} m",
+        f"{high}m",
+        f"Up to {high} m",
+        f"{low}{dash}{high} m tall, spreads to ~{high * 2:g} m ",
+        f"{low}{dash}{high}m (h) {low}-{high * 2:g}m (w)",
+        f"~{high} m (Newport Nursery)",
+    )
+    return rng.choice(formats)
+
+
+def ecological_function(rng):
+    parts = rng.sample(_FUNCTION_PHRASES, rng.randint(1, 3))
+    return rng.choice((", ", "/", ", ")).join(dict.fromkeys(parts))
+
+
+def soil_type(rng):
+    parts = [rng.choice(_SOIL_FIRST)] + rng.sample(_SOIL_EXTRA, rng.randint(0, 2))
+    return ", ".join(dict.fromkeys(parts))
+
+
+# Function: generate_plants
+# Purpose: Stream synthetic plant records
+# Inputs: count (int), seed (int)
+# Returns: iterator of dicts (import_plants.IMPORT_COLUMNS)
+# Control structures:
+#   - Iteration: one record per row; retry name generation on (rare) collisions
+
+
+def generate_plants(count, seed=0):
+    rng = random.Random(seed)
+    names = set()
+    for _ in range(count):
+        while True:
+            name = f"{_genus(rng)} {_word(rng, 1, 3)}{rng.choice(EPITHET_ENDINGS)}"
+            if rng.random() < 0.1:
+                name += f" {rng.choice(RANKS)} {_word(rng, 1, 2)}{rng.choice(EPITHET_ENDINGS)}"
+            if name not in names:
+                break
+        names.add(name)
+        plant = {
+            "scientific_name": name,
+            "common_name": mess(rng, f"{rng.choice(_COMMON_FIRST)} {rng.choice(_COMMON_LAST)}"),
+            "flowering_time": flowering_time(rng),
+            "height": height(rng),
+            "ecological_function": mess(rng, ecological_function(rng)),
+            "soil_type": mess(rng, soil_type(rng)),
+            "image_url": rng.choice(_POOLS["image_url"]) if rng.random() < 0.7 else "",
+        }
+        for column in SAMPLED_COLUMNS:
+            plant[column] = mess(rng, rng.choice(_POOLS[column]))
+        yield {column: plant[column] for column in import_plants.IMPORT_COLUMNS}
+
+
+# Function: survey_profiles
+# Purpose: Random survey submissions (each criterion answered with probability 0.7)
+# Returns: list[dict]
+
+
+def survey_profiles(count, seed=0):
+    rng = random.Random(seed)
+    return [
+        {field: rng.choice(options) if rng.random() < 0.7 else None for field, options in SURVEY_OPTIONS.items()}
+        for _ in range(count)
+    ]
+
+
+# Function: write_plants
+# Purpose: Write records as TSV, CSV or JSONL (formats import_plants.py reads)
+# Inputs: plants (iterable of dicts), path (str; format from the extension)
+# Returns: int rows written
+
+
+def write_plants(plants, path):
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            for count, plant in enumerate(plants, start=1):
+                f.write(json.dumps(plant) + "\n")
+            return count
+        writer = csv.DictWriter(f, fieldnames=import_plants.IMPORT_COLUMNS,
+                                delimiter="," if path.endswith(".csv") else "\t")
+        writer.writeheader()
+        for count, plant in enumerate(plants, start=1):
+            writer.writerow(plant)
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic plant catalogue")
+    parser.add_argument("rows", type=int, help="number of plants")
+    parser.add_argument("--seed", type=int, default=0, help="random seed (same seed, same catalogue)")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--out", help="write a .tsv, .csv or .jsonl file")
+    target.add_argument("--db", help="import into this SQLite database (created if missing)")
+    args = parser.parse_args(argv)
+
+    plants = generate_plants(args.rows, args.seed)
+    if args.out:
+        print(f"Wrote {write_plants(plants, args.out)} plants to {args.out}")
+    else:
+        db.DB_PATH = args.db
+        import_plants.import_plants_to_db(plants)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
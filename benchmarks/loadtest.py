@@ -0,0 +1,404 @@
+# Module: benchmarks.loadtest
+# Purpose: End-to-end load harness: replay a realistic traffic mix at a given
+#          concurrency and report throughput and p50/p95/p99 latency per route
+# Features:
+#   - Targets: "inprocess" (Flask test client, no sockets), "server" (the app under
+#     werkzeug's threaded WSGI server on a local port) or --url (any running
+#     deployment, e.g. gunicorn with several workers)
+#   - Local targets get a temporary synthetic catalogue (benchmarks.catalogue);
+#     plants.db is never touched
+#   - Sessions: visitors (survey form → /results → /plant/<id> → sometimes a PDF,
+#     polled through the job queue until it downloads) and admins (dashboard page,
+#     bulk edits, small CSV imports) mixed by weight, so write-lock contention and
+#     PDF CPU spikes show up alongside reads
+#   - --ramp runs several concurrency levels and reports where throughput stops
+#     growing (the worker's saturation point)
+# Data structures:
+#   - dict route label -> list of latencies (seconds) and error count
+#   - list[dict] one summary per concurrency level (JSON output)
+
+import argparse
+import csv
+import http.client
+import io
+import json
+import logging
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from urllib.parse import urlencode, urlsplit
+
+DEFAULT_MIX = "visitor=9,admin=1"
+PDF_SHARE = 0.2            # visitors who download a care summary
+PDF_TIMEOUT = 60.0         # seconds to wait for a queued PDF
+POLL_INTERVAL = 0.25
+PLANT_LINK = re.compile(r'href="/plant/(\d+)"')
+EDITABLE = ("planting_space", "water_level", "sunlight")
+
+
+# Class: TestClientTarget / HttpTarget
+# Purpose: One session's client (cookies kept per session)
+# Method: request(method, path, form=None, files=None) -> (status, headers, body bytes)
+
+
+class TestClientTarget:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, form=None, files=None):
+        data = dict(form or {})
+        for name, (filename, content) in (files or {}).items():
+            data[name] = (io.BytesIO(content), filename)
+        response = self.client.open(path, method=method, data=data or None)
+        return response.status_code, response.headers, response.get_data()
+
+
+class HttpTarget:
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.connection = None
+        self.cookies = {}
+
+    def request(self, method, path, form=None, files=None):
+        headers = {}
+        body = None
+        if files:
+            body, headers["Content-Type"] = multipart(form or {}, files)
+        elif form is not None:
+            body = urlencode(form, doseq=True)
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        if self.cookies:
+            headers["Cookie"] = "; ".join(f"{k}={v}" for k, v in self.cookies.items())
+        for attempt in (1, 2):  # Iteration: reconnect once if the keep-alive connection was closed
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=120)
+            try:
+                self.connection.request(method, path, body=body, headers=headers)
+                response = self.connection.getresponse()
+                data = response.read()
+                break
+            except (http.client.HTTPException, OSError):
+                self.connection.close()
+                self.connection = None
+                if attempt == 2:
+                    raise
+        for header in response.headers.get_all("Set-Cookie") or ():
+            name, _, value = header.split(";", 1)[0].partition("=")
+            self.cookies[name.strip()] = value
+        return response.status, response.headers, data
+
+
+def multipart(form, files):
+    boundary = uuid.uuid4().hex
+    out = io.BytesIO()
+    for name, value in form.items():
+        for item in value if isinstance(value, list) else [value]:
+            out.write(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{item}\r\n'.encode())
+    for name, (filename, content) in files.items():
+        out.write(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                  f"Content-Type: text/csv\r\n\r\n".encode() + content + b"\r\n")
+    out.write(f"--{boundary}--\r\n".encode())
+    return out.getvalue(), f"multipart/form-data; boundary={boundary}"
+
+
+# Class: Recorder
+# Purpose: Thread-safe latency samples per route label
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def add(self, route, seconds, ok):
+        with self._lock:
+            self.samples.setdefault(route, []).append(seconds)
+            if not ok:
+                self.errors[route] = self.errors.get(route, 0) + 1
+
+    def summary(self, elapsed):
+        routes = {}
+        with self._lock:
+            items = sorted(self.samples.items())
+        for route, samples in items:
+            ordered = sorted(samples)
+            routes[route] = {
+                "requests": len(ordered),
+                "errors": self.errors.get(route, 0),
+                "throughput": len(ordered) / elapsed,
+                "p50": percentile(ordered, 50),
+                "p95": percentile(ordered, 95),
+                "p99": percentile(ordered, 99),
+                "max": ordered[-1],
+            }
+        return routes
+
+
+def percentile(ordered, p):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+# Class: Session
+# Purpose: One simulated user; each method is one visit of that kind
+# Control structures:
+#   - Sequence: the pages a real visitor or admin would request, in order
+
+
+class Session:
+    def __init__(self, target, recorder, rng, context):
+        self.target = target
+        self.recorder = recorder
+        self.rng = rng
+        self.context = context
+        self.logged_in = False
+
+    def call(self, route, method, path, form=None, files=None, expect=(200, 302, 303, 304)):
+        started = time.perf_counter()
+        try:
+            status, headers, body = self.target.request(method, path, form, files)
+        except (http.client.HTTPException, OSError):
+            self.recorder.add(route, time.perf_counter() - started, False)
+            return None, {}, b""
+        self.recorder.add(route, time.perf_counter() - started, status in expect)
+        return status, headers, body
+
+    def visitor(self):
+        profile = {k: v for k, v in self.rng.choice(self.context["profiles"]).items() if v}
+        self.call("GET /form", "GET", "/form")
+        _, _, body = self.call("GET /results", "GET", "/results?" + urlencode(profile))
+        ids = PLANT_LINK.findall(body.decode("utf-8", "replace")) or self.context["plant_ids"]
+        plant_id = self.rng.choice(ids)
+        self.call("GET /plant/<id>", "GET", f"/plant/{plant_id}")
+        if self.rng.random() < PDF_SHARE:
+            self.summary_pdf(plant_id)
+
+    def summary_pdf(self, plant_id):
+        started = time.perf_counter()
+        status, headers, _ = self.call("GET /generate_summary/<id>", "GET", f"/generate_summary/{plant_id}")
+        ok = status == 200
+        if status == 303:  # queued: poll the job like the status page does, then download
+            job_url = urlsplit(headers.get("Location", "")).path
+            deadline = time.monotonic() + PDF_TIMEOUT
+            while time.monotonic() < deadline:
+                _, _, body = self.call("GET /jobs/<id>", "GET", job_url + "?format=json")
+                try:
+                    job = json.loads(body or b"{}")
+                except ValueError:
+                    break
+                if job.get("result_url"):
+                    status, _, _ = self.call("GET /jobs/<id>/result", "GET", job["result_url"])
+                    ok = status == 200
+                    break
+                if job.get("status") == "failed":
+                    break
+                time.sleep(POLL_INTERVAL)
+        self.recorder.add("PDF ready (end to end)", time.perf_counter() - started, ok)
+
+    def admin(self):
+        context = self.context
+        if not self.logged_in:
+            self.call("POST /login", "POST", "/login",
+                      {"username": context["username"], "password": context["password"]})
+            self.logged_in = True
+        self.call("GET /adminDashboard", "GET", "/adminDashboard")
+        if self.rng.random() < 0.8:
+            column = self.rng.choice(EDITABLE)
+            ids = self.rng.sample(context["plant_ids"], min(5, len(context["plant_ids"])))
+            self.call("POST /adminDashboard (bulk edit)", "POST", "/adminDashboard",
+                      {"plant_ids": ids, "edit_field": column,
+                       "edit_value": self.rng.choice(context["values"][column]), "bulk_edit": "1"})
+        else:
+            self.call("POST /adminDashboard (CSV import)", "POST", "/adminDashboard",
+                      {"import_csv": "1"}, {"plants_file": ("plants.csv", context["csv"](self.rng))})
+
+
+# Function: run_level
+# Purpose: Drive the target with `concurrency` sessions for `duration` seconds
+# Returns: dict {"concurrency", "elapsed", "requests", "throughput", "routes": {...}}
+# Control structures:
+#   - Iteration: each thread repeats weighted visits until the deadline
+
+
+def run_level(make_target, context, concurrency, duration, mix, think, seed):
+    recorder = Recorder()
+    kinds, weights = zip(*mix.items())
+    deadline = time.monotonic() + duration
+
+    def worker(number):
+        rng = random.Random(seed * 1000 + number)
+        session = Session(make_target(), recorder, rng, context)
+        while time.monotonic() < deadline:
+            getattr(session, rng.choices(kinds, weights)[0])()
+            if think:
+                time.sleep(rng.expovariate(1 / think))
+
+    threads = [threading.Thread(target=worker, args=(n,), daemon=True) for n in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    routes = recorder.summary(elapsed)
+    requests = sum(r["requests"] for route, r in routes.items() if not route.startswith("PDF"))
+    return {"concurrency": concurrency, "elapsed": elapsed, "requests": requests,
+            "throughput": requests / elapsed, "routes": routes}
+
+
+# Function: prepare_local
+# Purpose: Temporary synthetic catalogue + the app, for the inprocess/server targets
+# Returns: Flask app
+# Notes:
+#   - Environment is set before db/app are imported (they read it at import time)
+
+
+def prepare_local(tmp, rows, seed):
+    os.environ["NURSERYMATE_DB"] = os.path.join(tmp, "plants.db")
+    os.environ["NURSERYMATE_JOBS_DB"] = os.path.join(tmp, "jobs.db")
+    import import_plants
+    from benchmarks.catalogue import generate_plants
+
+    import_plants.import_plants_to_db(generate_plants(rows, seed), report=False)
+    import app
+    app.app.config["RESULT_CACHE_PATH"] = os.path.join(tmp, "result_cache.db")
+    app.init_db()
+    return app.app
+
+
+def start_server(app):
+    from werkzeug.serving import make_server
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)  # no per-request access log
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+# Function: build_context
+# Purpose: Shared inputs: survey profiles, plant ids (discovered from /results pages,
+#          so --url targets work too), values for admin edits, CSV rows for imports
+
+
+def build_context(make_target, args):
+    import import_plants
+    from benchmarks.catalogue import generate_plants, survey_profiles
+
+    profiles = survey_profiles(200, args.seed)
+    target = make_target()
+    ids = set()
+    for profile in profiles[:20]:
+        _, _, body = target.request("GET", "/results?" + urlencode({k: v for k, v in profile.items() if v}))
+        ids.update(PLANT_LINK.findall(body.decode("utf-8", "replace")))
+    if not ids:
+        sys.exit("No plants found on /results pages; is the target's catalogue empty?")
+    sample = list(generate_plants(200, args.seed + 1))
+    values = {column: sorted({p[column] for p in sample}) for column in EDITABLE}
+    import_counter = iter(range(1, 10 ** 9))
+    counter_lock = threading.Lock()
+
+    def csv_rows(rng):  # fresh scientific names each time, so imports insert as well as update
+        with counter_lock:
+            batch = next(import_counter)
+        out = io.StringIO()
+        writer = csv.DictWriter(out, fieldnames=import_plants.IMPORT_COLUMNS)
+        writer.writeheader()
+        writer.writerows(generate_plants(20, args.seed + 1000 + batch))
+        return out.getvalue().encode("utf-8")
+
+    return {"profiles": profiles, "plant_ids": sorted(ids), "values": values, "csv": csv_rows,
+            "username": args.admin_user, "password": args.admin_password}
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        kind, _, weight = part.partition("=")
+        if kind.strip() not in ("visitor", "admin"):
+            raise argparse.ArgumentTypeError(f"unknown session kind {kind!r} (use visitor, admin)")
+        mix[kind.strip()] = float(weight or 1)
+    return mix
+
+
+def print_level(level):
+    print(f"\nconcurrency {level['concurrency']}: {level['requests']} requests in {level['elapsed']:.1f}s "
+          f"= {level['throughput']:.1f} req/s", file=sys.stderr)
+    print(f"  {'route':<34} {'reqs':>6} {'err':>4} {'req/s':>7} {'p50':>9} {'p95':>9} {'p99':>9}", file=sys.stderr)
+    for route, r in level["routes"].items():
+        print(f"  {route:<34} {r['requests']:>6} {r['errors']:>4} {r['throughput']:>7.1f} "
+              f"{r['p50'] * 1000:>7.1f}ms {r['p95'] * 1000:>7.1f}ms {r['p99'] * 1000:>7.1f}ms", file=sys.stderr)
+
+
+# Function: saturation_point
+# Purpose: Lowest concurrency after which throughput grows by less than `gain`
+# Returns: int | None (still scaling at the highest level tried)
+
+
+def saturation_point(levels, gain=0.10):
+    for previous, current in zip(levels, levels[1:]):
+        if current["throughput"] < previous["throughput"] * (1 + gain):
+            return previous["concurrency"]
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test NurseryMate with a realistic traffic mix")
+    parser.add_argument("--target", choices=("inprocess", "server"), default="server",
+                        help="run the app in-process (test client) or under a local WSGI server")
+    parser.add_argument("--url", help="load-test an already running deployment instead (e.g. http://127.0.0.1:8000)")
+    parser.add_argument("--rows", type=int, default=10_000, help="synthetic catalogue size (local targets)")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent sessions")
+    parser.add_argument("--ramp", type=int, nargs="+", help="run several concurrency levels, e.g. 1 2 4 8 16")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds per concurrency level")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX), help="session weights")
+    parser.add_argument("--think", type=float, default=0.0, help="mean think time between visits (seconds)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--admin-user", default="admin")
+    parser.add_argument("--admin-password", default="password123")
+    parser.add_argument("--output", help="write the JSON report here")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="nurserymate-load-") as tmp:
+        server = None
+        if args.url:
+            base_url = args.url
+        else:
+            print(f"Building a {args.rows:,}-plant catalogue...", file=sys.stderr)
+            app = prepare_local(tmp, args.rows, args.seed)
+            if args.target == "server":
+                server, base_url = start_server(app)
+        if args.url or server:
+            make_target = lambda: HttpTarget(base_url)  # noqa: E731
+        else:
+            make_target = lambda: TestClientTarget(app)  # noqa: E731
+
+        context = build_context(make_target, args)
+        levels = []
+        for concurrency in args.ramp or [args.concurrency]:
+            level = run_level(make_target, context, concurrency, args.duration, args.mix, args.think, args.seed)
+            print_level(level)
+            levels.append(level)
+        if server is not None:
+            server.shutdown()
+
+    report = {"target": args.url or args.target, "rows": None if args.url else args.rows,
+              "mix": args.mix, "levels": levels}
+    if len(levels) > 1:
+        report["saturation_concurrency"] = saturation_point(levels)
+        point = report["saturation_concurrency"]
+        print(f"\nThroughput stops growing after {point} concurrent sessions" if point
+              else "\nThroughput was still growing at the highest level tried", file=sys.stderr)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,248 @@
+# Module: benchmarks.run
+# Purpose: Time the hot paths on synthetic catalogues and compare against a baseline
+# Features:
+#   - One fresh database per catalogue size, each benchmarked in its own subprocess
+#     (NURSERYMATE_DB points at a temporary file; plants.db is never touched)
+#   - Benchmarks: bulk import, index build (compiled from the database), index map
+#     (opening the shared snapshot file), query_plants (both backends),
+#     get_all_plants, get_plant_by_id, generate_summary (PDF render)
+#   - Each benchmark repeats until it has MIN_RUNS samples and has used its time
+#     budget; reports min / median / p95 / mean seconds
+#   - JSON output; --compare flags benchmarks slower than the baseline by more than
+#     the tolerance (on the median by default; --metric min is steadier on noisy hosts)
+#     and exits with status 1
+# Data structures:
+#   - dict size -> benchmark name -> stats dict
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+DEFAULT_SIZES = (70, 10_000, 100_000)
+MIN_RUNS = 5
+MAX_RUNS = 2000
+TIME_BUDGET = 2.0          # seconds per benchmark (after MIN_RUNS)
+TOLERANCE = 0.10           # compared statistic may be this much slower than the baseline
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# Function: measure
+# Purpose: Repeat a callable and summarise its run times
+# Inputs: function (no arguments), min_runs (int), budget (seconds)
+# Returns: dict {"runs", "min", "median", "p95", "mean"} (seconds)
+# Control structures:
+#   - Iteration: one warm-up call, then run until min_runs and the budget are both met
+
+
+def measure(function, min_runs=MIN_RUNS, budget=TIME_BUDGET):
+    function()
+    samples = []
+    deadline = time.perf_counter() + budget
+    while len(samples) < MAX_RUNS and (len(samples) < min_runs or time.perf_counter() < deadline):
+        started = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - started)
+    return summarise(samples)
+
+
+def summarise(samples):
+    ordered = sorted(samples)
+    return {
+        "runs": len(ordered),
+        "min": ordered[0],
+        "median": statistics.median(ordered),
+        "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        "mean": statistics.fmean(ordered),
+    }
+
+
+# Function: run_size
+# Purpose: Build one synthetic catalogue and run every benchmark against it
+#          (runs in the worker subprocess; NURSERYMATE_DB is already set)
+# Inputs: rows (int), seed (int), budget (seconds per benchmark)
+# Returns: dict benchmark name -> stats
+
+
+def run_size(rows, seed, budget):
+    import db
+    import import_plants
+    from benchmarks.catalogue import generate_plants, survey_profiles
+
+    results = {}
+    started = time.perf_counter()
+    import_plants.import_plants_to_db(generate_plants(rows, seed), report=False)
+    results["bulk_import"] = summarise([time.perf_counter() - started])
+    results["bulk_import"]["rows_per_sec"] = rows / results["bulk_import"]["median"]
+
+    import app
+    import recommend
+    import summaries
+
+    import snapshot
+
+    def index_build():  # compile from the database every time (load_index would map the cached snapshot)
+        return recommend.RecommendationIndex(snapshot.from_bytes(*recommend.compile_catalogue()))
+
+    results["index_build"] = measure(index_build, min_runs=3, budget=budget)
+    results["index_map"] = measure(recommend.load_index, budget=budget)  # a worker opening the shared snapshot
+
+    profiles = itertools.cycle(survey_profiles(100, seed))
+    for backend in ("index", "sql"):
+        app.app.config["RECOMMENDATION_BACKEND"] = backend
+        results[f"query_plants[{backend}]"] = measure(lambda: app.query_plants(next(profiles)), budget=budget)
+
+    results["get_all_plants"] = measure(app.get_all_plants, min_runs=3, budget=budget)
+
+    ids = [row[0] for row in db.get_connection().execute("SELECT id FROM plants")]
+    sample = itertools.cycle(random.Random(seed).sample(ids, min(len(ids), 1000)))
+    results["get_plant_by_id"] = measure(lambda: app.get_plant_by_id(next(sample)), budget=budget)
+
+    plant = app.get_plant_by_id(ids[len(ids) // 2])
+
+    def generate_summary():  # uncached render, as for a first download
+        summaries.invalidate()
+        summaries.get_summary(plant)
+
+    results["generate_summary"] = measure(generate_summary, budget=budget)
+    return results
+
+
+# Function: run_suite
+# Purpose: Run run_size for every size in a subprocess with its own temporary database
+# Returns: dict {"meta": {...}, "results": {str size: {name: stats}}}
+
+
+def run_suite(sizes, seed, budget):
+    report = {"meta": environment(), "results": {}}
+    for rows in sizes:
+        print(f"Benchmarking {rows:,} plants...", file=sys.stderr)
+        with tempfile.TemporaryDirectory(prefix="nurserymate-bench-") as tmp:
+            env = dict(os.environ,
+                       NURSERYMATE_DB=os.path.join(tmp, "plants.db"),
+                       NURSERYMATE_JOBS_DB=os.path.join(tmp, "jobs.db"))
+            completed = subprocess.run(
+                [sys.executable, "-m", "benchmarks.run", "--worker", str(rows), "--seed", str(seed),
+                 "--budget", str(budget)],
+                cwd=REPO_ROOT, env=env, stdout=subprocess.PIPE, check=True, text=True,
+            )
+        report["results"][str(rows)] = json.loads(completed.stdout)
+    return report
+
+
+# Function: cpu_model
+# Purpose: CPU model name for the report, so baselines from different machines are not mixed up
+# Returns: str | None
+
+
+def cpu_model():
+    try:
+        with open("/proc/cpuinfo", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:  # not Linux
+        pass
+    return platform.processor() or None
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "cpu": cpu_model(),
+        "cpus": os.cpu_count(),
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+# Function: compare
+# Purpose: One statistic of every benchmark against the baseline
+# Inputs: report, baseline (same shape), tolerance (fraction), metric ("median", "min", ...)
+# Returns: list[dict] {"size", "benchmark", "baseline", "current", "ratio", "status"}
+# Control structures:
+#   - Selection: status "regression" / "improvement" / "ok" / "new" (no baseline value)
+
+
+def compare(report, baseline, tolerance=TOLERANCE, metric="median"):
+    rows = []
+    for size, benchmarks in report["results"].items():
+        for name, stats in benchmarks.items():
+            base = baseline.get("results", {}).get(size, {}).get(name)
+            row = {"size": size, "benchmark": name, "baseline": None, "current": stats[metric],
+                   "ratio": None, "status": "new"}
+            if base:
+                ratio = stats[metric] / base[metric] if base[metric] else float("inf")
+                status = "regression" if ratio > 1 + tolerance else "improvement" if ratio < 1 - tolerance else "ok"
+                row.update(baseline=base[metric], ratio=ratio, status=status)
+            rows.append(row)
+    return rows
+
+
+def print_table(report, comparison=None):
+    print(f"{'size':>9}  {'benchmark':<22} {'median':>11} {'p95':>11} {'runs':>6}"
+          + ("  vs baseline" if comparison else ""), file=sys.stderr)
+    statuses = {(row["size"], row["benchmark"]): row for row in comparison or ()}
+    for size, benchmarks in report["results"].items():
+        for name, stats in benchmarks.items():
+            line = (f"{int(size):>9,}  {name:<22} {stats['median'] * 1000:>9.3f}ms {stats['p95'] * 1000:>9.3f}ms"
+                    f" {stats['runs']:>6}")
+            row = statuses.get((size, name))
+            if row and row["ratio"] is not None:
+                line += f"  {row['ratio']:.2f}x {row['status']}"
+            elif row:
+                line += "  (new)"
+            print(line, file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark NurseryMate hot paths on synthetic catalogues")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="catalogue sizes (rows)")
+    parser.add_argument("--seed", type=int, default=0, help="catalogue and query seed")
+    parser.add_argument("--budget", type=float, default=TIME_BUDGET, help="seconds per benchmark")
+    parser.add_argument("--output", help="write the JSON report here (default: stdout)")
+    parser.add_argument("--compare", metavar="BASELINE", help="baseline JSON report; exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="allowed slowdown (0.10 = 10%%)")
+    parser.add_argument("--metric", choices=("median", "min", "p95", "mean"), default="median",
+                        help="statistic compared against the baseline")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker is not None:  # Selection: subprocess for one size
+        json.dump(run_size(args.worker, args.seed, args.budget), sys.stdout)
+        return 0
+
+    report = run_suite(args.sizes, args.seed, args.budget)
+    comparison = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            comparison = compare(report, json.load(f), args.tolerance, args.metric)
+        report["comparison"] = comparison
+    print_table(report, comparison)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 1 if comparison and any(row["status"] == "regression" for row in comparison) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
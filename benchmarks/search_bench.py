@@ -0,0 +1,166 @@
+# Module: benchmarks.search_bench
+# Purpose: Search latency and typo recall on a large synthetic catalogue, checked
+#          against limits
+# Features:
+#   - A fresh synthetic catalogue (100,000 plants by default) searched in a subprocess
+#     (NURSERYMATE_DB points at a temporary file; plants.db is never touched)
+#   - Typo queries: full scientific names with one letter substituted; recall is the share
+#     whose plant is among the results
+#   - Prefix queries: the leading letters of each word of a name ("acac dealb")
+#   - Each query is timed REPEATS times and its fastest run kept (steadier on noisy hosts);
+#     the name vocabulary is loaded first, as the app's warm-up does, and timed separately
+#   - Exits with status 1 when either query set's p95 is over --max-p95 or typo recall is
+#     under --min-recall
+# Data structures:
+#   - list[(str query, int plant id)] per query set; dict report (JSON)
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.run import REPO_ROOT, environment, summarise
+
+DEFAULT_ROWS = 100_000
+QUERIES = 200              # queries per set
+REPEATS = 3                # timed runs per query (the fastest is kept)
+MAX_P95 = 10.0             # milliseconds, per query set
+MIN_RECALL = 0.95          # typo queries whose plant is found
+
+
+# Function: misspell
+# Purpose: A name with one letter replaced by a different one
+# Returns: str
+
+
+def misspell(rng, name):
+    position = rng.choice([i for i, letter in enumerate(name) if letter.isalpha()])
+    letter = rng.choice([c for c in "abcdefghijklmnopqrstuvwxyz" if c != name[position].lower()])
+    return name[:position] + letter + name[position + 1:]
+
+
+# Function: abbreviate
+# Purpose: The leading letters (at least three) of every word of a name
+# Returns: str
+
+
+def abbreviate(rng, name):
+    return " ".join(word[:rng.randint(min(3, len(word)), len(word))] for word in name.split())
+
+
+# Function: time_queries
+# Purpose: Fastest of `repeats` runs of each query, and how many found their plant
+# Inputs: cases (list[(query, plant id)]), repeats (int)
+# Returns: dict stats (seconds, see benchmarks.run.summarise) plus "max" and "recall"
+
+
+def time_queries(cases, repeats):
+    import search
+
+    fastest = [float("inf")] * len(cases)
+    found = 0
+    for attempt in range(repeats):  # Iteration: whole passes, so a slow moment hits one run of many queries
+        for i, (query, plant_id) in enumerate(cases):
+            started = time.perf_counter()
+            results = search.search_plants(query)
+            fastest[i] = min(fastest[i], time.perf_counter() - started)
+            if attempt == 0:
+                found += any(result["id"] == plant_id for result in results)
+    return dict(summarise(fastest), max=max(fastest), recall=found / len(cases))
+
+
+# Function: run_worker
+# Purpose: Build the catalogue and time both query sets (runs in the worker subprocess;
+#          NURSERYMATE_DB is already set)
+# Inputs: rows (int), seed (int), queries (int), repeats (int)
+# Returns: dict {"rows", "vocabulary_words", "vocabulary_seconds", "typo", "prefix"}
+
+
+def run_worker(rows, seed, queries, repeats):
+    import db
+    import import_plants
+    import search
+    from benchmarks.catalogue import generate_plants
+
+    db.init_schema()
+    import_plants.import_plants_to_db(generate_plants(rows, seed), report=False)
+    started = time.perf_counter()
+    words = search.load_vocabulary()
+    report = {"rows": rows, "vocabulary_words": words, "vocabulary_seconds": time.perf_counter() - started}
+
+    plants = db.get_connection().execute("SELECT id, scientific_name FROM plants ORDER BY id").fetchall()
+    rng = random.Random(seed)
+    sample = rng.sample(plants, min(queries, len(plants)))
+    report["typo"] = time_queries([(misspell(rng, name), plant_id) for plant_id, name in sample], repeats)
+    report["prefix"] = time_queries([(abbreviate(rng, name), plant_id) for plant_id, name in sample], repeats)
+    return report
+
+
+# Function: check
+# Purpose: The limits a report breaks
+# Returns: list[str] (empty when every limit is met)
+
+
+def check(report, max_p95, min_recall):
+    failures = []
+    for name in ("typo", "prefix"):
+        if report[name]["p95"] * 1000 > max_p95:
+            failures.append(f"{name} p95 {report[name]['p95'] * 1000:.2f} ms is over {max_p95:g} ms")
+    if report["typo"]["recall"] < min_recall:
+        failures.append(f"typo recall {report['typo']['recall']:.1%} is under {min_recall:.0%}")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search latency and typo recall on a synthetic catalogue")
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS, help="catalogue size")
+    parser.add_argument("--seed", type=int, default=0, help="catalogue and query seed")
+    parser.add_argument("--queries", type=int, default=QUERIES, help="queries per set")
+    parser.add_argument("--repeats", type=int, default=REPEATS, help="timed runs per query (fastest kept)")
+    parser.add_argument("--max-p95", type=float, default=MAX_P95, help="p95 limit per query set (ms)")
+    parser.add_argument("--min-recall", type=float, default=MIN_RECALL, help="typo recall floor (0.95 = 95%%)")
+    parser.add_argument("--output", help="write the JSON report here (default: stdout)")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:  # Selection: subprocess with its own database
+        json.dump(run_worker(args.rows, args.seed, args.queries, args.repeats), sys.stdout)
+        return 0
+
+    print(f"Building {args.rows:,} plants...", file=sys.stderr)
+    with tempfile.TemporaryDirectory(prefix="nurserymate-bench-") as tmp:
+        env = dict(os.environ,
+                   NURSERYMATE_DB=os.path.join(tmp, "plants.db"),
+                   NURSERYMATE_JOBS_DB=os.path.join(tmp, "jobs.db"))
+        completed = subprocess.run(
+            [sys.executable, "-m", "benchmarks.search_bench", "--worker", "--rows", str(args.rows),
+             "--seed", str(args.seed), "--queries", str(args.queries), "--repeats", str(args.repeats)],
+            cwd=REPO_ROOT, env=env, stdout=subprocess.PIPE, check=True, text=True,
+        )
+    report = {"meta": environment(), **json.loads(completed.stdout)}
+    report["failures"] = check(report, args.max_p95, args.min_recall)
+
+    print(f"vocabulary: {report['vocabulary_words']:,} words loaded in {report['vocabulary_seconds'] * 1000:.0f} ms",
+          file=sys.stderr)
+    for name in ("typo", "prefix"):
+        stats = report[name]
+        print(f"{name:<7} median {stats['median'] * 1000:6.2f} ms  p95 {stats['p95'] * 1000:6.2f} ms  "
+              f"max {stats['max'] * 1000:6.2f} ms  recall {stats['recall']:.1%}", file=sys.stderr)
+    for failure in report["failures"]:
+        print(f"FAIL: {failure}", file=sys.stderr)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 1 if report["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
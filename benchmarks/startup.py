@@ -0,0 +1,118 @@
+# Module: benchmarks.startup
+# Purpose: Cold-start report: how long a fresh worker process takes to import the app
+#          and run its warm-up steps, and which imports cost the most
+# Features:
+#   - Every run is a new interpreter (python -X importtime) on a temporary copy of the
+#     catalogue (or a synthetic one with --rows); plants.db is never touched
+#   - The first run builds the shared index snapshot; later runs map it, as a worker
+#     scaled up next to running ones would
+#   - Reports import time, each create_app warm-up step and the slowest modules
+#     imported by app.py (cumulative, including their own imports)
+# Data structures:
+#   - dict phase -> list of seconds per run; list of (module, seconds)
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.run import REPO_ROOT
+
+WORKER = "import json, app; app.create_app(); print(json.dumps(app.startup_report()))"
+
+
+# Function: parse_importtime
+# Purpose: Modules imported directly by app.py, slowest first
+# Inputs: stderr of python -X importtime
+# Returns: list[(str module, float cumulative seconds)]
+# Control structures:
+#   - Iteration: lines are printed children first, so a module's direct imports are the
+#     one-level-deeper lines collected since the previous line at its own depth
+
+
+def parse_importtime(text):
+    pending = []  # (depth, module, cumulative) not yet claimed by a parent
+    for line in text.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue  # header line
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        module = name.strip()
+        if module == "app" and depth == 0:
+            children = [(m, c / 1e6) for d, m, c in pending if d == 1]
+            return sorted(children, key=lambda item: item[1], reverse=True)
+        pending = [entry for entry in pending if entry[0] <= depth]
+        pending.append((depth, module, int(cumulative)))
+    return []
+
+
+# Function: run_once
+# Purpose: One cold start in a fresh interpreter
+# Returns: (dict startup_report, list modules)
+
+
+def run_once(env):
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", WORKER], cwd=REPO_ROOT, env=env,
+                               capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout.strip().splitlines()[-1]), parse_importtime(completed.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure NurseryMate worker cold-start time")
+    parser.add_argument("--runs", type=int, default=5, help="fresh processes to start")
+    parser.add_argument("--rows", type=int, help="synthetic catalogue size (default: a copy of plants.db)")
+    parser.add_argument("--top", type=int, default=12, help="slowest imports to list")
+    parser.add_argument("--output", help="write the JSON report here")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="nurserymate-startup-") as tmp:
+        db_path = os.path.join(tmp, "plants.db")
+        env = dict(os.environ, NURSERYMATE_DB=db_path, NURSERYMATE_JOBS_DB=os.path.join(tmp, "jobs.db"))
+        if args.rows:
+            subprocess.run([sys.executable, "-m", "benchmarks.catalogue", str(args.rows), "--db", db_path],
+                           cwd=REPO_ROOT, env=env, check=True, stdout=subprocess.DEVNULL)
+        else:
+            shutil.copyfile(os.path.join(REPO_ROOT, "plants.db"), db_path)
+
+        phases, modules = {}, {}
+        for number in range(args.runs):
+            report, imports = run_once(env)
+            for name, seconds in report["phases"].items():
+                phases.setdefault(name, []).append(seconds)
+            phases.setdefault("total", []).append(report["total"])
+            for module, seconds in imports:
+                modules.setdefault(module, []).append(seconds)
+            print(f"run {number + 1}: {report['total'] * 1000:.0f} ms", file=sys.stderr)
+
+    result = {
+        "runs": args.runs,
+        "first_run": {name: values[0] for name, values in phases.items()},
+        "median": {name: statistics.median(values) for name, values in phases.items()},
+        "imports": sorted(((module, statistics.median(values)) for module, values in modules.items()),
+                          key=lambda item: item[1], reverse=True)[:args.top],
+    }
+    print(f"{'phase':<14} {'first run':>10} {'median':>10}", file=sys.stderr)
+    for name in result["median"]:
+        print(f"{name:<14} {result['first_run'][name] * 1000:>8.1f}ms {result['median'][name] * 1000:>8.1f}ms",
+              file=sys.stderr)
+    print("slowest imports (cumulative, median):", file=sys.stderr)
+    for module, seconds in result["imports"]:
+        print(f"  {module:<24} {seconds * 1000:>8.1f}ms", file=sys.stderr)
+
+    text = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
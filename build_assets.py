@@ -0,0 +1,203 @@
+# Module: build_assets
+# Purpose: Asset build step: minified, content-hashed, precompressed CSS/JS bundles
+# Features:
+#   - Sources in assets/css and assets/js, one bundle per file; templates link them
+#     with asset_url("survey.css") (pages link their layout bundle, then their own)
+#   - Minified: comments and insignificant whitespace removed (JS conservatively:
+#     comment-only lines and indentation; no renaming)
+#   - Written as static/dist/<name>.<hash>.<ext> plus .gz and .br variants (brotli
+#     when the module is installed) for the static view to send precompressed;
+#     the hash changes with the content, so the files are cached as immutable
+#   - static/dist/manifest.json maps bundle name -> file; outputs of the previous
+#     build are kept so pages still cached by browsers find their styles
+#   - Rebuilt when a source changed (app warm-up step / first use), or by hand:
+#       python build_assets.py [--force]
+# Data structures:
+#   - manifest dict {"version": str, "sources": {name: hash}, "assets": {name: filename},
+#                    "previous": [filename, ...]}
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+
+try:
+    import brotli
+except ImportError:  # .br variants are skipped; clients get gzip
+    brotli = None
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SOURCE_DIRS = (os.path.join(ROOT, "assets", "css"), os.path.join(ROOT, "assets", "js"))
+DIST_PREFIX = "dist/"                    # static-relative directory of built files
+DIST_DIR = os.path.join(ROOT, "static", "dist")
+MANIFEST_PATH = os.path.join(DIST_DIR, "manifest.json")
+
+# Precompressed variants in order of preference: Content-Encoding -> file suffix
+ENCODINGS = {"br": ".br", "gzip": ".gz"}
+
+_STRING_OR_COMMENT = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')|/\*.*?\*/', re.S)
+
+_manifest = None
+_manifest_lock = threading.Lock()
+
+
+# Function: minify_css
+# Purpose: Remove comments and whitespace that does not change how CSS parses
+# Returns: str
+# Control structures:
+#   - Iteration: string literals are copied verbatim, everything between them squeezed
+
+
+def minify_css(text):
+    parts = []
+    position = 0
+    for match in _STRING_OR_COMMENT.finditer(text):
+        parts.append(_squeeze_css(text[position:match.start()]))
+        parts.append(match.group(1) or "")  # comments are dropped
+        position = match.end()
+    parts.append(_squeeze_css(text[position:]))
+    return "".join(parts).replace(";}", "}").strip()
+
+
+def _squeeze_css(text):
+    text = re.sub(r"\s+", " ", text)
+    text = re.sub(r"\s*([{};,>])\s*", r"\1", text)
+    return re.sub(r":\s+", ":", text)  # never before ":" (".a :hover" differs from ".a:hover")
+
+
+def minify_js(text):
+    lines = (line.strip() for line in text.splitlines())
+    return "\n".join(line for line in lines if line and not line.startswith("//")) + "\n"
+
+
+MINIFIERS = {".css": minify_css, ".js": minify_js}
+
+
+def _sources():
+    return sorted(
+        (name, os.path.join(directory, name))
+        for directory in SOURCE_DIRS if os.path.isdir(directory)
+        for name in os.listdir(directory) if os.path.splitext(name)[1] in MINIFIERS
+    )
+
+
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def _write_atomic(path, data):
+    fd, tmp = tempfile.mkstemp(prefix=".asset-", dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def read_manifest():
+    try:
+        with open(MANIFEST_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+# Function: build
+# Purpose: Build every bundle whose source changed (all of them with force)
+# Returns: dict manifest
+# Control structures:
+#   - Selection: up to date (same source hashes) → return the existing manifest
+#   - Iteration: minify → hash → write file, .gz and .br → manifest → prune old outputs
+
+
+def build(force=False):
+    sources = {}
+    for name, path in _sources():
+        with open(path, "rb") as f:
+            sources[name] = f.read()
+    hashes = {name: _digest(data) for name, data in sources.items()}
+    current = read_manifest()
+    if not force and current is not None and current.get("sources") == hashes:
+        return current
+
+    os.makedirs(DIST_DIR, exist_ok=True)
+    assets = {}
+    for name, data in sources.items():
+        stem, extension = os.path.splitext(name)
+        output = MINIFIERS[extension](data.decode("utf-8")).encode("utf-8")
+        filename = f"{stem}.{_digest(output)}{extension}"
+        path = os.path.join(DIST_DIR, filename)
+        _write_atomic(path, output)
+        _write_atomic(path + ENCODINGS["gzip"], gzip.compress(output, compresslevel=9, mtime=0))
+        if brotli is not None:
+            _write_atomic(path + ENCODINGS["br"], brotli.compress(output, quality=11))
+        assets[name] = filename
+
+    previous = sorted(set((current or {}).get("assets", {}).values()) - set(assets.values()))
+    manifest = {
+        "version": _digest(json.dumps(assets, sort_keys=True).encode("utf-8")),
+        "sources": hashes,
+        "assets": assets,
+        "previous": previous,
+    }
+    _write_atomic(MANIFEST_PATH, json.dumps(manifest, indent=2, sort_keys=True).encode("utf-8"))
+
+    keep = set(assets.values()) | set(previous)
+    for name in os.listdir(DIST_DIR):  # Iteration: drop outputs older than the previous build
+        base = name
+        for suffix in ENCODINGS.values():
+            base = base[:-len(suffix)] if base.endswith(suffix) else base
+        if name != os.path.basename(MANIFEST_PATH) and not name.startswith(".") and base not in keep:
+            os.remove(os.path.join(DIST_DIR, name))
+    return manifest
+
+
+# Function: manifest
+# Purpose: The manifest for this process, building first if the sources changed
+# Inputs: reload (bool) re-check the sources (debug mode: edits show up without a restart)
+# Returns: dict manifest
+
+
+def manifest(reload=False):
+    global _manifest
+    with _manifest_lock:
+        if _manifest is None or reload:
+            _manifest = build()
+        return _manifest
+
+
+# Function: asset_path
+# Purpose: Static-relative path of a bundle, e.g. "survey.css" -> "dist/survey.1a2b3c4d5e6f.css"
+# Returns: str (KeyError for an unknown bundle)
+
+
+def asset_path(name, reload=False):
+    return DIST_PREFIX + manifest(reload)["assets"][name]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build minified, hashed and precompressed CSS/JS bundles")
+    parser.add_argument("--force", action="store_true", help="rebuild even if no source changed")
+    args = parser.parse_args(argv)
+
+    result = build(force=args.force)
+    for name, filename in sorted(result["assets"].items()):
+        path = os.path.join(DIST_DIR, filename)
+        sizes = [os.path.getsize(path + suffix) for suffix in ("", ".gz", ".br") if os.path.exists(path + suffix)]
+        print(f"{name:<20} -> {DIST_PREFIX}{filename} ({' / '.join(f'{size:,}' for size in sizes)} bytes)")
+    if brotli is None:
+        print("brotli is not installed: no .br variants (pip install brotli)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,715 @@
+# Module: db
+# Purpose: Shared data-access layer for plants.db
+# Features:
+#   - One pooled connection per thread (re-opened after fork), reused across requests
+#   - WAL journal and tuned pragmas so readers never block the admin writer
+#   - Writes wrapped in BEGIN IMMEDIATE transactions with a busy timeout
+#     (avoids "database is locked" when a read transaction tries to upgrade)
+#   - Fixed SQL strings so sqlite3's per-connection statement cache reuses
+#     the prepared statements
+#   - Rows mapped through sqlite3.Row to plain dicts
+#   - Free-text attributes normalised into canonical columns on every write
+#     (see normalise.py); schema migrated once per process on first connection
+#   - FTS5 search tables maintained by triggers (see search.py)
+#   - "Similar plants" neighbour table brought up to date after every write, computed
+#     outside the write transaction and stored in a short one (see similar.py)
+#   - Change log for catalogue copies: every row carries the catalogue version that last
+#     changed it, deleted rows leave a tombstone (triggers + bump_catalogue_version), so
+#     iter_changes can return just what changed since a client's version
+#   - Exports stream records from one read transaction (iter_plants), never as one list
+#   - Statement count and execute/fetch time recorded for /metrics (see metrics.py)
+# Data structures:
+#   - threading.local (per-thread connection), dict plant records
+
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import metrics
+import normalise
+import similar
+
+DB_PATH = os.environ.get("NURSERYMATE_DB", "plants.db")
+
+# Columns of the plants table, in schema order
+PLANT_COLUMNS = (
+    "id", "scientific_name", "common_name", "flowering_time", "height",
+    "ecological_function", "sunlight", "water_level", "salt_wind_tolerance",
+    "type", "planting_space", "image_url", "soil_type",
+)
+
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",    # durable with WAL, no fsync per commit
+    "PRAGMA cache_size = -16000",     # 16 MB page cache per connection
+    "PRAGMA mmap_size = 268435456",   # read pages through a 256 MB memory map
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA busy_timeout = 5000",     # wait up to 5 s for the writer lock
+)
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS plants (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        scientific_name TEXT NOT NULL,
+        common_name TEXT,
+        flowering_time TEXT,
+        height TEXT,
+        ecological_function TEXT,
+        sunlight TEXT,
+        water_level TEXT,
+        salt_wind_tolerance TEXT,
+        type TEXT,
+        planting_space TEXT,
+        image_url TEXT,
+        soil_type TEXT
+    )
+'''
+
+# Canonical columns derived from the free-text ones at write time
+NORMALISED_COLUMNS = tuple(name for name, _ in normalise.NORMALISED_COLUMNS)
+
+# Change tracking: catalogue version and UNIX time of a row's last change, set by
+# bump_catalogue_version (NULL until the writing transaction bumps the version)
+CHANGE_COLUMNS = (("changed_version", "INTEGER"), ("changed_at", "INTEGER"))
+
+# Columns written on insert: the free-text attributes followed by their normalised forms
+WRITE_COLUMNS = PLANT_COLUMNS[1:] + NORMALISED_COLUMNS
+
+SELECT_PLANTS = "SELECT " + ", ".join(PLANT_COLUMNS) + " FROM plants ORDER BY id"
+SELECT_PLANT = "SELECT " + ", ".join(PLANT_COLUMNS) + " FROM plants WHERE id = ?"
+INSERT_PLANT = (
+    "INSERT INTO plants (" + ", ".join(WRITE_COLUMNS) + ") VALUES ("
+    + ", ".join("?" * len(WRITE_COLUMNS)) + ")"
+)
+DELETE_PLANT = "DELETE FROM plants WHERE id = ?"
+SELECT_SIMILAR_PLANTS = (
+    "SELECT p.id, p.scientific_name, p.common_name, p.image_url, s.score FROM similar_plants s "
+    "JOIN plants p ON p.id = s.similar_id WHERE s.plant_id = ? ORDER BY s.score DESC, s.similar_id LIMIT ?"
+)
+
+# Columns that may be bulk-edited across many plants (scientific_name is unique and
+# image_url is managed through uploads, so neither can be set on a batch)
+BULK_EDIT_COLUMNS = tuple(c for c in PLANT_COLUMNS if c not in ("id", "scientific_name", "image_url"))
+
+# Upper bound on ids per "IN (...)" lookup (SQLite's host parameter limit)
+MAX_IN_PARAMETERS = 500
+
+# Catalogue version: a counter bumped in the same transaction as every write to
+# plants, so derived data (e.g. the survey result cache) can tell it is stale
+# (updated_at: UNIX time of the last change, used for HTTP Last-Modified)
+CATALOGUE_VERSION_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS catalogue_version (id INTEGER PRIMARY KEY CHECK (id = 1), "
+    "version INTEGER NOT NULL, updated_at INTEGER NOT NULL DEFAULT 0)"
+)
+SELECT_CATALOGUE_VERSION = "SELECT version, updated_at FROM catalogue_version WHERE id = 1"
+BUMP_CATALOGUE_VERSION = (
+    "UPDATE catalogue_version SET version = version + 1, "
+    "updated_at = CAST(strftime('%s', 'now') AS INTEGER) WHERE id = 1"
+)
+
+# Change log. Inserted rows start unstamped (changed_version NULL); the triggers unstamp
+# rows whose content really changed (an import re-sending identical rows changes
+# nothing) and record deleted ids; the version bump then stamps them all. Ids are never
+# reused (AUTOINCREMENT), so a tombstone is final.
+TOMBSTONE_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS plant_tombstones (plant_id INTEGER PRIMARY KEY, "
+    "scientific_name TEXT, version INTEGER, deleted_at INTEGER)"
+)
+CHANGE_LOG_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_plants_changed_version ON plants (changed_version)",
+    "CREATE INDEX IF NOT EXISTS idx_plant_tombstones_version ON plant_tombstones (version)",
+)
+CHANGE_LOG_TRIGGERS = (
+    "CREATE TRIGGER IF NOT EXISTS plants_changed AFTER UPDATE OF " + ", ".join(PLANT_COLUMNS[1:])
+    + " ON plants WHEN " + " OR ".join(f"old.{c} IS NOT new.{c}" for c in PLANT_COLUMNS[1:])
+    + " BEGIN UPDATE plants SET changed_version = NULL WHERE id = new.id; END",
+    "CREATE TRIGGER IF NOT EXISTS plants_deleted AFTER DELETE ON plants BEGIN "
+    "INSERT OR REPLACE INTO plant_tombstones (plant_id, scientific_name, version, deleted_at) "
+    "VALUES (old.id, old.scientific_name, NULL, NULL); END",
+)
+STAMP_CHANGES = (
+    "UPDATE plants SET (changed_version, changed_at) = "
+    "(SELECT version, updated_at FROM catalogue_version WHERE id = 1) WHERE changed_version IS NULL",
+    "UPDATE plant_tombstones SET (version, deleted_at) = "
+    "(SELECT version, updated_at FROM catalogue_version WHERE id = 1) WHERE version IS NULL",
+)
+SELECT_CHANGED_PLANTS = (
+    "SELECT " + ", ".join(PLANT_COLUMNS) + ", changed_version, changed_at FROM plants "
+    "WHERE changed_version > ? ORDER BY changed_version, id"
+)
+SELECT_TOMBSTONES = (
+    "SELECT plant_id, scientific_name, version, deleted_at FROM plant_tombstones "
+    "WHERE version > ? ORDER BY version, plant_id"
+)
+
+
+# Class: TimedCursor / TimedConnection
+# Purpose: sqlite3 connection and cursor that report statement time to metrics.py
+# Notes:
+#   - Connection.execute does not go through an overridden cursor(), so it is routed here
+#   - fetchone/fetchmany/fetchall are timed too (SQLite does most of the work while
+#     stepping); rows consumed by plain iteration are attributed to the caller
+
+
+class TimedCursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            metrics.observe_sql(time.perf_counter() - started)
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            metrics.observe_sql(time.perf_counter() - started)
+
+    def fetchone(self):
+        started = time.perf_counter()
+        try:
+            return super().fetchone()
+        finally:
+            metrics.observe_sql(time.perf_counter() - started, statement=False)
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        try:
+            return super().fetchmany(self.arraysize if size is None else size)
+        finally:
+            metrics.observe_sql(time.perf_counter() - started, statement=False)
+
+    def fetchall(self):
+        started = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            metrics.observe_sql(time.perf_counter() - started, statement=False)
+
+
+class TimedConnection(sqlite3.Connection):
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+# Function: connect
+# Purpose: Open a new tuned connection (autocommit; transactions are explicit)
+# Returns: sqlite3.Connection with sqlite3.Row row factory
+
+
+def connect(db_path=None, **kwargs):
+    kwargs.setdefault("factory", TimedConnection)
+    conn = sqlite3.connect(db_path or DB_PATH, isolation_level=None, cached_statements=128, **kwargs)
+    conn.row_factory = sqlite3.Row
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+_local = threading.local()
+_schema_ready = {}  # database path -> schema checked in this process
+
+
+# Function: get_connection
+# Purpose: Return this thread's pooled connection, opening it on first use
+# Control structures:
+#   - Selection: reconnect if missing or inherited from a parent process (fork)
+
+
+def get_connection():
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.pid != os.getpid():
+        conn = connect()
+        _local.conn = conn
+        _local.pid = os.getpid()
+        if not _schema_ready.get(DB_PATH):
+            _schema_ready[DB_PATH] = True
+            init_schema()
+    return conn
+
+
+# Function: close_connection
+# Purpose: Close this thread's pooled connection (e.g. at worker shutdown)
+
+
+def close_connection():
+    conn = getattr(_local, "conn", None)
+    if conn is not None and _local.pid == os.getpid():
+        conn.close()
+    _local.conn = None
+
+
+# Function: write_transaction
+# Purpose: Context manager for one write transaction on the pooled connection
+# Control structures:
+#   - Sequence: BEGIN IMMEDIATE → body → COMMIT (ROLLBACK on exception)
+
+
+@contextmanager
+def write_transaction():
+    conn = get_connection()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+# Function: read_transaction
+# Purpose: Context manager for one read transaction (a consistent snapshot) on the pooled connection
+
+
+@contextmanager
+def read_transaction():
+    conn = get_connection()
+    conn.execute("BEGIN")
+    try:
+        yield conn
+    finally:
+        conn.execute("COMMIT")
+
+
+# Migration: scientific_name becomes unique so imports can upsert. Older
+# databases may hold duplicates from repeated imports; the oldest row is kept.
+DEDUPLICATE_PLANTS = (
+    "DELETE FROM plants WHERE id NOT IN (SELECT MIN(id) FROM plants GROUP BY scientific_name)"
+)
+UNIQUE_SCIENTIFIC_NAME = (
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_plants_scientific_name ON plants (scientific_name)"
+)
+
+# Full-text search tables (search.py): external-content FTS5 tables over plants,
+# kept in sync by triggers so every write path updates them in its own transaction.
+SEARCH_COLUMNS = ("scientific_name", "common_name", "ecological_function", "soil_type")
+
+
+def _search_trigger_sql(table, columns):
+    names = ", ".join(columns)
+    new = ", ".join(f"new.{c}" for c in columns)
+    old = ", ".join(f"old.{c}" for c in columns)
+    delete = f"INSERT INTO {table} ({table}, rowid, {names}) VALUES ('delete', old.id, {old});"
+    insert = f"INSERT INTO {table} (rowid, {names}) VALUES (new.id, {new});"
+    return (
+        f"CREATE TRIGGER IF NOT EXISTS {table}_ai AFTER INSERT ON plants BEGIN {insert} END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_ad AFTER DELETE ON plants BEGIN {delete} END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_au AFTER UPDATE OF {names} ON plants BEGIN {delete} {insert} END",
+    )
+
+
+SEARCH_TABLES = (
+    ("plants_fts",
+     "CREATE VIRTUAL TABLE plants_fts USING fts5(" + ", ".join(SEARCH_COLUMNS) + ", content='plants', "
+     "content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='1 2 3')",
+     _search_trigger_sql("plants_fts", SEARCH_COLUMNS)),
+)
+
+# Migration: typo search used to read a trigram FTS table over the names; it now
+# keeps the name vocabulary in memory (search.py), so the table and its triggers go.
+DROP_TRIGRAM_SEARCH = (
+    "DROP TRIGGER IF EXISTS plants_trigram_ai",
+    "DROP TRIGGER IF EXISTS plants_trigram_ad",
+    "DROP TRIGGER IF EXISTS plants_trigram_au",
+    "DROP TABLE IF EXISTS plants_trigram_vocab",
+    "DROP TABLE IF EXISTS plants_trigram",
+)
+
+
+# Function: init_search
+# Purpose: Create the FTS5 search tables and their sync triggers, building new indexes
+#          from the existing rows
+# Control structures:
+#   - Iteration: per search table; rebuild only when the table was just created
+#   - Selection: skip silently if this SQLite build has no FTS5 (search.py falls back to LIKE)
+
+
+def init_search(conn):
+    for statement in DROP_TRIGRAM_SEARCH:
+        conn.execute(statement)
+    for table, create_sql, triggers in SEARCH_TABLES:
+        exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()
+        if not exists:
+            try:
+                conn.execute(create_sql)
+            except sqlite3.OperationalError:  # no such module: fts5
+                continue
+            conn.execute(f"INSERT INTO {table} ({table}) VALUES ('rebuild')")
+        for trigger in triggers:
+            conn.execute(trigger)
+
+
+# Function: normalised_values
+# Purpose: Normalised column values for a plant, in NORMALISED_COLUMNS order
+# Returns: list
+
+
+def normalised_values(plant):
+    values = normalise.normalise_plant(plant)
+    return [values[column] for column in NORMALISED_COLUMNS]
+
+
+# Function: init_schema
+# Purpose: Create/migrate the plants table and its indexes
+# Control structures:
+#   - Selection: add missing normalised and change-tracking columns
+#   - Selection: deduplicate only when the unique index is missing
+#   - Selection: backfill rows that lack normalised values / a change version
+#   - Iteration: one secondary index per normalised mask column
+#   - Sequence: full-text search tables and triggers (init_search), similar-plants table,
+#     then similar plants synced (built here for a new, small catalogue)
+# Data structures:
+#   - set of existing column names (PRAGMA table_info)
+
+
+def init_schema():
+    with write_transaction() as conn:
+        conn.execute(SCHEMA)
+        has_unique = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_plants_scientific_name'"
+        ).fetchone()
+        conn.execute(CATALOGUE_VERSION_SCHEMA)
+        if "updated_at" not in {row["name"] for row in conn.execute("PRAGMA table_info(catalogue_version)")}:
+            conn.execute("ALTER TABLE catalogue_version ADD COLUMN updated_at INTEGER NOT NULL DEFAULT 0")
+        conn.execute(
+            "INSERT OR IGNORE INTO catalogue_version (id, version, updated_at) "
+            "VALUES (1, 0, CAST(strftime('%s', 'now') AS INTEGER))"
+        )
+        existing = {row["name"] for row in conn.execute("PRAGMA table_info(plants)")}
+        for name, sql_type in normalise.NORMALISED_COLUMNS + CHANGE_COLUMNS:
+            if name not in existing:
+                conn.execute(f"ALTER TABLE plants ADD COLUMN {name} {sql_type}")
+        conn.execute(TOMBSTONE_SCHEMA)
+        for statement in CHANGE_LOG_INDEXES + CHANGE_LOG_TRIGGERS:
+            conn.execute(statement)
+
+        if not has_unique:
+            conn.execute(DEDUPLICATE_PLANTS)
+            conn.execute(UNIQUE_SCIENTIFIC_NAME)
+            bump_catalogue_version(conn)
+
+        # Secondary indexes for the SQL survey path (query_builder.py)
+        for column in normalise.MASK_COLUMNS.values():
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_plants_{column} ON plants ({column})")
+
+        pending = conn.execute(
+            "SELECT " + ", ".join(PLANT_COLUMNS) + " FROM plants WHERE sunlight_mask IS NULL"
+        ).fetchall()
+        conn.executemany(
+            "UPDATE plants SET " + ", ".join(f"{c} = ?" for c in NORMALISED_COLUMNS) + " WHERE id = ?",
+            [normalised_values(dict(row)) + [row["id"]] for row in pending],
+        )
+        init_search(conn)
+        # Rows from before change tracking: published as changed in a new version
+        if conn.execute("SELECT 1 FROM plants WHERE changed_version IS NULL LIMIT 1").fetchone():
+            bump_catalogue_version(conn)
+        similar.init(conn)
+    sync_similar_plants()
+
+
+# Function: catalogue_version
+# Purpose: Current catalogue version (changes whenever plants are added, removed or imported)
+# Returns: int
+
+
+def catalogue_version():
+    return catalogue_state()[0]
+
+
+# Function: catalogue_state
+# Purpose: Catalogue version and the time it last changed
+# Returns: (int version, int UNIX timestamp; 0 if unknown)
+
+
+def catalogue_state():
+    row = get_connection().execute(SELECT_CATALOGUE_VERSION).fetchone()
+    return row[0], row[1]
+
+
+# Function: bump_catalogue_version
+# Purpose: Mark the catalogue as changed; call inside the write transaction that changes it,
+#          after its writes (rows and tombstones written so far get the new version)
+
+
+def bump_catalogue_version(conn):
+    conn.execute(BUMP_CATALOGUE_VERSION)
+    for statement in STAMP_CHANGES:
+        conn.execute(statement)
+
+
+# Function: fetch_plants
+# Purpose: All plant records in id order
+# Returns: list[dict]
+
+
+def fetch_plants():
+    return [dict(row) for row in get_connection().execute(SELECT_PLANTS)]
+
+
+# Class: PlantPage
+# Purpose: One keyset-paginated page of plants, read lazily row by row
+# Inputs: after_id (int, last id of the previous page; 0 for the first page),
+#         limit (int page size), columns (subset of PLANT_COLUMNS; "id" always included)
+# Data structures:
+#   - iterator of dict rows (projected columns only); memory stays flat whatever the
+#     catalogue size, since rows are never collected into a list
+#   - has_more (bool) and last_id (int | None), valid once iteration has finished
+# Notes:
+#   - "WHERE id > ? ORDER BY id LIMIT ?" seeks on the primary key, so every page costs
+#     the same (unlike OFFSET, which scans all preceding rows)
+
+
+class PlantPage:
+    def __init__(self, after_id=0, limit=100, columns=PLANT_COLUMNS):
+        unknown = set(columns) - set(PLANT_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown plant columns: {sorted(unknown)}")
+        self.columns = ("id",) + tuple(c for c in columns if c != "id")
+        self.after_id = after_id
+        self.limit = limit
+        self.has_more = False
+        self.last_id = None
+
+    def __iter__(self):
+        sql = "SELECT " + ", ".join(self.columns) + " FROM plants WHERE id > ? ORDER BY id LIMIT ?"
+        # One extra row tells whether a next page exists without a COUNT(*)
+        cursor = get_connection().execute(sql, (self.after_id, self.limit + 1))
+        for count, row in enumerate(cursor):
+            if count == self.limit:
+                self.has_more = True
+                break
+            self.last_id = row["id"]
+            yield dict(row)
+        cursor.close()
+
+
+# Function: fetch_plant
+# Purpose: One plant record by id
+# Returns: dict | None
+
+
+def fetch_plant(plant_id):
+    row = get_connection().execute(SELECT_PLANT, (plant_id,)).fetchone()
+    return dict(row) if row else None
+
+
+# Function: iter_changes
+# Purpose: What changed in the catalogue after a given version, read in one transaction
+# Inputs: since (int, catalogue version the caller already has; 0 = everything)
+# Returns: generator of (kind, dict):
+#   - first ("version", {"version", "updated_at"}): the version the changes lead to
+#   - then ("upsert", plant record + changed_version, changed_at), oldest change first
+#   - then ("delete", {"plant_id", "scientific_name", "version", "deleted_at"})
+# Notes:
+#   - Rows are read lazily from the cursors; the read transaction stays open until the
+#     generator is exhausted or closed, so the records always match the version
+
+
+def iter_changes(since=0):
+    conn = get_connection()
+    owns_transaction = not conn.in_transaction
+    if owns_transaction:
+        conn.execute("BEGIN")
+    try:
+        version, updated_at = conn.execute(SELECT_CATALOGUE_VERSION).fetchone()
+        yield "version", {"version": version, "updated_at": updated_at}
+        for row in conn.execute(SELECT_CHANGED_PLANTS, (since,)):
+            yield "upsert", dict(row)
+        for row in conn.execute(SELECT_TOMBSTONES, (since,)):
+            yield "delete", dict(row)
+    finally:
+        if owns_transaction:
+            conn.execute("COMMIT")
+
+
+# Function: iter_plants
+# Purpose: Plant records streamed from one read transaction, for exports of any size
+# Inputs: plant_ids (iterable of int, optional; None = the whole catalogue in id order)
+# Returns: generator of dict plant records; with plant_ids, in the given order
+#          (ids that no longer exist are skipped)
+# Notes:
+#   - The whole catalogue is one cursor stepped row by row; given ids are read
+#     MAX_IN_PARAMETERS at a time. Either way memory stays flat, and the read
+#     transaction (a consistent snapshot) lasts until the generator is exhausted or closed
+
+
+def iter_plants(plant_ids=None):
+    conn = get_connection()
+    owns_transaction = not conn.in_transaction
+    if owns_transaction:
+        conn.execute("BEGIN")
+    try:
+        if plant_ids is None:
+            for row in conn.execute(SELECT_PLANTS):
+                yield dict(row)
+            return
+        plant_ids = list(plant_ids)
+        for start in range(0, len(plant_ids), MAX_IN_PARAMETERS):
+            chunk = plant_ids[start:start + MAX_IN_PARAMETERS]
+            sql = ("SELECT " + ", ".join(PLANT_COLUMNS) + " FROM plants WHERE id IN ("
+                   + ", ".join("?" * len(chunk)) + ")")
+            rows = {row["id"]: row for row in conn.execute(sql, chunk)}
+            for plant_id in chunk:  # Iteration: restore the caller's order
+                if plant_id in rows:
+                    yield dict(rows[plant_id])
+    finally:
+        if owns_transaction:
+            conn.execute("COMMIT")
+
+
+# Function: insert_plant
+# Purpose: Insert one plant record (dict keyed by column name, id excluded),
+#          storing its normalised columns alongside the free text
+# Returns: int id of the new row
+
+
+def insert_plant(plant):
+    values = [plant[column] for column in PLANT_COLUMNS[1:]] + normalised_values(plant)
+    with write_transaction() as conn:
+        cursor = conn.execute(INSERT_PLANT, values)
+        bump_catalogue_version(conn)
+    sync_similar_plants()
+    return cursor.lastrowid
+
+
+# Function: delete_plant
+# Purpose: Delete one plant by id
+
+
+def delete_plant(plant_id):
+    with write_transaction() as conn:
+        conn.execute(DELETE_PLANT, (plant_id,))
+        bump_catalogue_version(conn)
+    sync_similar_plants()
+
+
+# Function: delete_plants
+# Purpose: Delete many plants in one transaction (one executemany, one version bump)
+# Inputs: plant_ids (iterable of int; unknown ids are ignored)
+# Returns: int number of plants deleted
+
+
+def delete_plants(plant_ids):
+    plant_ids = list(plant_ids)
+    with write_transaction() as conn:
+        cursor = conn.executemany(DELETE_PLANT, [(plant_id,) for plant_id in plant_ids])
+        if cursor.rowcount:
+            bump_catalogue_version(conn)
+    if cursor.rowcount:
+        sync_similar_plants()
+    return cursor.rowcount
+
+
+# Function: update_plants
+# Purpose: Set the same field values on many plants in one transaction, re-deriving
+#          each row's normalised columns from its updated text
+# Inputs: plant_ids (iterable of int), changes (dict column -> str, keys from BULK_EDIT_COLUMNS)
+# Returns: int number of plants updated
+# Control structures:
+#   - Selection: ValueError for columns that cannot be bulk-edited
+#   - Iteration: current rows read in chunks of MAX_IN_PARAMETERS ids, merged with the changes
+#   - Sequence: one executemany UPDATE → one version bump → commit → similar plants synced
+
+
+def update_plants(plant_ids, changes):
+    invalid = set(changes) - set(BULK_EDIT_COLUMNS)
+    if invalid or not changes:
+        raise ValueError(f"Cannot bulk-edit columns: {sorted(invalid) or 'none given'}")
+    columns = [c for c in BULK_EDIT_COLUMNS if c in changes]
+    sql = ("UPDATE plants SET " + ", ".join(f"{c} = ?" for c in columns + list(NORMALISED_COLUMNS))
+           + " WHERE id = ?")
+    plant_ids = list(dict.fromkeys(plant_ids))
+    with write_transaction() as conn:
+        updates = []
+        for start in range(0, len(plant_ids), MAX_IN_PARAMETERS):
+            chunk = plant_ids[start:start + MAX_IN_PARAMETERS]
+            rows = conn.execute(
+                "SELECT " + ", ".join(PLANT_COLUMNS) + " FROM plants WHERE id IN ("
+                + ", ".join("?" * len(chunk)) + ")", chunk
+            )
+            for row in rows:
+                plant = dict(row, **changes)
+                updates.append([changes[c] for c in columns] + normalised_values(plant) + [plant["id"]])
+        conn.executemany(sql, updates)
+        if updates:
+            bump_catalogue_version(conn)
+    if updates:
+        sync_similar_plants()
+    return len(updates)
+
+
+# Function: fetch_similar_plants
+# Purpose: Precomputed substitutes for one plant, most similar first (see similar.py)
+# Inputs: plant_id (int), limit (int)
+# Returns: list[dict] with keys 'id', 'scientific_name', 'common_name', 'image_url', 'score'
+
+
+def fetch_similar_plants(plant_id, limit=similar.SIMILAR_COUNT):
+    rows = get_connection().execute(SELECT_SIMILAR_PLANTS, (plant_id, limit))
+    return [dict(row) for row in rows]
+
+
+# Function: sync_similar_plants
+# Purpose: Bring the similar plants up to date with the catalogue; called after every
+#          write, once its transaction has committed
+# Inputs: rebuild (bool: rebuild a stale table right away while the catalogue is small)
+# Control structures:
+#   - Iteration: up to similar.SYNC_ATTEMPTS rounds of compute (read transaction, no
+#     lock) → write (short write transaction; skipped if another process synced first)
+#   - Selection: stale table and at most similar.REBUILD_MAX plants → rebuild now;
+#     larger catalogues wait for the background job / import CLI
+
+
+def sync_similar_plants(rebuild=True):
+    for _ in range(similar.SYNC_ATTEMPTS):
+        with read_transaction() as conn:
+            update = similar.prepare(conn)
+        if update is None:
+            break
+        with write_transaction() as conn:
+            similar.apply(conn, update)
+    if rebuild and similar_plants_stale():
+        if get_connection().execute("SELECT COUNT(*) FROM plants").fetchone()[0] <= similar.REBUILD_MAX:
+            rebuild_similar_plants()
+
+
+# Function: rebuild_similar_plants
+# Purpose: Recompute every plant's neighbours (after a bulk import left them stale)
+# Returns: int number of plants indexed; None if a rebuild started later took over
+# Control structures:
+#   - Sequence: encode the catalogue (read transaction) → compute every list with no
+#     transaction open → write them to similar_plants_next, one short write transaction
+#     per batch → swap it in (short write) → sync the plants changed meanwhile
+# Notes:
+#   - Pages keep reading the previous lists until the swap; the write lock is only held
+#     for one batch at a time, so admin writes go through during a long rebuild
+
+
+def rebuild_similar_plants():
+    builder = os.urandom(8).hex()
+    with read_transaction() as conn:
+        version, ids, vectors = similar.load(conn)
+    with write_transaction() as conn:
+        similar.start_rebuild(conn, builder)
+    for rows in similar.rebuild_batches(ids, vectors):
+        with write_transaction() as conn:
+            if not similar.write_rebuild(conn, builder, rows):
+                return None
+    with write_transaction() as conn:
+        if not similar.finish_rebuild(conn, builder, version):
+            return None
+    sync_similar_plants(rebuild=False)
+    return len(ids)
+
+
+def similar_plants_stale():
+    return similar.is_stale(get_connection())
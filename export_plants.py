@@ -0,0 +1,180 @@
+# Module: export_plants
+# Purpose: Streaming export of the catalogue and of survey results, as CSV or JSON lines
+# Features:
+#   - Rows read lazily from one read transaction (db.iter_plants) and serialised into
+#     chunks of about CHUNK_BYTES, so memory stays flat whatever the catalogue size:
+#     no list of every plant is ever built (unlike db.fetch_plants)
+#   - Survey results: ranked ids from the recommendation index, full records read in
+#     rank order with a rank and score column
+#   - CSV header cells are the plants column names, so a catalogue export re-imports
+#     with import_plants.py (the extra id column is ignored)
+#   - Optional gzip, compressed on the fly one chunk at a time
+#   - Served by the /export routes in app.py; from the command line:
+#       python export_plants.py catalogue -o plants.csv.gz
+#       python export_plants.py results "sunlight=Full sun&type=Shrub or tree" --format jsonl
+# Data structures:
+#   - generators of dict rows -> generators of str chunks -> generators of bytes
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import zlib
+from urllib.parse import parse_qs
+
+import db
+
+# Export format -> media type
+FORMATS = {"csv": "text/csv", "jsonl": "application/x-ndjson"}
+
+CATALOGUE_COLUMNS = db.PLANT_COLUMNS
+RESULT_COLUMNS = ("rank", "score") + db.PLANT_COLUMNS
+
+CHUNK_BYTES = 64 * 1024   # serialised text collected before a chunk is sent
+GZIP_LEVEL = 6            # zlib level: most of level 9's ratio at a fraction of the CPU
+SCORE_DECIMALS = 4
+
+
+# Function: catalogue_rows
+# Purpose: Every plant record, in id order
+# Returns: generator of dict (CATALOGUE_COLUMNS)
+
+
+def catalogue_rows():
+    return db.iter_plants()
+
+
+# Function: result_rows
+# Purpose: Full records of ranked survey matches, best first
+# Inputs: ranked (list[dict] with id and score, as from recommend index rank / app.query_plants)
+# Returns: generator of dict (RESULT_COLUMNS); plants deleted since ranking are skipped
+
+
+def result_rows(ranked):
+    scores = {plant["id"]: plant["score"] for plant in ranked}
+    for rank, plant in enumerate(db.iter_plants(scores), 1):
+        yield dict(plant, rank=rank, score=round(scores[plant["id"]], SCORE_DECIMALS))
+
+
+# Function: csv_chunks
+# Purpose: Serialise rows as CSV (header first), CHUNK_BYTES at a time
+# Returns: generator of str
+
+
+def csv_chunks(rows, columns):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore", lineterminator="\r\n")
+    writer.writeheader()
+    for row in rows:  # Iteration: flush whenever the buffer passes CHUNK_BYTES
+        writer.writerow(row)
+        if buffer.tell() >= CHUNK_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+# Function: jsonl_chunks
+# Purpose: Serialise rows as compact JSON lines (columns in order), CHUNK_BYTES at a time
+# Returns: generator of str
+
+
+def jsonl_chunks(rows, columns):
+    lines = []
+    size = 0
+    for row in rows:
+        line = json.dumps({column: row[column] for column in columns}, separators=(",", ":"), ensure_ascii=False)
+        lines.append(line)
+        size += len(line) + 1
+        if size >= CHUNK_BYTES:
+            yield "\n".join(lines) + "\n"
+            lines.clear()
+            size = 0
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+SERIALISERS = {"csv": csv_chunks, "jsonl": jsonl_chunks}
+
+
+# Function: stream
+# Purpose: Encoded export body, ready for a chunked response or a file
+# Inputs: rows (iterable of dict), fmt (key of FORMATS), columns (tuple), compress (bool: gzip)
+# Returns: generator of bytes
+# Control structures:
+#   - Selection: gzip through one zlib stream (wbits 31 = gzip container) or plain UTF-8
+# Notes:
+#   - Closing the generator (client gone) closes the row generator and ends its read transaction
+
+
+def stream(rows, fmt, columns, compress=False):
+    chunks = SERIALISERS[fmt](rows, columns)
+    try:
+        if not compress:
+            for chunk in chunks:
+                yield chunk.encode("utf-8")
+            return
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+        for chunk in chunks:
+            data = compressor.compress(chunk.encode("utf-8"))
+            if data:  # zlib buffers small inputs; send nothing until it has output
+                yield data
+        yield compressor.flush()
+    finally:
+        chunks.close()
+        if hasattr(rows, "close"):
+            rows.close()
+
+
+# Function: survey_query
+# Purpose: Survey answers from a /results-style query string ("sunlight=Full sun&type=Shrub")
+# Returns: dict criterion -> str | None (unknown keys ignored, like app.survey_form)
+
+
+def survey_query(text):
+    from recommend import SURVEY_OPTIONS
+    values = parse_qs(text.lstrip("?"))
+    return {criterion: values[criterion][0] if criterion in values else None for criterion in SURVEY_OPTIONS}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the plant catalogue or survey results as CSV or JSON lines")
+    parser.add_argument("what", choices=("catalogue", "results"), help="what to export")
+    parser.add_argument("query", nargs="?", default="", help="results: survey answers as a /results query string")
+    parser.add_argument("--format", choices=sorted(FORMATS), help="default: from the output file name, else csv")
+    parser.add_argument("--gzip", action="store_true", help="gzip the output (default for a .gz output file)")
+    parser.add_argument("-o", "--output", help="output file (default: stdout)")
+    parser.add_argument("--threshold", type=float, help="results: minimum match ratio (default: the site's)")
+    parser.add_argument("--top-k", type=int, help="results: keep the best N matches only")
+    args = parser.parse_args(argv)
+
+    name = args.output or ""
+    compress = args.gzip or name.endswith(".gz")
+    if name.endswith(".gz"):
+        name = name[:-3]
+    fmt = args.format or ("jsonl" if name.endswith(".jsonl") else "csv")
+
+    if args.what == "catalogue":
+        rows, columns = catalogue_rows(), CATALOGUE_COLUMNS
+    else:
+        from recommend import MATCH_THRESHOLD, get_index
+        threshold = MATCH_THRESHOLD if args.threshold is None else args.threshold
+        ranked = get_index().rank(survey_query(args.query), threshold=threshold, top_k=args.top_k)
+        rows, columns = result_rows(ranked), RESULT_COLUMNS
+
+    output = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for data in stream(rows, fmt, columns, compress=compress):
+            output.write(data)
+    finally:
+        if args.output:
+            output.close()
+    if args.output:
+        print(f"Exported {args.what} to {args.output} ({os.path.getsize(args.output):,} bytes)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+# Module: http_cache
+# Purpose: HTTP validators (ETag / Last-Modified), 304 handling and static-file fingerprints
+# Features:
+#   - Entity tags derived from whatever a response depends on (catalogue version,
+#     plant row hash, build id), checked before any rendering work is done
+#   - Build id: content hash of the templates and stylesheet, so a deploy that
+#     changes page markup never gets a 304 for the old page
+#   - Content fingerprints for static files (url_for("static", ...) adds ?v=<hash>);
+#     a URL whose fingerprint matches the file is safe to cache forever
+# Data structures:
+#   - dict (path, mtime_ns, size) -> content hash
+#   - str entity tags, datetime Last-Modified values
+
+import hashlib
+import os
+from datetime import datetime, timezone
+
+from flask import make_response, request
+from werkzeug.http import is_resource_modified
+
+import images
+
+# Static paths whose names are already content-addressed (images.generate_derivatives,
+# build_assets.py)
+FINGERPRINTED_PREFIXES = ("images/derived/", "dist/")
+
+_fingerprints = {}   # (path, mtime_ns, size) -> content hash
+_build_id = None
+
+
+# Function: entity_tag
+# Purpose: Opaque ETag value for a response built from the given parts
+# Returns: str (unquoted)
+
+
+def entity_tag(*parts):
+    return hashlib.sha256("\x1f".join(map(str, parts)).encode("utf-8")).hexdigest()[:24]
+
+
+# Function: last_modified
+# Purpose: Last-Modified value from a UNIX timestamp
+# Returns: datetime (UTC) | None when the time is unknown (0)
+
+
+def last_modified(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc) if timestamp else None
+
+
+# Function: apply_validators
+# Purpose: Attach ETag, Last-Modified and Cache-Control headers to a response
+# Returns: the same response
+
+
+def apply_validators(response, etag, modified=None, cache_control=None):
+    response.set_etag(etag)
+    if modified is not None:
+        response.last_modified = modified
+    if cache_control:
+        response.headers["Cache-Control"] = cache_control
+    return response
+
+
+# Function: not_modified
+# Purpose: 304 response when the client's cached copy is still current
+# Inputs: etag (str), modified (datetime | None), cache_control (str | None)
+# Returns: Response (304) | None (caller must build the full response)
+# Control structures:
+#   - Selection: If-None-Match wins over If-Modified-Since (RFC 9110)
+
+
+def not_modified(etag, modified=None, cache_control=None):
+    if request.method not in ("GET", "HEAD"):
+        return None
+    if is_resource_modified(request.environ, etag=etag, last_modified=modified):
+        return None
+    return apply_validators(make_response("", 304), etag, modified, cache_control)
+
+
+# Function: file_fingerprint
+# Purpose: Content hash of a file, recomputed only when its mtime/size change
+# Returns: str | None (None when the file does not exist)
+
+
+def file_fingerprint(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    digest = _fingerprints.get(key)
+    if digest is None:
+        digest = _fingerprints[key] = images.content_hash(path)
+    return digest
+
+
+# Function: static_fingerprint
+# Purpose: ?v= value for a static file URL
+# Returns: str | None (None for already content-addressed paths and missing files)
+
+
+def static_fingerprint(static_folder, filename):
+    if filename.startswith(FINGERPRINTED_PREFIXES):
+        return None
+    return file_fingerprint(os.path.join(static_folder, filename))
+
+
+# Function: is_immutable
+# Purpose: Whether a static request can be cached forever
+# Returns: bool (content-addressed path, or ?v= equal to the file's current fingerprint)
+
+
+def is_immutable(static_folder, filename, version):
+    if filename.startswith(FINGERPRINTED_PREFIXES):
+        return True
+    return version is not None and version == static_fingerprint(static_folder, filename)
+
+
+# Function: build_id
+# Purpose: Hash of the templates and stylesheet (part of every page ETag)
+# Returns: str (computed once per process; identical across workers)
+# Control structures:
+#   - Iteration: files in sorted order so every worker derives the same id
+
+
+def build_id(template_folder, static_folder):
+    global _build_id
+    if _build_id is None:
+        paths = sorted(os.path.join(template_folder, name) for name in os.listdir(template_folder))
+        paths.append(os.path.join(static_folder, "styles.css"))
+        _build_id = entity_tag(*(file_fingerprint(path) for path in paths))
+    return _build_id
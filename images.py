@@ -0,0 +1,230 @@
+# Module: images
+# Purpose: Thumbnail and responsive-image derivative pipeline for static/images
+# Features:
+#   - Resized variants at several widths in WebP, AVIF (when Pillow supports it) and JPEG
+#   - Content-hash cache directory: static/images/derived/<hash>/<width>.<ext>
+#     (unchanged originals are never reprocessed; edited originals get a new hash)
+#   - Lookup of available variants for templates (srcset support)
+#   - Bulk backfill command for existing images:
+#       python images.py backfill [--force] [--jobs N]
+#   - Pillow is imported on first use: web workers only read manifests
+# Data structures:
+#   - dict format -> list[(width, static-relative filename)] per image
+#   - dict cache (path, mtime, size) -> content hash
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+SOURCE_DIR = os.path.join("static", "images")
+DERIVED_DIR = os.path.join(SOURCE_DIR, "derived")
+SOURCE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+# Widths (px) generated for every image; widths larger than the original are skipped
+WIDTHS = (160, 320, 640, 1024)
+
+EXTENSIONS = {"avif": "avif", "webp": "webp", "jpeg": "jpg"}
+MIME_TYPES = {"avif": "image/avif", "webp": "image/webp", "jpeg": "image/jpeg"}
+SAVE_OPTIONS = {
+    "avif": {"quality": 55, "speed": 8},
+    "webp": {"quality": 80, "method": 4},
+    "jpeg": {"quality": 82, "optimize": True, "progressive": True},
+}
+
+MANIFEST_NAME = "variants.json"
+
+_hash_cache = {}      # (path, mtime_ns, size) -> content hash
+_variant_cache = {}   # content hash -> manifest dict
+_formats = None
+
+
+# Function: output_formats
+# Purpose: Formats generated, in order of preference (best compression first); the
+#          last one is the universally supported fallback used for <img src>
+# Returns: list[str] (probed once: AVIF/WebP depend on how Pillow was built)
+
+
+def output_formats():
+    global _formats
+    if _formats is None:
+        from PIL import features
+        _formats = [fmt for fmt in ("avif", "webp", "jpeg") if fmt == "jpeg" or features.check(fmt)]
+    return _formats
+
+
+# Function: content_hash
+# Purpose: Short SHA-256 digest of a file's bytes (cache key for its derivatives)
+# Returns: str (16 hex chars)
+
+
+def content_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+# Function: source_path
+# Purpose: Map an image_url as stored in the DB ("/static/images/x.jpg") to a file path
+# Returns: str | None (None for remote/unsupported URLs)
+
+
+def source_path(image_url):
+    if not image_url or not image_url.startswith("/static/images/"):
+        return None
+    path = os.path.join(SOURCE_DIR, image_url[len("/static/images/"):])
+    if not path.lower().endswith(SOURCE_EXTENSIONS):
+        return None
+    return path
+
+
+# Function: generate_derivatives
+# Purpose: Create every width/format variant of one source image (idempotent)
+# Inputs: path (str) to the original; force (bool) to rebuild an existing cache entry
+# Returns: dict manifest {"hash", "width", "height", "variants": {format: [[width, filename], ...]}}
+# Control structures:
+#   - Selection: skip work when derived/<hash>/ already exists
+#   - Iteration: over widths x formats
+#   - Sequence: render into a temp directory, then rename into place atomically
+
+
+def generate_derivatives(path, force=False):
+    from PIL import Image, ImageOps
+
+    digest = content_hash(path)
+    target = os.path.join(DERIVED_DIR, digest)
+    manifest_path = os.path.join(target, MANIFEST_NAME)
+    if os.path.exists(manifest_path) and not force:
+        with open(manifest_path) as f:
+            return json.load(f)
+
+    os.makedirs(DERIVED_DIR, exist_ok=True)
+    staging = os.path.join(DERIVED_DIR, f".tmp-{digest}-{os.getpid()}")
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    with Image.open(path) as original:
+        image = ImageOps.exif_transpose(original).convert("RGB")
+    widths = [w for w in WIDTHS if w < image.width] + [min(image.width, WIDTHS[-1])]
+    manifest = {"hash": digest, "width": image.width, "height": image.height,
+                "variants": {fmt: [] for fmt in output_formats()}}
+
+    for width in sorted(set(widths)):
+        height = max(1, round(image.height * width / image.width))
+        resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+        for fmt in output_formats():
+            filename = f"{width}.{EXTENSIONS[fmt]}"
+            resized.save(os.path.join(staging, filename), fmt.upper(), **SAVE_OPTIONS[fmt])
+            manifest["variants"][fmt].append([width, f"images/derived/{digest}/{filename}"])
+
+    with open(os.path.join(staging, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f)
+
+    # Selection: another worker may have produced the same hash concurrently
+    if force:
+        shutil.rmtree(target, ignore_errors=True)
+    try:
+        os.replace(staging, target)
+    except OSError:
+        shutil.rmtree(staging, ignore_errors=True)
+    _variant_cache[digest] = manifest
+    return manifest
+
+
+# Function: derivatives_state
+# Purpose: Token that changes whenever a derivative set appears, is replaced or removed, in
+#          any process: the derived directory's mtime (os.replace into it updates it)
+# Returns: int (0 before any derivative exists)
+
+
+def derivatives_state():
+    try:
+        return os.stat(DERIVED_DIR).st_mtime_ns
+    except OSError:
+        return 0
+
+
+# Function: variants_for
+# Purpose: Available derivatives for an image_url, without decoding any image
+# Returns: dict manifest (see generate_derivatives) | None if not generated yet
+# Control structures:
+#   - Selection: stat the original; reuse the cached hash while mtime/size are unchanged
+
+
+def variants_for(image_url):
+    path = source_path(image_url)
+    if path is None:
+        return None
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    digest = _hash_cache.get(key)
+    if digest is None:
+        digest = _hash_cache[key] = content_hash(path)
+
+    manifest = _variant_cache.get(digest)
+    if manifest is None:
+        try:
+            with open(os.path.join(DERIVED_DIR, digest, MANIFEST_NAME)) as f:
+                manifest = _variant_cache[digest] = json.load(f)
+        except OSError:
+            return None
+    return manifest
+
+
+def _backfill_one(path, force):
+    try:
+        return generate_derivatives(path, force), None
+    except OSError as e:  # unreadable or not an image
+        return None, str(e)
+
+
+# Function: backfill
+# Purpose: Generate derivatives for every original in static/images
+# Inputs: force (bool); jobs (int, worker processes)
+# Returns: int number of images processed
+# Control structures:
+#   - Iteration: originals fanned out over a process pool
+#   - Selection: report and skip files that cannot be decoded
+
+
+def backfill(force=False, jobs=None):
+    paths = sorted(
+        os.path.join(SOURCE_DIR, name) for name in os.listdir(SOURCE_DIR)
+        if name.lower().endswith(SOURCE_EXTENSIONS)
+    )
+    processed = 0
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        for path, (manifest, error) in zip(paths, pool.map(_backfill_one, paths, [force] * len(paths))):
+            if error:
+                print(f"{path}: skipped ({error})", file=sys.stderr)
+                continue
+            processed += 1
+            print(f"{path} -> derived/{manifest['hash']}/")
+    return processed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="NurseryMate image derivative pipeline")
+    commands = parser.add_subparsers(dest="command", required=True)
+    backfill_parser = commands.add_parser("backfill", help="generate derivatives for all existing images")
+    backfill_parser.add_argument("--force", action="store_true", help="rebuild derivatives that already exist")
+    backfill_parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    if args.command == "backfill":
+        count = backfill(force=args.force, jobs=args.jobs)
+        print(f"Processed {count} images into {DERIVED_DIR}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
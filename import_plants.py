@@ -1,92 +1,56 @@
-import sqlite3
-import re
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
 
-def parse_plant_data(text_data):
-    """Parse the plant data from the provided text format"""
-    plants = []
-    lines = text_data.strip().split('\n')
-    
-    # Skip the header line
-    for line in lines[1:]:
-        if not line.strip():
-            continue
-            
-        # Split by tabs (assuming tab-separated values)
-        parts = line.split('\t')
-        if len(parts) >= 12:
-            plant = {
-                'scientific_name': parts[0].strip(),
-                'common_name': parts[1].strip(),
-                'flowering_time': parts[2].strip(),
-                'height': parts[3].strip(),
-                'ecological_function': parts[4].strip(),
-                'sunlight': parts[5].strip(),
-                'water_level': parts[6].strip(),
-                'salt_wind_tolerance': parts[7].strip(),
-                'type': parts[8].strip(),
-                'planting_space': parts[9].strip(),
-                'image_url': parts[10].strip(),
-                'soil_type': parts[11].strip()
-            }
-            
-            plants.append(plant)
-    
-    return plants
-
-def import_plants_to_db(plants):
-    """Import plants into the SQLite database"""
-    conn = sqlite3.connect('plants.db')
-    c = conn.cursor()
-    
-    # Ensure the table exists with the correct schema
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS plants (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            scientific_name TEXT NOT NULL,
-            common_name TEXT,
-            flowering_time TEXT,
-            height TEXT,
-            ecological_function TEXT,
-            sunlight TEXT,
-            water_level TEXT,
-            salt_wind_tolerance TEXT,
-            type TEXT,
-            planting_space TEXT,
-            image_url TEXT,
-            soil_type TEXT
-        )
-    ''')
-    
-    # Insert plants
-    for plant in plants:
-        c.execute('''
-            INSERT INTO plants (
-                scientific_name, common_name, flowering_time, height,
-                ecological_function, sunlight, water_level, salt_wind_tolerance,
-                type, planting_space, image_url, soil_type
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            plant['scientific_name'],
-            plant['common_name'],
-            plant['flowering_time'],
-            plant['height'],
-            plant['ecological_function'],
-            plant['sunlight'],
-            plant['water_level'],
-            plant['salt_wind_tolerance'],
-            plant['type'],
-            plant['planting_space'],
-            plant['image_url'],
-            plant['soil_type']
-        ))
-    
-    conn.commit()
-    conn.close()
-    print(f"Successfully imported {len(plants)} plants into the database!")
-
-def main():
-    # Your plant data goes here (copy-paste the entire table)
-    plant_data = """Scientific name	Common name 	Flowering time 	Height	Ecological function 	Sunlight	Water level	Salt/wind tolerance	Type	Planting space	Image address	Soil type 
+import db
+
+# Columns filled by the importer, in plants table order (id is assigned by SQLite)
+IMPORT_COLUMNS = db.PLANT_COLUMNS[1:]
+
+# Header spellings seen in supplier lists -> column name. Headers are matched
+# after lower-casing and collapsing whitespace, so "Common name " also matches.
+HEADER_ALIASES = {
+    "scientific name": "scientific_name",
+    "common name": "common_name",
+    "flowering time": "flowering_time",
+    "height": "height",
+    "ecological function": "ecological_function",
+    "sunlight": "sunlight",
+    "water level": "water_level",
+    "salt/wind tolerance": "salt_wind_tolerance",
+    "salt wind tolerance": "salt_wind_tolerance",
+    "type": "type",
+    "planting space": "planting_space",
+    "image address": "image_url",
+    "image url": "image_url",
+    "soil type": "soil_type",
+}
+
+# On a duplicate scientific_name the row is updated in place. An existing
+# image_url is kept: images are managed through the admin dashboard upload.
+# Normalised columns (see normalise.py) are written with every row. A row
+# identical to the stored plant is left alone (no write, no triggers), so
+# re-importing a list counts only the plants it adds or changes.
+UPDATED_COLUMNS = [c for c in db.WRITE_COLUMNS if c not in ("scientific_name", "image_url")]
+UPSERT_PLANT = (
+    "INSERT INTO plants (" + ", ".join(db.WRITE_COLUMNS) + ") VALUES ("
+    + ", ".join("?" * len(db.WRITE_COLUMNS)) + ") "
+    "ON CONFLICT(scientific_name) DO UPDATE SET "
+    + ", ".join(f"{c} = excluded.{c}" for c in UPDATED_COLUMNS)
+    + ", image_url = COALESCE(plants.image_url, excluded.image_url) WHERE "
+    + " OR ".join(f"plants.{c} IS NOT excluded.{c}" for c in UPDATED_COLUMNS)
+    + " OR (plants.image_url IS NULL AND excluded.image_url IS NOT NULL)"
+)
+
+BATCH_SIZE = 1000
+
+# Built-in seed catalogue, imported when no files are given (copy-paste the entire table).
+# Also the source of realistic field formats for benchmarks/catalogue.py.
+SEED_DATA = """Scientific name	Common name 	Flowering time 	Height	Ecological function 	Sunlight	Water level	Salt/wind tolerance	Type	Planting space	Image address	Soil type 
 Acacia acinacea	Gold Dust Wattle	Sept-Dec	0.5–2 m	Attracts birds/butterflies	Full sun	Moderate	No	Shrub	Low	https://newportnativenursery.com.au/wp-content/uploads/2021/09/Acacia-acinacea.jpg	Moist/well-drained, loamy, clay
 Acacia dealbata	Silver Wattle	Jun-Oct	15–30 m	Structural/visual interest/Attracts birds/butterflies	Full sun	Moderate	No	Tree	Medium	https://newportnativenursery.com.au/wp-content/uploads/2021/08/Acacia_dealbata-1-2-300x300.jpg	Moist/well-drained, loamy, sandy
 Acacia implexa	Lightwood	Dec-Mar	~5–15 m	Structural/visual interest/Attracts birds/butterflies/low maintenance	Full sun / partial shade	Moderate	No	Tree	Low	https://newportnativenursery.com.au/wp-content/uploads/2021/08/Acacia_implexa_flowers_1-300x300.jpg	Moist/well-drained, clay, loamy
@@ -157,10 +121,122 @@ Cassinia longifolia	Shiny Cassinia	Nov-Mar	1.2–2.5m H & 1.0–1.5 m W	Attracts
 Cassinia arcuata	Chinese Scrub	Nov-Mar	~1–2 m	Attracts birds, low maintenance	Full sun	Dry/drought prone	Yes-coastal	Shrub/tree	Medium garden area (1–3m)	https://newportnativenursery.com.au/wp-content/uploads/2021/09/Chinese-Scrub-300x300.jpg	Dry/sandy/loamy
 Chloris truncata	Windmill Grass	Nov-Jun	~0.1-0.5m	Attracts birds, low maintenance	Full sun	Dry/drought prone	Yes-coastal	Tufting/grass-like	Medium garden area (1–3m)	https://newportnativenursery.com.au/wp-content/uploads/2021/10/Windmill-Grass-300x300.jpg	Dry/sandy/loamy
 """
-    
-    # Parse and import the plants
-    plants = parse_plant_data(plant_data)
-    import_plants_to_db(plants)
+
+
+def normalise_header(name):
+    """Map a header cell to a column name (None if unrecognised)"""
+    key = " ".join(name.replace("_", " ").lower().split())
+    return HEADER_ALIASES.get(key)
+
+
+def _plant_from_mapping(values):
+    """Build a plant dict with every import column; None if there is no scientific name"""
+    plant = {column: (values.get(column) or "").strip() for column in IMPORT_COLUMNS}
+    if not plant["scientific_name"]:
+        return None
+    return plant
+
+
+def iter_delimited(lines, delimiter):
+    """Yield plant dicts from delimited text lines; the first line is the header"""
+    reader = csv.reader(lines, delimiter=delimiter,
+                        quoting=csv.QUOTE_NONE if delimiter == "\t" else csv.QUOTE_MINIMAL)
+    header = next(reader, None)
+    if header is None:
+        return
+    columns = [normalise_header(name) for name in header]
+    for parts in reader:
+        if not any(part.strip() for part in parts):
+            continue
+        plant = _plant_from_mapping({c: v for c, v in zip(columns, parts) if c})
+        if plant:
+            yield plant
+
+
+def iter_jsonl(lines):
+    """Yield plant dicts from JSON lines (keys are column names or header spellings)"""
+    for line in lines:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        values = {(k if k in IMPORT_COLUMNS else normalise_header(k)): v for k, v in record.items()}
+        plant = _plant_from_mapping({k: str(v) for k, v in values.items() if k and v is not None})
+        if plant:
+            yield plant
+
+
+def iter_plant_rows(path):
+    """Stream plant dicts from a TSV, CSV or JSONL file of any size"""
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        if extension == ".jsonl":
+            yield from iter_jsonl(f)
+        elif extension == ".csv":
+            yield from iter_delimited(f, ",")
+        else:  # .tsv, .txt: tab-separated like the seed data
+            yield from iter_delimited(f, "\t")
+
+
+def parse_plant_data(text_data):
+    """Parse the plant data from the provided text format"""
+    return list(iter_delimited(io.StringIO(text_data.strip()), "\t"))
+
+
+def import_plants_to_db(plants, batch_size=BATCH_SIZE, report=True):
+    """Normalise and upsert plants into the SQLite database in executemany batches, one transaction.
+    Returns the number of plants added or changed; the catalogue version (and everything keyed
+    on it) only moves when that is non-zero. The schema must exist (db.init_schema)."""
+    started = time.perf_counter()
+    count = written = 0
+    batch = []
+    with db.write_transaction() as conn:
+        for plant in plants:
+            batch.append([plant[column] for column in IMPORT_COLUMNS] + db.normalised_values(plant))
+            if len(batch) >= batch_size:
+                written += conn.executemany(UPSERT_PLANT, batch).rowcount
+                count += len(batch)
+                batch.clear()
+        if batch:
+            written += conn.executemany(UPSERT_PLANT, batch).rowcount
+            count += len(batch)
+        if written:
+            db.bump_catalogue_version(conn)
+
+    elapsed = time.perf_counter() - started
+    if written:
+        db.sync_similar_plants()  # rebuilt here for small catalogues, otherwise marked stale
+    rate = count / elapsed if elapsed > 0 else float("inf")
+    if report:
+        print(f"Successfully imported {count} plants into the database, {written} new or changed! "
+              f"({elapsed:.2f}s, {rate:,.0f} rows/sec)")
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import plants into plants.db (upserts on scientific name)")
+    parser.add_argument("files", nargs="*", help="TSV, CSV or JSONL files; imports the built-in seed data if omitted")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="rows per executemany batch")
+    args = parser.parse_args(argv)
+
+    db.init_schema()
+    if args.files:
+        for path in args.files:
+            print(f"Importing {path}")
+            import_plants_to_db(iter_plant_rows(path), batch_size=args.batch_size)
+    else:
+        # Parse and import the plants
+        plants = parse_plant_data(SEED_DATA)
+        import_plants_to_db(plants, batch_size=args.batch_size)
+
+    if db.similar_plants_stale():
+        started = time.perf_counter()
+        count = db.rebuild_similar_plants()
+        if count is None:
+            print("Similar plants are being rebuilt by another process")
+        else:
+            print(f"Rebuilt similar plants for {count} plants ({time.perf_counter() - started:.2f}s)")
+    return 0
+
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
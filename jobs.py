@@ -0,0 +1,291 @@
+# Module: jobs
+# Purpose: Local background job queue for slow work (image derivatives, care booklets,
+#          similar-plants rebuilds after large imports)
+# Features:
+#   - Persistent job table in its own SQLite file (jobs.db): jobs survive restarts and
+#     are shared by every web worker process on the host
+#   - Worker pool of daemon threads per process; a job is claimed atomically
+#     (BEGIN IMMEDIATE), so each job runs exactly once across processes
+#   - Leases: a job whose worker died is picked up again once its lease expires,
+#     up to MAX_ATTEMPTS
+#   - Results (documents) stored with the job for download; old jobs purged
+#   - Enqueueing a job identical to one still queued or running returns that job
+#   - CPU-heavy rendering still runs in the summaries process pool, so worker threads
+#     mostly wait and never hold the GIL away from request threads for long
+# Data structures:
+#   - table jobs(id, kind, payload, status, attempts, lease_until, created, started,
+#     finished, error, result, result_mimetype, result_name)
+#   - dict kind -> handler(payload) -> (bytes | None, mimetype, filename)
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+
+import db
+import images
+import summaries
+
+DB_PATH = os.environ.get("NURSERYMATE_JOBS_DB", "jobs.db")
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+LEASE_SECONDS = 15 * 60       # a running job is re-queued if not finished within this time
+MAX_ATTEMPTS = 3
+POLL_INTERVAL = 1.0           # idle workers re-check the table (jobs enqueued by other processes)
+RETENTION_SECONDS = 24 * 3600  # finished jobs (and their documents) are kept this long
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS jobs ("
+    "id TEXT PRIMARY KEY, kind TEXT NOT NULL, payload TEXT NOT NULL, status TEXT NOT NULL, "
+    "attempts INTEGER NOT NULL DEFAULT 0, lease_until REAL, created REAL NOT NULL, started REAL, "
+    "finished REAL, error TEXT, result BLOB, result_mimetype TEXT, result_name TEXT)",
+    "CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs (status, created)",
+)
+
+# Claim the oldest runnable job: queued, or running with an expired lease
+CLAIM_JOB = (
+    "UPDATE jobs SET status = 'running', attempts = attempts + 1, started = :now, lease_until = :lease "
+    "WHERE id = (SELECT id FROM jobs WHERE (status = 'queued' OR (status = 'running' AND lease_until < :now)) "
+    "AND attempts < :max_attempts ORDER BY created LIMIT 1) "
+    "RETURNING id, kind, payload"
+)
+# Jobs whose worker died on every attempt are given up
+FAIL_ABANDONED = (
+    "UPDATE jobs SET status = 'failed', finished = :now, error = 'Worker stopped before finishing' "
+    "WHERE status = 'running' AND lease_until < :now AND attempts >= :max_attempts"
+)
+# A job with the same kind and payload that has not finished (de-duplicates enqueue)
+SELECT_PENDING_JOB = (
+    "SELECT id FROM jobs WHERE status IN ('queued', 'running') AND kind = :kind AND payload = :payload "
+    "AND attempts < :max_attempts ORDER BY created LIMIT 1"
+)
+SELECT_JOB = (
+    "SELECT id, kind, status, attempts, created, started, finished, error, result_mimetype, result_name "
+    "FROM jobs WHERE id = ?"
+)
+
+_handlers = {}
+_local = threading.local()
+
+
+# Function: connect
+# Purpose: This thread's connection to the job database (re-opened after fork)
+# Returns: sqlite3.Connection
+
+
+def connect():
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.pid != os.getpid() or _local.path != DB_PATH:
+        conn = sqlite3.connect(DB_PATH, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute("PRAGMA busy_timeout = 5000")
+        for statement in SCHEMA:
+            conn.execute(statement)
+        _local.conn, _local.pid, _local.path = conn, os.getpid(), DB_PATH
+    return conn
+
+
+# Function: handler
+# Purpose: Decorator registering the function that runs jobs of one kind
+
+
+def handler(kind):
+    def register(function):
+        _handlers[kind] = function
+        return function
+    return register
+
+
+@handler("image_derivatives")
+def _image_derivatives(payload):
+    images.generate_derivatives(payload["path"], force=payload.get("force", False))
+    return None, None, None
+
+
+@handler("similar_plants")
+def _similar_plants(payload):
+    db.rebuild_similar_plants()
+    return None, None, None
+
+
+@handler("booklet")
+def _booklet(payload):
+    plants = [p for p in (db.fetch_plant(plant_id) for plant_id in payload["plant_ids"]) if p]
+    if not plants:
+        raise LookupError("None of the requested plants exist")
+    document, mimetype, extension = summaries.get_booklet(plants)
+    return document, mimetype, f"care_booklet.{extension}"
+
+
+# Function: enqueue
+# Purpose: Add a job and wake this process's workers
+# Inputs: kind (registered handler name), payload (JSON-serialisable dict)
+# Returns: str job id; the id of an identical job (same kind and payload) that is still
+#          queued or running, so repeated clicks share one job and one stored result
+# Control structures:
+#   - Sequence: look up and insert in one BEGIN IMMEDIATE, so concurrent processes
+#     cannot both insert the same job
+
+
+def enqueue(kind, payload):
+    if kind not in _handlers:
+        raise ValueError(f"Unknown job kind: {kind!r}")
+    payload = json.dumps(payload, sort_keys=True)
+    now = time.time()
+    conn = connect()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute(SELECT_PENDING_JOB, {"kind": kind, "payload": payload,
+                                                "max_attempts": MAX_ATTEMPTS}).fetchone()
+        if row is not None:
+            job_id = row["id"]
+        else:
+            job_id = uuid.uuid4().hex
+            conn.execute(
+                "INSERT INTO jobs (id, kind, payload, status, created) VALUES (?, ?, ?, ?, ?)",
+                (job_id, kind, payload, QUEUED, now),
+            )
+        conn.execute("DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished < ?",
+                     (now - RETENTION_SECONDS,))
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+    _pool.wake()
+    return job_id
+
+
+# Function: get_job
+# Purpose: Job status record (without the result document)
+# Returns: dict | None
+
+
+def get_job(job_id):
+    row = connect().execute(SELECT_JOB, (job_id,)).fetchone()
+    return dict(row) if row else None
+
+
+# Function: get_result
+# Purpose: Result document of a finished job
+# Returns: (bytes, str mimetype, str filename) | None (not finished or no document)
+
+
+def get_result(job_id):
+    row = connect().execute(
+        "SELECT result, result_mimetype, result_name FROM jobs WHERE id = ? AND status = 'done'", (job_id,)
+    ).fetchone()
+    if row is None or row["result"] is None:
+        return None
+    return bytes(row["result"]), row["result_mimetype"], row["result_name"]
+
+
+# Function: claim
+# Purpose: Atomically take the next runnable job (and fail jobs out of attempts)
+# Returns: sqlite3.Row (id, kind, payload) | None
+
+
+def claim():
+    conn = connect()
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute(FAIL_ABANDONED, {"now": now, "max_attempts": MAX_ATTEMPTS})
+        # fetchall: the RETURNING statement must run to completion before COMMIT
+        rows = conn.execute(CLAIM_JOB, {"now": now, "lease": now + LEASE_SECONDS,
+                                        "max_attempts": MAX_ATTEMPTS}).fetchall()
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+    return rows[0] if rows else None
+
+
+# Function: run_job
+# Purpose: Execute one claimed job and record its outcome
+# Control structures:
+#   - Selection: success → done with result; exception → failed with the error text
+
+
+def run_job(job):
+    conn = connect()
+    try:
+        document, mimetype, name = _handlers[job["kind"]](json.loads(job["payload"]))
+        conn.execute(
+            "UPDATE jobs SET status = 'done', finished = ?, result = ?, result_mimetype = ?, result_name = ? "
+            "WHERE id = ?",
+            (time.time(), document, mimetype, name, job["id"]),
+        )
+    except Exception as e:  # includes a result that cannot be stored (e.g. too big for a row)
+        traceback.print_exc()
+        conn.execute(
+            "UPDATE jobs SET status = 'failed', finished = ?, error = ? WHERE id = ?",
+            (time.time(), f"{type(e).__name__}: {e}", job["id"]),
+        )
+
+
+# Class: WorkerPool
+# Purpose: Daemon threads that claim and run jobs, started on first use in each process
+# Data structures:
+#   - list[threading.Thread]; threading.Condition to wake idle workers on enqueue
+
+
+class WorkerPool:
+    def __init__(self):
+        self.size = 2
+        self._threads = []
+        self._pid = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+
+    # Method: start
+    # Purpose: Start the worker threads once per process (threads do not survive fork)
+
+    def start(self, size=None):
+        with self._lock:
+            if self._pid == os.getpid() and self._threads:
+                return
+            self.size = size or self.size
+            self._pid = os.getpid()
+            self._threads = [threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+                             for i in range(self.size)]
+            for thread in self._threads:
+                thread.start()
+
+    def wake(self):
+        self.start()
+        with self._wakeup:
+            self._wakeup.notify()
+
+    def _work(self):
+        while True:  # Iteration: claim → run; sleep until woken or the poll interval passes
+            try:
+                job = claim()
+            except sqlite3.Error:
+                traceback.print_exc()
+                job = None
+            if job is not None:
+                try:
+                    run_job(job)
+                except Exception:  # the worker must outlive a failed status write (its lease re-queues the job)
+                    traceback.print_exc()
+                continue
+            with self._wakeup:
+                self._wakeup.wait(POLL_INTERVAL)
+
+
+_pool = WorkerPool()
+
+
+# Function: start_workers
+# Purpose: Start this process's worker threads (e.g. at server start-up)
+# Inputs: size (int, threads)
+
+
+def start_workers(size=None):
+    _pool.start(size)
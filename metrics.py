@@ -0,0 +1,265 @@
+# Module: metrics
+# Purpose: In-process performance instrumentation with Prometheus text output
+# Features:
+#   - Counters and histograms with labels, safe to update from any thread
+#   - Per-request phase totals (SQL, recommendation matching, template rendering,
+#     PDF builds) kept in a context variable, for the Server-Timing header
+#   - Collectors: callables run at scrape time for values owned by other modules
+#     (cache hit/miss counts)
+#   - Values are per process; with several worker processes, scrape each one
+# Data structures:
+#   - dict label values (tuple) -> float (counters) or [bucket counts, sum, count] (histograms)
+#   - dict phase -> [seconds, count] for the current request (ContextVar)
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Seconds; spans a fast SQLite seek (sub-millisecond) to a large PDF booklet
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_registry = []
+_collectors = []
+_request = ContextVar("request_phases", default=None)
+_template_started = ContextVar("template_started", default=None)
+# SQL totals are updated on every statement, so they skip the generic Counter
+# (label lookup per call) and are exported by a collector below
+_sql_totals = [0, 0.0]   # statements, seconds
+_sql_lock = threading.Lock()
+
+
+def _label_text(names, values):
+    if not names:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in values)
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, escaped)) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# Class: Counter
+# Purpose: Monotonic total per label set
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[name] for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield self.name + _label_text(self.labels, key), value
+
+
+# Class: Histogram
+# Purpose: Distribution of observed values (latencies) per label set
+# Data structures:
+#   - list[int] per-bucket counts (last = above the highest bound), float sum, int count
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(labels[name] for name in self.labels)
+        index = bisect.bisect_left(self.buckets, value)  # first bound >= value ("le" semantics)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, ([*state[0]], state[1], state[2])) for key, state in self._values.items())
+        names = self.labels + ("le",)
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                yield self.name + "_bucket" + _label_text(names, key + (_number(bound),)), cumulative
+            yield self.name + "_sum" + _label_text(self.labels, key), total
+            yield self.name + "_count" + _label_text(self.labels, key), count
+
+
+REQUEST_SECONDS = Histogram(
+    "nurserymate_http_request_duration_seconds",
+    "Time to produce a response (streamed pages: time to the first byte).",
+    ("endpoint", "method", "status"),
+)
+PHASE_SECONDS = Histogram(
+    "nurserymate_http_request_phase_seconds",
+    "Per-request time spent in each phase (sql, match, render, pdf).",
+    ("endpoint", "phase"),
+)
+TEMPLATE_SECONDS = Histogram("nurserymate_template_render_duration_seconds", "Jinja template render time.", ("template",))
+MATCH_SECONDS = Histogram("nurserymate_recommend_duration_seconds", "Survey matching time.", ("backend",))
+ROWS_SCANNED = Counter("nurserymate_recommend_rows_scanned_total",
+                       "Catalogue rows examined by survey matching.", ("backend",))
+ROWS_MATCHED = Counter("nurserymate_recommend_rows_matched_total",
+                       "Plants returned by survey matching.", ("backend",))
+PDF_SECONDS = Histogram("nurserymate_pdf_build_duration_seconds", "PDF summary/booklet build time.", ("kind",))
+
+
+# Function: collector
+# Purpose: Decorator registering a scrape-time callable
+# Inputs: function() -> iterable of (name, kind, help, [(labels dict, value), ...])
+
+
+def collector(function):
+    _collectors.append(function)
+    return function
+
+
+# Function: render
+# Purpose: Every metric in the Prometheus text exposition format
+# Returns: str
+
+
+def render():
+    lines = []
+    for metric in _registry:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(f"{name} {_number(value)}" for name, value in metric.samples())
+    for function in _collectors:
+        for name, kind, help_text, samples in function():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{_label_text(tuple(labels), tuple(labels.values()))} {_number(value)}")
+    return "\n".join(lines) + "\n"
+
+
+# Function: start_request / finish_request
+# Purpose: Open this request's phase totals; record its latency when the response is ready
+# Returns: finish_request -> dict phase -> [seconds, count], plus "total" (for Server-Timing)
+
+
+def start_request():
+    _request.set({"started": time.perf_counter()})
+
+
+def finish_request(endpoint, method, status):
+    phases = _request.get()
+    if phases is None:
+        return {}
+    endpoint = endpoint or "none"
+    elapsed = time.perf_counter() - phases.pop("started")
+    REQUEST_SECONDS.observe(elapsed, endpoint=endpoint, method=method, status=str(status))
+    for phase, (seconds, _) in phases.items():
+        PHASE_SECONDS.observe(seconds, endpoint=endpoint, phase=phase)
+    _request.set(None)
+    phases["total"] = [elapsed, 1]
+    return phases
+
+
+def _add_phase(phase, seconds, count=1):
+    phases = _request.get()
+    if phases is not None:
+        totals = phases.get(phase)
+        if totals is None:
+            phases[phase] = [seconds, count]
+        else:
+            totals[0] += seconds
+            totals[1] += count
+
+
+# Function: observe_sql
+# Purpose: Record one statement's execute/fetch time (called by db.TimedCursor)
+# Inputs: seconds (float); statement (bool) False for a fetch on an already-counted statement
+
+
+def observe_sql(seconds, statement=True):
+    with _sql_lock:
+        _sql_totals[0] += statement
+        _sql_totals[1] += seconds
+    _add_phase("sql", seconds, int(statement))
+
+
+@collector
+def _sql_metrics():
+    with _sql_lock:
+        statements, seconds = _sql_totals
+    yield "nurserymate_sql_statements_total", "counter", "SQLite statements executed.", [({}, statements)]
+    yield "nurserymate_sql_seconds_total", "counter", "SQLite time (execute and fetch).", [({}, seconds)]
+
+
+# Function: timed
+# Purpose: Context manager timing a block into a histogram and a request phase
+# Inputs: histogram (Histogram), phase (str Server-Timing name), labels
+
+
+@contextmanager
+def timed(histogram, phase, **labels):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        histogram.observe(seconds, **labels)
+        _add_phase(phase, seconds)
+
+
+# Function: template_started / template_finished
+# Purpose: Template render timing (wired to Flask's before_render_template/template_rendered)
+
+
+def template_started():
+    _template_started.set(time.perf_counter())
+
+
+def template_finished(name):
+    started = _template_started.get()
+    if started is not None:
+        seconds = time.perf_counter() - started
+        TEMPLATE_SECONDS.observe(seconds, template=name or "string")
+        _add_phase("render", seconds)
+        _template_started.set(None)
+
+
+# Function: server_timing
+# Purpose: Server-Timing header value for a request's phases
+# Returns: str, e.g. 'sql;dur=1.20;desc="4 statements", render;dur=3.05'
+
+
+def server_timing(phases):
+    entries = []
+    for phase, (seconds, count) in phases.items():
+        entry = f"{phase};dur={seconds * 1000:.2f}"
+        if phase == "sql":
+            entry += f';desc="{count} statements"'
+        entries.append(entry)
+    return ", ".join(entries)
@@ -0,0 +1,172 @@
+# Module: normalise
+# Purpose: Parse free-text plant attributes into canonical, query-friendly values at write time
+# Features:
+#   - Enumerated sets stored as integer bitmasks (sunlight, water, salt/wind, type, planting space)
+#   - Numeric height and spread ranges in metres ("~0.2–0.3 m tall, spreads to ~2 m")
+#   - Flowering months as a 12-bit mask (bit 0 = January; "Nov-Mar" wraps the year)
+#   - Survey options mapped to the same bitmasks, so matching is one AND per criterion
+# Data structures:
+#   - dict criterion -> tuple of (bit, keywords) (keyword rules, same as the survey matcher)
+#   - dict of normalised column values per plant
+
+import re
+
+# Bit flags per criterion. A plant gets a bit when any of its keywords occurs in
+# the lower-cased attribute text (e.g. "Dry–moderate" -> DRY | MODERATE).
+SUNLIGHT_FULL_SUN, SUNLIGHT_PARTIAL, SUNLIGHT_SHADE = 1, 2, 4
+WATER_DRY, WATER_MODERATE, WATER_WET = 1, 2, 4
+SALT_YES, SALT_NO = 1, 2
+TYPE_GROUNDCOVER, TYPE_TUFTING, TYPE_HERB, TYPE_SHRUB_TREE = 1, 2, 4, 8
+SPACE_SMALL, SPACE_MEDIUM, SPACE_LARGE, SPACE_LOW = 1, 2, 4, 8
+
+KEYWORD_BITS = {
+    "sunlight": ((SUNLIGHT_FULL_SUN, ("full sun",)), (SUNLIGHT_PARTIAL, ("partial",)), (SUNLIGHT_SHADE, ("shade",))),
+    "water_level": ((WATER_DRY, ("dry", "drought")), (WATER_MODERATE, ("moderate", "well-watered")), (WATER_WET, ("wet", "swampy"))),
+    "salt_wind_tolerance": ((SALT_YES, ("yes", "coastal")), (SALT_NO, ("no", "sheltered"))),
+    "type": ((TYPE_GROUNDCOVER, ("groundcover", "creeping")), (TYPE_TUFTING, ("tufting", "grass")),
+             (TYPE_HERB, ("small herb", "dainty flower", "herb")), (TYPE_SHRUB_TREE, ("shrub", "tree"))),
+    "planting_space": ((SPACE_SMALL, ("small",)), (SPACE_MEDIUM, ("medium",)), (SPACE_LARGE, ("large",)), (SPACE_LOW, ("low",))),
+}
+
+# Normalised column per enumerated criterion
+MASK_COLUMNS = {
+    "sunlight": "sunlight_mask",
+    "water_level": "water_mask",
+    "salt_wind_tolerance": "salt_mask",
+    "type": "type_mask",
+    "planting_space": "space_mask",
+}
+
+# Every normalised column, in storage order, with its SQLite type
+NORMALISED_COLUMNS = (
+    ("sunlight_mask", "INTEGER"), ("water_mask", "INTEGER"), ("salt_mask", "INTEGER"),
+    ("type_mask", "INTEGER"), ("space_mask", "INTEGER"),
+    ("height_min", "REAL"), ("height_max", "REAL"), ("spread_min", "REAL"), ("spread_max", "REAL"),
+    ("flowering_months", "INTEGER"),
+)
+
+MONTHS = ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec")
+ALL_MONTHS = (1 << 12) - 1
+
+_MONTH_RE = re.compile(r"\b(" + "|".join(MONTHS) + r")[a-z]*\.?")
+_RANGE_RE = re.compile(r"(\d+(?:\.\d+)?)\s*(cm|mm|m)?\s*(?:[-–—]|to)\s*(\d+(?:\.\d+)?)\s*(cm|mm|m)?|(\d+(?:\.\d+)?)\s*(cm|mm|m)?")
+_SPREAD_RE = re.compile(r"spread|width|\(w\)|\bw\b")
+_UNITS = {"m": 1.0, "cm": 0.01, "mm": 0.001, None: 1.0}
+
+
+# Function: keyword_mask
+# Purpose: Bitmask of a plant attribute for one enumerated criterion
+# Returns: int (0 when no keyword matches or the value is empty)
+
+
+def keyword_mask(criterion, text):
+    text = (text or "").lower()
+    mask = 0
+    for bit, keywords in KEYWORD_BITS[criterion]:
+        if any(keyword in text for keyword in keywords):
+            mask |= bit
+    return mask
+
+
+# Function: option_mask
+# Purpose: Bitmask a survey answer accepts; a plant matches when (plant_mask & option_mask) != 0
+# Inputs: criterion (str), form value (str, any case)
+# Returns: int (0 = the answer matches nothing)
+
+
+def option_mask(criterion, form_value):
+    form_value = form_value.lower()
+    if criterion == "sunlight":
+        mask = 0
+        if "full sun" in form_value:
+            mask |= SUNLIGHT_FULL_SUN
+        if "partial shade" in form_value or "full shade" in form_value:
+            mask |= SUNLIGHT_PARTIAL | SUNLIGHT_SHADE
+        return mask
+    if criterion == "salt_wind_tolerance":
+        if "yes" in form_value:
+            return SALT_YES
+        return SALT_NO if "no" in form_value else 0
+    if criterion in ("water_level", "type"):
+        # Survey options name one category each, e.g. "Wet or swampy" -> WATER_WET
+        for bit, keywords in KEYWORD_BITS[criterion]:
+            if keywords[0] in form_value:
+                return bit
+        return 0
+    return keyword_mask(criterion, form_value)
+
+
+# Function: _range_from_match
+# Purpose: (min, max) in metres from one numeric token match
+# Returns: tuple[float, float]
+
+
+def _range_from_match(match):
+    if match.group(5) is not None:
+        value = float(match.group(5)) * _UNITS[match.group(6)]
+        return value, value
+    unit = _UNITS[match.group(4) or match.group(2)]
+    low, high = float(match.group(1)) * unit, float(match.group(3)) * unit
+    return min(low, high), max(low, high)
+
+
+# Function: parse_size
+# Purpose: Height and spread ranges from free text
+# Inputs: text such as "~0.2–0.3 m tall, spreads to ~2 m", "1-1.15m (h) 1-2m (w)", "Up to 0.6 m"
+# Returns: (height_min, height_max, spread_min, spread_max) floats in metres, None where unknown
+# Control structures:
+#   - Iteration: numeric ranges in reading order; the first is the height, a later
+#     one labelled spread/width/(w)/W is the spread
+
+
+def parse_size(text):
+    text = (text or "").lower()
+    height = spread = None
+    for match in _RANGE_RE.finditer(text):
+        label = text[match.end():match.end() + 12] if height is not None else ""
+        before = text[max(0, match.start() - 12):match.start()]
+        if height is None:
+            height = _range_from_match(match)
+        elif spread is None and (_SPREAD_RE.search(label) or _SPREAD_RE.search(before)):
+            spread = _range_from_match(match)
+    height = height or (None, None)
+    spread = spread or (None, None)
+    if text.strip().startswith("up to") and height[1] is not None:
+        height = (0.0, height[1])
+    return height + spread
+
+
+# Function: parse_months
+# Purpose: Flowering months as a 12-bit mask
+# Inputs: text such as "Sept-Dec", "Jan, Nov, Dec", "Nov–Mar", "All year"
+# Returns: int (0 when no month is recognised)
+
+
+def parse_months(text):
+    text = (text or "").lower()
+    if "all" in text:
+        return ALL_MONTHS
+    mask = 0
+    matches = list(_MONTH_RE.finditer(text))
+    for i, match in enumerate(matches):
+        month = MONTHS.index(match.group(1))
+        mask |= 1 << month
+        if i + 1 < len(matches) and re.fullmatch(r"\s*[-–—]\s*|\s+to\s+", text[match.end():matches[i + 1].start()]):
+            end = MONTHS.index(matches[i + 1].group(1))
+            while month != end:  # walk forward, wrapping December -> January
+                month = (month + 1) % 12
+                mask |= 1 << month
+    return mask
+
+
+# Function: normalise_plant
+# Purpose: All normalised column values for one plant record
+# Inputs: plant (dict/mapping with the free-text columns)
+# Returns: dict column -> value (keys of NORMALISED_COLUMNS)
+
+
+def normalise_plant(plant):
+    values = {column: keyword_mask(criterion, plant.get(criterion)) for criterion, column in MASK_COLUMNS.items()}
+    values["height_min"], values["height_max"], values["spread_min"], values["spread_max"] = parse_size(plant.get("height"))
+    values["flowering_months"] = parse_months(plant.get("flowering_time"))
+    return values
@@ -0,0 +1,141 @@
+# Module: query_builder
+# Purpose: Answer a survey inside SQLite with a generated, parameterised query
+# Features:
+#   - One match expression per selected criterion:
+#       enumerated criteria -> bitmask test on the normalised *_mask columns
+#       free-text criteria  -> instr(lower(column), ?) substring test
+#   - Score = number of matched criteria; rows below the threshold never leave SQLite
+#   - When every criterion must match, mask tests become "column IN (...)" so the
+#     secondary indexes created by db.init_schema can seek instead of scanning
+#   - Fallback to the Python-side fuzzy matcher if the normalised columns are unavailable
+# Data structures:
+#   - list[str] SQL fragments, list params (never string-formatted user input)
+#   - list[dict] ranked results (id, scientific_name, image_url, score)
+
+import sqlite3
+
+import db
+from normalise import KEYWORD_BITS, MASK_COLUMNS, option_mask
+from recommend import CRITERIA, MATCH_THRESHOLD, criterion_matches
+
+
+# Function: required_matches
+# Purpose: Smallest number of matched criteria whose ratio reaches the threshold
+# Returns: int
+
+
+def required_matches(total_criteria, threshold):
+    for count in range(total_criteria + 1):
+        if count / total_criteria >= threshold:
+            return count
+    return total_criteria + 1
+
+
+# Function: mask_values
+# Purpose: Every stored mask value that shares a bit with option (for "IN (...)" seeks)
+# Returns: list[int]
+
+
+def mask_values(criterion, option):
+    width = len(KEYWORD_BITS[criterion])
+    return [value for value in range(1, 1 << width) if value & option]
+
+
+# Function: build_survey_query
+# Purpose: Turn survey answers into one parameterised ranking query
+# Inputs: form_data (dict), threshold (float), top_k (int | None)
+# Returns: (str sql, list params)
+# Control structures:
+#   - Iteration: one match expression per selected criterion
+#   - Selection: all-must-match → indexed IN conjunction; otherwise score filter,
+#     with an indexed OR prefilter when every criterion is enumerated
+
+
+def build_survey_query(form_data, threshold=MATCH_THRESHOLD, top_k=None):
+    selected = [(c, form_data[c]) for c in CRITERIA if form_data.get(c)]
+    columns = "id, scientific_name, image_url"
+    if not selected:
+        sql = f"SELECT {columns}, 1.0 AS score FROM plants ORDER BY id"
+        return (sql + " LIMIT ?", [top_k]) if top_k is not None else (sql, [])
+
+    terms, term_params = [], []        # score terms, each 0 or 1
+    seeks, seek_params = [], []        # index-friendly equivalents (mask criteria only)
+    for criterion, value in selected:
+        if criterion in MASK_COLUMNS:
+            column = MASK_COLUMNS[criterion]
+            mask = option_mask(criterion, value)
+            terms.append(f"(({column} & ?) != 0)")
+            term_params.append(mask)
+            values = mask_values(criterion, mask)
+            seeks.append(f"{column} IN ({', '.join('?' * len(values))})" if values else "0")
+            seek_params.extend(values)
+        else:
+            terms.append(f"(instr(lower({criterion}), ?) > 0)")
+            term_params.append(value.lower())
+
+    total = len(selected)
+    required = required_matches(total, threshold)
+    score = " + ".join(terms)
+    sql = f"SELECT {columns}, CAST({score} AS REAL) / ? AS score FROM plants"
+    params = term_params + [total]
+
+    if required > total:
+        sql += " WHERE 0"
+    elif required == total:
+        # Every criterion must match: indexed seeks for masks, direct tests for text
+        conditions = seeks + [t for (c, _), t in zip(selected, terms) if c not in MASK_COLUMNS]
+        text_params = [p for (c, _), p in zip(selected, term_params) if c not in MASK_COLUMNS]
+        sql += " WHERE " + " AND ".join(conditions)
+        params += seek_params + text_params
+    elif required > 0:
+        where = f"({score}) >= ?"
+        where_params = term_params + [required]
+        if len(seeks) == total:
+            # At least one criterion must match: multi-index OR prefilter
+            where = "(" + " OR ".join(seeks) + ") AND " + where
+            where_params = seek_params + where_params
+        sql += " WHERE " + where
+        params += where_params
+
+    sql += " ORDER BY score DESC, id"
+    if top_k is not None:
+        sql += " LIMIT ?"
+        params.append(top_k)
+    return sql, params
+
+
+# Function: fuzzy_query
+# Purpose: Python-side fallback using the original keyword/substring rules
+# Returns: list[dict] ranked results
+
+
+def fuzzy_query(form_data, threshold=MATCH_THRESHOLD, top_k=None):
+    selected = [(c, form_data[c].lower()) for c in CRITERIA if form_data.get(c)]
+    rows = db.get_connection().execute(
+        "SELECT id, scientific_name, image_url, " + ", ".join(CRITERIA) + " FROM plants ORDER BY id"
+    ).fetchall()
+    ranked = []
+    for row in rows:  # Iteration: per-plant evaluation
+        matched = sum(criterion_matches(c, v, (row[c] or "").lower()) for c, v in selected)
+        score = matched / len(selected) if selected else 1.0
+        if score >= threshold:
+            ranked.append({"id": row["id"], "scientific_name": row["scientific_name"],
+                           "image_url": row["image_url"], "score": score})
+    ranked.sort(key=lambda plant: (-plant["score"], plant["id"]))
+    return ranked[:top_k] if top_k is not None else ranked
+
+
+# Function: query_survey
+# Purpose: Ranked survey matches computed inside SQLite
+# Returns: list[dict] with keys 'id', 'scientific_name', 'image_url', 'score'
+# Control structures:
+#   - Selection: fall back to fuzzy_query when the generated SQL cannot run
+
+
+def query_survey(form_data, threshold=MATCH_THRESHOLD, top_k=None):
+    sql, params = build_survey_query(form_data, threshold, top_k)
+    try:
+        rows = db.get_connection().execute(sql, params).fetchall()
+    except sqlite3.OperationalError:  # e.g. normalised columns not migrated yet
+        return fuzzy_query(form_data, threshold, top_k)
+    return [dict(row) for row in rows]
@@ -0,0 +1,394 @@
+# Module: recommend
+# Purpose: Precompiled recommendation index for the plant survey
+# Features:
+#   - Enumerated criteria matched with integer bitmask ops over the normalised
+#     columns written at ingest (see normalise.py); free-text criteria
+#     (flowering_time, ecological_function, soil_type) by lower-cased substring
+#   - Category tags stored as columnar NumPy boolean arrays per (criterion, option)
+#   - Vectorised scoring of one or many survey submissions in a single pass
+#   - Ranked results with configurable threshold and top-k
+#   - Compiled once per catalogue version into a memory-mapped snapshot file
+#     (see snapshot.py) shared by every worker process: ids, bitmasks, the tag
+#     matrix for every survey option and the display/text columns. Per-worker
+#     memory stays constant as the catalogue grows; workers swap to the new file
+#     when the catalogue version changes
+# Data structures:
+#   - numpy arrays (one element per plant, in id order; views of the snapshot)
+#   - dict (criterion, option) -> tag column (snapshot rows + bounded extra cache)
+#   - snapshot string columns for names, image URLs and free-text criteria
+
+import os
+import threading
+
+import numpy as np
+
+import db
+import snapshot
+from normalise import MASK_COLUMNS, option_mask
+
+try:
+    import fcntl
+except ImportError:  # no flock (Windows): concurrent builds are duplicated work, still atomic
+    fcntl = None
+
+# Minimum fraction of the selected criteria a plant must satisfy to be recommended
+MATCH_THRESHOLD = 0.4
+
+# Number of submissions scored per matrix product in batch mode (bounds memory
+# to BATCH_CHUNK_SIZE x catalogue size floats)
+BATCH_CHUNK_SIZE = 256
+
+# Directory for catalogue snapshot files; "" keeps the index in process memory.
+# Default: catalogue_snapshots/ next to the database.
+SNAPSHOT_DIR = os.environ.get("NURSERYMATE_SNAPSHOT_DIR")
+SNAPSHOTS_KEPT = 2          # older files are deleted (workers still mapping them keep their pages)
+EXTRA_TAGS_MAX = 256        # tag columns for non-survey options cached per worker
+
+# Criteria understood by the matcher, in the order they are evaluated
+CRITERIA = (
+    "flowering_time", "ecological_function", "sunlight", "water_level",
+    "salt_wind_tolerance", "type", "planting_space", "soil_type",
+)
+
+# Criteria stored as free text and matched by substring
+TEXT_CRITERIA = tuple(c for c in CRITERIA if c not in MASK_COLUMNS)
+
+# Data structure: nested dict of lists for flexible mapping (keys are lower-cased
+# survey options, values are keywords searched for in the plant's attribute)
+VALUE_MAPPINGS = {
+    "water_level": {
+        "dry or drought-prone": ["dry", "drought"],
+        "moderate moisture (well-watered)": ["moderate", "well-watered"],
+        "wet or swampy": ["wet", "swampy"]
+    },
+    "salt_wind_tolerance": {
+        "yes — coastal or exposed site": ["yes", "coastal"],
+        "no — sheltered inland site": ["no", "sheltered"]
+    },
+    "type": {
+        "groundcover or creeping": ["groundcover", "creeping"],
+        "tufting or grass-like": ["tufting", "grass"],
+        "small herb or dainty flower": ["small herb", "dainty flower", "herb"],
+        "shrub or tree": ["shrub", "tree"]
+    }
+}
+
+# Options offered by the survey form (templates/form.html); their tags are
+# compiled eagerly when the index is built so the first request is not slower
+SURVEY_OPTIONS = {
+    "soil_type": ["Dry, sandy or loamy", "Heavy, clay or waterlogged", "Moist, well-drained", "Saline or coastal"],
+    "sunlight": ["Full sun (most of the day)", "Partial shade (some sun, some shade)", "Full shade (very little direct sun)"],
+    "water_level": ["Dry or drought-prone", "Moderate moisture (well-watered)", "Wet or swampy"],
+    "salt_wind_tolerance": ["Yes — coastal or exposed site", "No — sheltered inland site"],
+    "type": ["Groundcover or creeping", "Tufting or grass-like", "Small herb or dainty flower", "Shrub or tree"],
+    "ecological_function": ["Attract birds and butterflies", "Provide food (e.g., berries)", "Structural/visual interest", "Low-maintenance only"],
+    "planting_space": ["Small pot / container", "Small garden bed (<1m spread)", "Medium garden area (1–3m spread)", "Large area (>3m spread)"],
+}
+
+
+# Function: criterion_matches
+# Purpose: Decide whether one plant attribute satisfies one survey answer
+#          (reference rules on raw text; the index uses the equivalent bitmasks)
+# Inputs: criterion name (str), form value and plant value (both lower-cased str)
+# Returns: bool
+# Control structures:
+#   - Selection: per-criterion keyword/substring rules
+
+
+def criterion_matches(criterion, form_value, plant_value):
+    if criterion == "sunlight":
+        return ("full sun" in form_value and "full sun" in plant_value) or \
+               ("partial shade" in form_value and ("partial" in plant_value or "shade" in plant_value)) or \
+               ("full shade" in form_value and ("shade" in plant_value or "partial" in plant_value))
+    if criterion in ("water_level", "type"):
+        # Iteration over synonyms
+        keywords = VALUE_MAPPINGS[criterion].get(form_value, [])
+        return any(keyword in plant_value for keyword in keywords)
+    if criterion == "salt_wind_tolerance":
+        if "yes" in form_value:
+            return "yes" in plant_value or "coastal" in plant_value
+        if "no" in form_value:
+            return "no" in plant_value or "sheltered" in plant_value
+        return False
+    if criterion == "planting_space":
+        return any(size in form_value and size in plant_value for size in ("small", "medium", "large", "low"))
+    # flowering_time, ecological_function, soil_type: case-insensitive substring
+    return form_value in plant_value
+
+
+# Function: match_column
+# Purpose: Boolean column of plants satisfying one (criterion, option) pair
+# Inputs: masks (dict criterion -> int64 array), columns (dict criterion -> lower-cased strings)
+# Returns: numpy bool array
+
+
+def match_column(criterion, option, masks, columns, count):
+    if criterion in MASK_COLUMNS:
+        return (masks[criterion] & option_mask(criterion, option)) != 0
+    return np.fromiter((criterion_matches(criterion, option, value) for value in columns[criterion]),
+                       dtype=bool, count=count)
+
+
+# Class: RecommendationIndex
+# Purpose: Immutable, columnar snapshot of the catalogue compiled for survey scoring
+# Data structures:
+#   - snapshot.Snapshot source (mmap of a snapshot file, or in-memory bytes)
+#   - numpy int64 array ids; dict criterion -> numpy int64 bitmask column (views)
+#   - dict criterion -> StringColumn of lower-cased attribute text (free-text criteria)
+#   - dict (criterion, option) -> numpy bool array of matching plants (tag column);
+#     survey options are rows of the snapshot's tag matrix, other options are
+#     computed on demand and cached up to EXTRA_TAGS_MAX
+
+
+class RecommendationIndex:
+    def __init__(self, source):
+        self.source = source
+        self.state = (source.meta["catalogue_version"], source.meta["updated_at"])
+        self.ids = source.arrays["ids"]
+        self.masks = {criterion: source.arrays["mask:" + criterion] for criterion in MASK_COLUMNS}
+        self.columns = {criterion: source.strings["text:" + criterion] for criterion in TEXT_CRITERIA}
+        self.names = source.strings["scientific_name"]
+        self.images = source.strings["image_url"]
+        tags = source.arrays["tags"]
+        self._tags = {tuple(key): tags[row] for row, key in enumerate(source.meta["tags"])}
+        self._extra_tags = {}
+        self._extra_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.ids)
+
+    # Method: plant
+    # Purpose: Display record for the plant at a row position
+    # Returns: dict (id, scientific_name, image_url)
+
+    def plant(self, row):
+        return {"id": int(self.ids[row]), "scientific_name": self.names[row], "image_url": self.images[row] or None}
+
+    # Method: tag
+    # Purpose: Boolean column of plants satisfying one (criterion, option) pair;
+    #          precompiled in the snapshot for survey options, computed once otherwise
+
+    def tag(self, criterion, option):
+        key = (criterion, option.lower())
+        column = self._tags.get(key)
+        if column is None:
+            column = self._extra_tags.get(key)
+        if column is None:
+            column = match_column(criterion, key[1], self.masks, self.columns, len(self))
+            with self._extra_lock:
+                if len(self._extra_tags) >= EXTRA_TAGS_MAX:
+                    del self._extra_tags[next(iter(self._extra_tags))]
+                self._extra_tags[key] = column
+        return column
+
+    # Method: score_batch
+    # Purpose: Match ratio of every plant against many survey submissions at once
+    # Inputs: submissions (list[dict] form_data)
+    # Returns: numpy float64 array, shape (len(submissions), len(plants))
+    # Control structures:
+    #   - Iteration: collect the distinct (criterion, option) tags used by the batch
+    #   - Sequence: selection matrix @ tag matrix → match counts → ratios
+    # Data structures:
+    #   - Q: float32 (submissions x tags) 0/1 selection matrix
+    #   - T: float32 (tags x plants) 0/1 tag matrix
+
+    def score_batch(self, submissions):
+        keys = {}
+        selections = []
+        for form_data in submissions:
+            selected = [keys.setdefault((c, form_data[c].lower()), len(keys)) for c in CRITERIA if form_data.get(c)]
+            selections.append(selected)
+
+        n = len(self)
+        if not keys:
+            return np.ones((len(submissions), n))
+
+        tags = np.empty((len(keys), n), dtype=np.float32)
+        for (criterion, option), row in keys.items():
+            tags[row] = self.tag(criterion, option)
+        query = np.zeros((len(submissions), len(keys)), dtype=np.float32)
+        for i, selected in enumerate(selections):
+            query[i, selected] = 1.0
+
+        counts = (query @ tags).astype(np.float64)
+        totals = query.sum(axis=1, dtype=np.float64)[:, None]
+        # A submission with no criteria matches every plant (ratio 1.0)
+        return np.divide(counts, totals, out=np.ones_like(counts), where=totals > 0)
+
+    # Method: rank_batch
+    # Purpose: Ranked matches (best score first, then id) for many submissions
+    # Inputs: submissions (list[dict]); threshold (float); top_k (int | None)
+    # Returns: list[list[dict]] with keys 'id', 'scientific_name', 'image_url', 'score'
+    # Control structures:
+    #   - Iteration: submissions scored in chunks to bound the score matrix size
+    #   - Selection: threshold filter, optional top-k partial sort
+
+    def rank_batch(self, submissions, threshold=MATCH_THRESHOLD, top_k=None):
+        ranked = []
+        for start in range(0, len(submissions), BATCH_CHUNK_SIZE):
+            scores = self.score_batch(submissions[start:start + BATCH_CHUNK_SIZE])
+            for row in scores:
+                ranked.append(self._rank_row(row, threshold, top_k))
+        return ranked
+
+    def rank(self, form_data, threshold=MATCH_THRESHOLD, top_k=None):
+        return self.rank_batch([form_data], threshold, top_k)[0]
+
+    def _rank_row(self, scores, threshold, top_k):
+        candidates = np.flatnonzero(scores >= threshold)
+        if top_k is not None and len(candidates) > top_k:
+            # Partial sort: keep the top_k best scores (ties broken by id below)
+            cutoff = np.partition(scores[candidates], len(candidates) - top_k)[len(candidates) - top_k]
+            candidates = candidates[scores[candidates] >= cutoff]
+        order = candidates[np.lexsort((self.ids[candidates], -scores[candidates]))]
+        if top_k is not None:
+            order = order[:top_k]
+        return [dict(self.plant(i), score=float(scores[i])) for i in order]
+
+
+# Function: compile_catalogue
+# Purpose: Read the catalogue (one read transaction) and compile the snapshot contents
+# Returns: (meta dict, arrays dict, strings dict) for snapshot.write / snapshot.from_bytes
+# Data structures:
+#   - arrays: ids, one bitmask column per enumerated criterion, tags (options x plants bool)
+#   - strings: scientific_name, image_url, lower-cased text of each free-text criterion
+
+
+def compile_catalogue():
+    conn = db.get_connection()
+    owns_transaction = not conn.in_transaction  # version and rows must come from one read
+    if owns_transaction:
+        conn.execute("BEGIN")
+    try:
+        version, updated_at = conn.execute(db.SELECT_CATALOGUE_VERSION).fetchone()
+        rows = conn.execute(
+            "SELECT id, scientific_name, image_url, " + ", ".join(TEXT_CRITERIA + tuple(MASK_COLUMNS.values()))
+            + " FROM plants ORDER BY id"
+        ).fetchall()
+    finally:
+        if owns_transaction:
+            conn.execute("COMMIT")
+
+    masks = {
+        criterion: np.array([r[column] or 0 for r in rows], dtype=np.int64)
+        for criterion, column in MASK_COLUMNS.items()
+    }
+    columns = {criterion: [(r[criterion] or "").lower() for r in rows] for criterion in TEXT_CRITERIA}
+    keys = [[criterion, option.lower()] for criterion, options in SURVEY_OPTIONS.items() for option in options]
+    tags = np.zeros((len(keys), len(rows)), dtype=bool)
+    for row, (criterion, option) in enumerate(keys):
+        tags[row] = match_column(criterion, option, masks, columns, len(rows))
+
+    meta = {"catalogue_version": version, "updated_at": updated_at or 0, "rows": len(rows), "tags": keys}
+    arrays = {"ids": np.array([r["id"] for r in rows], dtype=np.int64), "tags": tags}
+    arrays.update(("mask:" + criterion, mask) for criterion, mask in masks.items())
+    strings = {"scientific_name": [r["scientific_name"] or "" for r in rows],
+               "image_url": [r["image_url"] or "" for r in rows]}
+    strings.update(("text:" + criterion, column) for criterion, column in columns.items())
+    return meta, arrays, strings
+
+
+def snapshot_dir():
+    if SNAPSHOT_DIR is not None:
+        return SNAPSHOT_DIR
+    return os.path.join(os.path.dirname(os.path.abspath(db.DB_PATH)), "catalogue_snapshots")
+
+
+def snapshot_path(directory, version, updated_at):
+    # The update time is part of the name so a restored older database never
+    # picks up a snapshot of a different catalogue with the same version number
+    return os.path.join(directory, f"{os.path.basename(db.DB_PATH)}.{version}-{updated_at or 0}.snap")
+
+
+# Function: publish_snapshot
+# Purpose: Compile the current catalogue into a snapshot file (once per version across
+#          all processes on the host) and delete superseded files
+# Returns: str path of the snapshot for the current version
+# Control structures:
+#   - Selection: another process may have built it while we waited for the lock
+
+
+def publish_snapshot(directory):
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, ".lock"), "a") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        path = snapshot_path(directory, *db.catalogue_state())
+        if not os.path.exists(path):
+            meta, arrays, strings = compile_catalogue()
+            path = snapshot_path(directory, meta["catalogue_version"], meta["updated_at"])
+            snapshot.write(path, meta, arrays, strings)
+            prefix = os.path.basename(db.DB_PATH) + "."
+            files = sorted((os.path.join(directory, name) for name in os.listdir(directory)
+                            if name.startswith(prefix) and name.endswith(".snap")), key=os.path.getmtime)
+            for old in files[:-SNAPSHOTS_KEPT]:
+                if old != path:
+                    os.remove(old)
+        return path
+
+
+# Function: load_index
+# Purpose: Index for the current catalogue: map the shared snapshot file, building it
+#          first if no process has yet; in memory when snapshots are disabled or the
+#          directory is not writable
+# Returns: RecommendationIndex
+
+
+def load_index():
+    directory = snapshot_dir()
+    if directory:
+        path = snapshot_path(directory, *db.catalogue_state())
+        try:
+            if not os.path.exists(path):
+                path = publish_snapshot(directory)
+            return RecommendationIndex(snapshot.open_mapped(path))
+        except OSError:
+            pass  # Selection: fall back to a private in-memory index
+    return RecommendationIndex(snapshot.from_bytes(*compile_catalogue()))
+
+
+# Shared index state: the mapped snapshot plus the SQLite data_version it was
+# checked at. data_version changes whenever another connection (in this or any
+# other worker process) commits, so changes are detected cheaply; the catalogue
+# version then decides whether a new snapshot is needed. data_version is read on
+# a dedicated connection because the counter is per-connection.
+_state = {"index": None, "data_version": None, "conn": None, "pid": None}
+_state_lock = threading.Lock()
+
+
+def _data_version():
+    if _state["conn"] is None or _state["pid"] != os.getpid():
+        _state["conn"] = db.connect(check_same_thread=False)
+        _state["pid"] = os.getpid()
+        _state["index"] = None
+    return _state["conn"].execute("PRAGMA data_version").fetchone()[0]
+
+
+# Function: get_index
+# Purpose: Return the current index, swapping to a new snapshot if the catalogue changed
+# Control structures:
+#   - Selection: reload when invalidated, or when the database has been written and
+#     the catalogue version differs from the mapped snapshot's
+#   - Requests already holding the old index keep using it until they finish
+
+
+def get_index():
+    with _state_lock:
+        data_version = _data_version()
+        index = _state["index"]
+        if index is None or _state["data_version"] != data_version:
+            version, updated_at = db.catalogue_state()
+            if index is None or index.state != (version, updated_at or 0):
+                _state["index"] = load_index()
+            _state["data_version"] = data_version
+        return _state["index"]
+
+
+# Function: invalidate_index
+# Purpose: Drop the compiled index so the next query rebuilds it
+#          (called after add_plant/remove_plant)
+
+
+def invalidate_index():
+    with _state_lock:
+        _state["index"] = None
@@ -0,0 +1,241 @@
+# Module: result_cache
+# Purpose: Cache of survey results (/results) keyed on the normalised survey answers
+# Features:
+#   - Canonical key: survey fields in a fixed order, values lower-cased (matching is
+#     case-insensitive), empty answers dropped, plus threshold and top-k. Answers are
+#     trimmed once, by app.survey_form, before both the key and the matchers see them
+#   - Each entry holds the matched plant ids and the rendered results page
+#   - Entries are stamped with the catalogue version (db.catalogue_version); any
+#     add/remove/import bumps it, so stale entries are never served
+#   - Bounded LRU with a TTL, hit/miss counters
+#   - Backends: "memory" (per process) or "sqlite" (a local file shared by every
+#     worker process on the host)
+# Data structures:
+#   - OrderedDict key -> CacheEntry (memory backend, LRU order)
+#   - table result_cache(key, version, created, accessed, ids, html) (sqlite backend)
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from recommend import SURVEY_OPTIONS
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_TTL = 600             # seconds
+TOUCH_INTERVAL = 1.0          # sqlite backend: refresh an entry's LRU timestamp at most once a second
+
+CacheEntry = namedtuple("CacheEntry", "version created ids html")
+
+
+# Function: survey_key
+# Purpose: Canonical cache key for one survey submission
+# Inputs: form_data (dict, from app.survey_form), threshold (float), top_k (int | None)
+# Returns: str (JSON; identical for equivalent submissions)
+
+
+def survey_key(form_data, threshold, top_k):
+    answers = []
+    for field in sorted(SURVEY_OPTIONS):
+        value = (form_data.get(field) or "").lower()
+        if value:
+            answers.append([field, value])
+    return json.dumps([answers, threshold, top_k], separators=(",", ":"))
+
+
+# Function: page_key
+# Purpose: Cache key of a rendered results page: the survey key plus the image-derivative
+#          state its <picture> markup was rendered with (images.derivatives_state), so a
+#          page is re-rendered once new derivatives exist
+# Returns: str
+
+
+def page_key(survey, derivatives):
+    return f"{survey}|{derivatives}"
+
+
+# Class: MemoryBackend
+# Purpose: In-process LRU store
+# Data structures:
+#   - OrderedDict key -> CacheEntry (least recently used first)
+
+
+class MemoryBackend:
+    name = "memory"
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            # Entries from older catalogue versions can never hit again
+            for stale in [k for k, e in self._entries.items() if e.version != entry.version]:
+                del self._entries[stale]
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Class: SQLiteBackend
+# Purpose: LRU store in a local SQLite file, shared by all worker processes
+# Notes:
+#   - Kept out of plants.db: writes there would change PRAGMA data_version and
+#     force needless index rebuilds (see recommend.get_index)
+#   - One connection per thread/process, WAL so readers never wait on a writer
+
+
+class SQLiteBackend:
+    name = "sqlite"
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS result_cache ("
+        "key TEXT PRIMARY KEY, version INTEGER NOT NULL, created REAL NOT NULL, "
+        "accessed REAL NOT NULL, ids TEXT NOT NULL, html TEXT NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS idx_result_cache_accessed ON result_cache (accessed)",
+    )
+
+    def __init__(self, path, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, isolation_level=None)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = OFF")   # cache contents are disposable
+            conn.execute("PRAGMA busy_timeout = 5000")
+            for statement in self.SCHEMA:
+                conn.execute(statement)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key):
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT version, created, accessed, ids, html FROM result_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        if now - row[2] > TOUCH_INTERVAL:  # Selection: approximate LRU, avoids a write per hit
+            conn.execute("UPDATE result_cache SET accessed = ? WHERE key = ?", (now, key))
+        return CacheEntry(row[0], row[1], json.loads(row[3]), row[4])
+
+    def put(self, key, entry):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM result_cache WHERE version != ?", (entry.version,))
+            conn.execute(
+                "INSERT OR REPLACE INTO result_cache (key, version, created, accessed, ids, html) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, entry.version, entry.created, entry.created, json.dumps(entry.ids), entry.html),
+            )
+            conn.execute(
+                "DELETE FROM result_cache WHERE key IN (SELECT key FROM result_cache ORDER BY accessed DESC "
+                "LIMIT -1 OFFSET ?)", (self.max_entries,)
+            )
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def delete(self, key):
+        self._connection().execute("DELETE FROM result_cache WHERE key = ?", (key,))
+
+    def clear(self):
+        self._connection().execute("DELETE FROM result_cache")
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM result_cache").fetchone()[0]
+
+
+# Class: ResultCache
+# Purpose: Version- and TTL-checked lookups over a backend, with hit/miss counters
+# Data structures:
+#   - backend (MemoryBackend | SQLiteBackend); int counters (per process)
+
+
+class ResultCache:
+    def __init__(self, backend, ttl=DEFAULT_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    # Method: get
+    # Purpose: Cached entry for key if it belongs to the current catalogue version and is fresh
+    # Returns: CacheEntry | None
+
+    def get(self, key, version):
+        entry = self.backend.get(key)
+        if entry is not None and (entry.version != version or time.time() - entry.created > self.ttl):
+            self.backend.delete(key)
+            entry = None
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return entry
+
+    def put(self, key, version, ids, html):
+        self.backend.put(key, CacheEntry(version, time.time(), list(ids), html))
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            "backend": self.backend.name,
+            "entries": len(self.backend),
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": hits / lookups if lookups else 0.0,
+        }
+
+
+# Function: create_cache
+# Purpose: Build a ResultCache from settings
+# Inputs: backend ("memory" | "sqlite"), path (sqlite file), max_entries (int), ttl (seconds)
+# Returns: ResultCache
+# Control structures:
+#   - Selection: backend name; ValueError for unknown backends
+
+
+def create_cache(backend="memory", path="result_cache.db", max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL):
+    if backend == "memory":
+        return ResultCache(MemoryBackend(max_entries), ttl)
+    if backend == "sqlite":
+        return ResultCache(SQLiteBackend(path, max_entries), ttl)
+    raise ValueError(f"Unknown result cache backend: {backend!r}")
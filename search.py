@@ -0,0 +1,376 @@
+# Module: search
+# Purpose: Full-text plant search backed by SQLite FTS5
+# Features:
+#   - Word-prefix search over scientific_name, common_name, ecological_function and
+#     soil_type ("acac dealb" finds Acacia dealbata). Matches in the names are ranked by
+#     bm25 over every match (names weighted highest); matches found only in the
+#     attribute columns follow, unranked, in id order
+#   - Typo tolerance: when prefix search finds nothing, each query word is looked up in
+#     the vocabulary of name words by the padded trigrams they share (most shared first),
+#     accepted by edit distance (Damerau-Levenshtein, scaled with word length), and the
+#     plants using those words are fetched from the FTS index, fewest edits first. So
+#     single substitutions and transpositions ("acasia", "banskia", "Saqcocornia") still
+#     find Acacia, Banksia and Sarcocornia
+#   - Name vocabulary kept in memory per catalogue version, patched from the change log
+#     (db.py) rather than re-read after each write; loaded at start-up (app.py warm-up)
+#   - The FTS table is an external-content table kept in sync by triggers (see db.py),
+#     so every write path (dashboard, importer) updates the index in the same transaction
+#   - LIKE fallback when the SQLite build has no FTS5
+# Data structures:
+#   - list[str] query tokens; set[str] padded trigrams
+#   - name vocabulary: list of words, numpy word lengths, dict padded trigram -> numpy
+#     array of word positions
+#   - list[dict] results (id, scientific_name, common_name, image_url, match)
+
+import re
+import sqlite3
+import threading
+
+import numpy as np
+
+import db
+
+SEARCH_LIMIT = 20                  # default number of results
+FUZZY_WORDS = 50                   # vocabulary words checked by edit distance per query word
+
+# Typos accepted per query word, by word length: (longest word length, edits allowed).
+# Longer words allow 2; words under 4 letters must match exactly (prefix search covers them).
+FUZZY_MAX_EDITS = ((3, 0), (6, 1))
+FUZZY_LONG_WORD_EDITS = 2
+
+# bm25 column weights, in plants_fts column order
+FTS_WEIGHTS = (10.0, 8.0, 2.0, 1.0)
+
+# Trigrams destroyed by one edit (a transposition touches the four trigrams over its two letters)
+TRIGRAMS_PER_EDIT = 4
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+NAME_FILTER = "{scientific_name common_name}"
+BM25 = "bm25(plants_fts, " + ", ".join(map(str, FTS_WEIGHTS)) + ")"
+# Best matches by bm25: every match is scored, ORDER BY ... LIMIT keeps the best
+SEARCH_RANKED = (
+    "SELECT p.id, p.scientific_name, p.common_name, p.image_url FROM ("
+    "SELECT rowid, " + BM25 + " AS score FROM plants_fts WHERE plants_fts MATCH ? "
+    "ORDER BY score, rowid LIMIT ?) AS f JOIN plants p ON p.id = f.rowid ORDER BY f.score, p.id"
+)
+# First matches in id order, unranked (read lazily: stops after LIMIT rows)
+SEARCH_UNRANKED = (
+    "SELECT p.id, p.scientific_name, p.common_name, p.image_url FROM plants_fts f "
+    "JOIN plants p ON p.id = f.rowid WHERE plants_fts MATCH ? ORDER BY f.rowid LIMIT ?"
+)
+SELECT_NAMES = "SELECT scientific_name, common_name FROM plants"
+SELECT_CHANGED_NAMES = SELECT_NAMES + " WHERE changed_version > ?"
+SEARCH_LIKE = (
+    "SELECT id, scientific_name, common_name, image_url FROM plants "
+    "WHERE scientific_name LIKE ? OR common_name LIKE ? ORDER BY scientific_name LIMIT ?"
+)
+
+
+# Function: tokenize
+# Purpose: Lower-cased word tokens of a search string (punctuation and FTS syntax dropped)
+# Returns: list[str]
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall((text or "").lower())
+
+
+# Function: padded_trigrams
+# Purpose: Trigrams of one word padded with two "$" each side, so the ends of short
+#          words count too ("acasia" and "acacia" share $$a, $ac, aca, ia$, a$$)
+# Returns: set[str]
+
+
+def padded_trigrams(word):
+    padded = f"$${word}$$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+# Function: max_edits
+# Purpose: Typos tolerated in a query word of this length (FUZZY_MAX_EDITS)
+# Returns: int
+
+
+def max_edits(word):
+    for longest, edits in FUZZY_MAX_EDITS:
+        if len(word) <= longest:
+            return edits
+    return FUZZY_LONG_WORD_EDITS
+
+
+# Function: edit_distance
+# Purpose: Damerau-Levenshtein (optimal string alignment) distance from a query word to
+#          a name word or any prefix of it, so a misspelt prefix ("acasi") also matches
+# Inputs: word (query), target (name word), limit (int, largest distance of interest)
+# Returns: int (edits: insertion, deletion, substitution, adjacent transposition);
+#          limit + 1 when the distance exceeds limit
+# Data structures:
+#   - one column of the edit matrix held as bit vectors over the query letters (Myers'
+#     bit-parallel algorithm with Hyyrö's transposition step), advanced one target letter
+#     at a time; the score tracks the last row, i.e. the distance to each target prefix
+#     (prefixes longer than the word plus limit cannot be closer, so they are cut)
+
+
+def edit_distance(word, target, limit):
+    target = target[:len(word) + limit]
+    if len(target) + limit < len(word) or len(set(word).difference(target)) > limit:
+        return limit + 1  # Selection: each letter the target lacks costs at least one edit
+    mask = (1 << len(word)) - 1
+    last = 1 << (len(word) - 1)
+    letters = {}
+    for i, letter in enumerate(word):
+        letters[letter] = letters.get(letter, 0) | 1 << i
+    positive, negative, diagonal, previous = mask, 0, 0, 0
+    score = best = len(word)
+    for letter in target:  # Iteration: one matrix column per target letter
+        match = letters.get(letter, 0)
+        transposed = (((~diagonal) & match) << 1) & previous
+        diagonal = transposed | (((match & positive) + positive) ^ positive) | match | negative
+        up = negative | ~(diagonal | positive) & mask
+        down = positive & diagonal
+        if up & last:
+            score += 1
+        elif down & last:
+            score -= 1
+            best = min(best, score)
+        up = (up << 1 | 1) & mask
+        negative = up & diagonal
+        positive = ((down << 1) | ~(up | diagonal)) & mask
+        previous = match
+    return best if best <= limit else limit + 1
+
+
+# Function: typo_distance
+# Purpose: Edits needed for every query word to match some word of a plant's names
+# Inputs: tokens (list[str]), plant (row with scientific_name, common_name),
+#         nearest (per token: dict name word -> edits, from nearest_words)
+# Returns: int total edits | None when a query word matches no name word
+# Notes:
+#   - A name word the token is a prefix of costs nothing (the token may be unfinished)
+
+
+def typo_distance(tokens, plant, nearest):
+    words = set(tokenize(plant["scientific_name"])) | set(tokenize(plant["common_name"]))
+    total = 0
+    for token, known in zip(tokens, nearest):  # Iteration: best name word per query word
+        best = min((0 if word.startswith(token) else known.get(word, len(token)) for word in words), default=None)
+        if best is None or best > max_edits(token):
+            return None
+        total += best
+    return total
+
+
+# Function: prefix_search
+# Purpose: FTS5 prefix search; every token must prefix-match some indexed word
+# Returns: list[dict]: plants matching in the names, best bm25 first; then, while the
+#          limit is not reached, plants matching only with the attribute columns, in id order
+# Notes:
+#   - Only name matches are ranked: scoring every plant whose soil or function mentions a
+#     common word costs tens of milliseconds on a large catalogue
+
+
+def prefix_search(tokens, limit):
+    expression = " ".join(f'"{token}"*' for token in tokens)
+    names = f"{NAME_FILTER}: ({expression})"
+    conn = db.get_connection()
+    rows = conn.execute(SEARCH_RANKED, (names, limit)).fetchall()
+    if len(rows) < limit:
+        rows += conn.execute(SEARCH_UNRANKED, (f"({expression}) NOT {names}", limit - len(rows))).fetchall()
+    return [dict(row, match="prefix") for row in rows]
+
+
+# Name vocabulary of the last database searched in this process, at one catalogue state:
+# words (list[str]), positions (dict word -> index), lengths (numpy int64 per word),
+# index (dict padded trigram -> numpy int32 word indexes). Words of deleted or renamed
+# plants stay (they simply find no plants).
+_vocabulary = {"database": None, "state": None}
+_vocabulary_lock = threading.Lock()
+
+
+# Function: _add_words
+# Purpose: Add the new name words of some plants to the vocabulary
+# Inputs: vocabulary (dict, see _vocabulary), rows (iterable of (scientific_name, common_name))
+
+
+def _add_words(vocabulary, rows):
+    words, positions = vocabulary["words"], vocabulary["positions"]
+    start = len(words)
+    for row in rows:
+        for word in tokenize(row[0]) + tokenize(row[1]):
+            if word not in positions:
+                positions[word] = len(words)
+                words.append(word)
+    if len(words) == start:
+        return
+    postings = {}
+    for position in range(start, len(words)):
+        for gram in padded_trigrams(words[position]):
+            postings.setdefault(gram, []).append(position)
+    index = vocabulary["index"]
+    for gram, added in postings.items():
+        added = np.array(added, dtype=np.int32)
+        index[gram] = np.concatenate([index[gram], added]) if gram in index else added
+    added_lengths = np.array([len(word) for word in words[start:]], dtype=np.int64)
+    vocabulary["lengths"] = np.concatenate([vocabulary["lengths"], added_lengths])
+
+
+# Function: _current_vocabulary
+# Purpose: The name vocabulary at the current catalogue state; call holding _vocabulary_lock
+# Returns: dict (see _vocabulary)
+# Control structures:
+#   - Selection: same state → as is; a later version of the same database → add the words
+#     of plants changed since (change log); otherwise → read every name
+
+
+def _current_vocabulary():
+    state = db.catalogue_state()
+    cached = _vocabulary["database"] == db.DB_PATH and _vocabulary["state"]
+    if cached != state:
+        conn = db.get_connection()
+        if cached and cached[0] < state[0]:
+            _add_words(_vocabulary, conn.execute(SELECT_CHANGED_NAMES, (cached[0],)))
+        else:
+            _vocabulary.update(words=[], positions={}, lengths=np.zeros(0, dtype=np.int64), index={})
+            _add_words(_vocabulary, conn.execute(SELECT_NAMES))
+        _vocabulary.update(database=db.DB_PATH, state=state)
+    return _vocabulary
+
+
+# Function: load_vocabulary
+# Purpose: Read the name vocabulary now (app warm-up), so the first typo search of a
+#          process does not pay for it
+# Returns: int (words in the vocabulary)
+
+
+def load_vocabulary():
+    with _vocabulary_lock:
+        return len(_current_vocabulary()["words"])
+
+
+# Function: nearest_words
+# Purpose: Name words within max_edits of a query word, nearest first
+# Inputs: vocabulary (dict, see _vocabulary), token (str)
+# Returns: list[(int edits, str word)]
+# Control structures:
+#   - Sequence: count the padded trigrams each word shares with the token (one bincount
+#     over the token's postings) → keep words of a close length sharing enough of them
+#     → the FUZZY_WORDS sharing most → edit distance
+# Notes:
+#   - Each edit destroys at most TRIGRAMS_PER_EDIT trigrams, so a word within `limit`
+#     edits shares at least (token trigrams - TRIGRAMS_PER_EDIT * limit) of them
+
+
+def nearest_words(vocabulary, token):
+    limit = max_edits(token)
+    grams = padded_trigrams(token)
+    postings = [vocabulary["index"][gram] for gram in grams if gram in vocabulary["index"]]
+    if not postings:
+        return []
+    words = vocabulary["words"]
+    shared = np.bincount(np.concatenate(postings), minlength=len(words))
+    close = np.abs(vocabulary["lengths"] - len(token)) <= limit
+    candidates = np.flatnonzero(close & (shared >= len(grams) - TRIGRAMS_PER_EDIT * limit))
+    if len(candidates) > FUZZY_WORDS:
+        candidates = candidates[np.argpartition(-shared[candidates], FUZZY_WORDS)[:FUZZY_WORDS]]
+    matches = []
+    for position in candidates:
+        distance = edit_distance(token, words[position], limit)
+        if distance <= limit:
+            matches.append((distance, words[position]))
+    return sorted(matches)
+
+
+# Function: fetch_typo_matches
+# Purpose: Plants whose names use, for every query word, one of its nearest name words
+#          (or a word the query word prefixes), fewest total edits first
+# Inputs: tokens (list[str]), nearest (per token: list[(edits, word)], nearest first), limit
+# Returns: list[dict] ordered by total edits, then id
+# Control structures:
+#   - Iteration: tiers of increasing distance, from each query word's nearest words up to
+#     FUZZY_LONG_WORD_EDITS more; stops once a tier brings the results to `limit`, so a
+#     farther match never displaces a nearer one
+# Notes:
+#   - Every plant fetched uses a matching word, so the plants are read in id order with
+#     no ranking pass: a common genus ("banksia") has thousands of matches
+
+
+def fetch_typo_matches(tokens, nearest, limit):
+    known = [{word: distance for distance, word in words} for words in nearest]
+    conn = db.get_connection()
+    found = {}
+    previous = None
+    for extra in range(FUZZY_LONG_WORD_EDITS + 1):
+        alternatives = [[word for distance, word in words if distance <= words[0][0] + extra] if words else []
+                        for words in nearest]
+        if alternatives == previous:
+            continue
+        previous = alternatives
+        expression = " AND ".join(
+            "(" + " OR ".join([f'"{word}"' for word in words] + ([] if token in words else [f'"{token}"*'])) + ")"
+            for token, words in zip(tokens, alternatives)
+        )
+        for row in conn.execute(SEARCH_UNRANKED, (f"{NAME_FILTER}: ({expression})", limit + len(found))):
+            if row["id"] not in found:
+                distance = typo_distance(tokens, row, known)
+                if distance is not None:
+                    found[row["id"]] = (distance, row["id"], dict(row, match="fuzzy"))
+        if len(found) >= limit:
+            break
+    return [item[2] for item in sorted(found.values(), key=lambda item: item[:2])[:limit]]
+
+
+# Function: fuzzy_search
+# Purpose: Typo-tolerant search through the name vocabulary
+# Returns: list[dict] ordered by total edits, then id
+# Control structures:
+#   - Selection: query words that are name words are taken as typed (and as finished);
+#     only when that finds nothing are their neighbours tried too (a typo can turn one
+#     name word into another)
+
+
+def fuzzy_search(tokens, limit):
+    with _vocabulary_lock:
+        vocabulary = _current_vocabulary()
+        exact = [token in vocabulary["positions"] for token in tokens]
+        nearest = [[(0, token)] if is_word else nearest_words(vocabulary, token)
+                   for token, is_word in zip(tokens, exact)]
+    results = fetch_typo_matches(tokens, nearest, limit)
+    if not results and any(exact):
+        with _vocabulary_lock:
+            vocabulary = _current_vocabulary()
+            nearest = [nearest_words(vocabulary, token) for token in tokens]
+        results = fetch_typo_matches(tokens, nearest, limit)
+    return results
+
+
+# Function: like_search
+# Purpose: Substring search on the names for SQLite builds without FTS5
+# Returns: list[dict]
+
+
+def like_search(text, limit):
+    pattern = "%" + text.replace("\\", "").replace("%", "").replace("_", "") + "%"
+    rows = db.get_connection().execute(SEARCH_LIKE, (pattern, pattern, limit)).fetchall()
+    return [dict(row, match="substring") for row in rows]
+
+
+# Function: search_plants
+# Purpose: Search the catalogue for a free-text query
+# Inputs: text (str), limit (int)
+# Returns: list[dict] with keys 'id', 'scientific_name', 'common_name', 'image_url',
+#          'match' ("prefix", "fuzzy" or "substring")
+# Control structures:
+#   - Selection: empty query → no results
+#   - Selection: prefix matches; fuzzy (name vocabulary) matches only when prefix search finds nothing
+#   - Selection: LIKE fallback when the FTS tables are unavailable
+
+
+def search_plants(text, limit=SEARCH_LIMIT):
+    tokens = tokenize(text)
+    if not tokens:
+        return []
+    try:
+        return prefix_search(tokens, limit) or fuzzy_search(tokens, limit)
+    except sqlite3.OperationalError:  # e.g. SQLite compiled without FTS5
+        return like_search(" ".join(tokens), limit)
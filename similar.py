@@ -0,0 +1,511 @@
+# Module: similar
+# Purpose: Precomputed "similar plants" (nearest neighbours) for the plant details page
+# Features:
+#   - Each plant encoded from its normalised columns as one bit group per attribute:
+#     sunlight, water, salt/wind, type, planting space (the normalise.py bitmasks),
+#     soil (keyword bits), flowering months (12 bits), height (bands its range covers)
+#   - Similarity = mean over the attribute groups of the cosine (Ochiai) overlap of the
+#     two plants' bits; an attribute unknown for either plant counts as no overlap.
+#     Every group's bits are scaled by 1/sqrt(bits set), so a whole row of scores is one
+#     matrix-vector product
+#   - Top SIMILAR_COUNT neighbours per plant stored in the similar_plants table, so a
+#     page view reads SIMILAR_COUNT rows by primary key whatever the catalogue size
+#   - Brought up to date after each write, outside its transaction (db.sync_similar_plants):
+#     the plants changed since the version the table reflects come from the change log
+#     (db.py); the new lists are computed from one read (prepare), then written in a
+#     short write transaction that first checks no other process moved the table (apply).
+#     An added or edited plant costs one pass over the catalogue (its own neighbours,
+#     plus plants whose lists it enters); a removed one re-ranks only the plants that listed it
+#   - Encoded matrix kept in memory per catalogue version and patched from the change
+#     log, so a write re-encodes only the rows it changed; likewise the lists' entry bars
+#     per table version, patched for the lists each sync rewrote
+#   - More than INCREMENTAL_MAX changes at once (imports, large batches) mark the table
+#     stale. A rebuild (background job, import CLI, or right away while the catalogue is
+#     small: REBUILD_MAX) computes every list outside any transaction, fills a new table
+#     in committed batches and renames it over the old one in one short write; pages keep
+#     reading the previous lists meanwhile
+#   - Full rebuild ranks each distinct attribute signature once, not each plant
+# Data structures:
+#   - table similar_plants(plant_id, similar_id, score), primary key (plant_id, similar_id)
+#   - table similar_plants_next: same columns, filled by the rebuild in progress
+#   - table similar_plants_state(id = 1, stale, version: catalogue version the lists
+#     reflect, builder: token of the rebuild allowed to fill similar_plants_next)
+#   - numpy float32 matrix (plants x encoded bits), rows in id order
+#   - int64 ranking keys: rounded score, then lower id first
+
+import os
+import threading
+from collections import namedtuple
+
+import numpy as np
+
+from normalise import KEYWORD_BITS, MASK_COLUMNS
+
+# Neighbours stored (and shown) per plant
+SIMILAR_COUNT = int(os.environ.get("NURSERYMATE_SIMILAR_PLANTS", "6"))
+
+# Changes synced incrementally; more than this since the last sync mark the table stale
+INCREMENTAL_MAX = 200
+
+# Largest catalogue rebuilt right away when the table goes stale (by the writer that
+# staled it); rebuild time grows with (distinct signatures x plants): under two seconds here
+REBUILD_MAX = 10000
+
+# Rows a rebuild writes per committed transaction (each holds the write lock briefly)
+REBUILD_BATCH_ROWS = 20000
+
+# Compute-then-write rounds per sync before leaving the rest to the next one (a round
+# is discarded when another process updated the table while it was being computed)
+SYNC_ATTEMPTS = 3
+
+# Scores computed per matrix product (rows x catalogue size; bounds memory to ~32 MB per array)
+CHUNK_CELLS = 1 << 22
+
+# Scores are stored and compared rounded, so ties (and their id order) are the same
+# whichever path computed them
+SCORE_DECIMALS = 4
+
+# Soil is free text; keyword groups give it a bit set like the enumerated attributes
+SOIL_KEYWORDS = (
+    ("sand",), ("loam",), ("clay", "heavy"), ("moist",), ("well-drained", "well drained"),
+    ("dry",), ("saline", "coastal", "tidal", "mud"), ("waterlogged", "swamp", "wet"),
+)
+
+# Height bands in metres: a plant gets the bit of every band its height range touches
+HEIGHT_BANDS = (0.3, 1.0, 3.0, 10.0)
+
+# Attribute groups: name -> number of bits
+GROUPS = {criterion: len(KEYWORD_BITS[criterion]) for criterion in MASK_COLUMNS}
+GROUPS.update(soil_type=len(SOIL_KEYWORDS), flowering_months=12, height=len(HEIGHT_BANDS) + 1)
+
+SELECT_FEATURES = (
+    "SELECT id, " + ", ".join(MASK_COLUMNS.values())
+    + ", soil_type, flowering_months, height_min, height_max FROM plants"
+)
+SELECT_ALL_FEATURES = SELECT_FEATURES + " ORDER BY id"
+SELECT_CHANGED_FEATURES = SELECT_FEATURES + " WHERE changed_version > ? ORDER BY id"
+# Change log and catalogue version (db.py)
+SELECT_CHANGED_IDS = "SELECT id FROM plants WHERE changed_version > ?"
+SELECT_REMOVED_IDS = "SELECT plant_id FROM plant_tombstones WHERE version > ?"
+SELECT_CATALOGUE_STATE = "SELECT version, updated_at FROM catalogue_version WHERE id = 1"
+
+CREATE_TABLE = (
+    "CREATE TABLE IF NOT EXISTS {table} (plant_id INTEGER NOT NULL, similar_id INTEGER NOT NULL, "
+    "score REAL NOT NULL, PRIMARY KEY (plant_id, similar_id)) WITHOUT ROWID"
+)
+CREATE_INDEX = "CREATE INDEX {index} ON {table} (similar_id)"
+# A rebuilt table is renamed over similar_plants with its index, so the similar_id index
+# alternates between these names (the new table takes the one the live table lacks)
+INDEX_NAMES = ("idx_similar_plants_similar_id", "idx_similar_plants_similar_id_next")
+SELECT_INDEXES = "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ?"
+CREATE_STATE = (
+    "CREATE TABLE IF NOT EXISTS similar_plants_state (id INTEGER PRIMARY KEY CHECK (id = 1), "
+    "stale INTEGER NOT NULL, version INTEGER NOT NULL DEFAULT 0, builder TEXT)"
+)
+SELECT_STATE = "SELECT stale, version, builder FROM similar_plants_state WHERE id = 1"
+INSERT_STATE = "INSERT OR IGNORE INTO similar_plants_state (id, stale, version) VALUES (1, 1, 0)"
+SET_STALE = "UPDATE similar_plants_state SET stale = 1 WHERE id = 1"
+SET_VERSION = "UPDATE similar_plants_state SET version = ? WHERE id = 1"
+SET_BUILDER = "UPDATE similar_plants_state SET builder = ? WHERE id = 1"
+FINISH_REBUILD = "UPDATE similar_plants_state SET stale = 0, version = ?, builder = NULL WHERE id = 1"
+INSERT_SIMILAR = "INSERT OR REPLACE INTO similar_plants (plant_id, similar_id, score) VALUES (?, ?, ?)"
+INSERT_NEXT = "INSERT INTO similar_plants_next (plant_id, similar_id, score) VALUES (?, ?, ?)"
+# Keep the best SIMILAR_COUNT rows of one plant (after candidates were added to it)
+TRIM_SIMILAR = (
+    "DELETE FROM similar_plants WHERE plant_id = :plant AND similar_id NOT IN ("
+    "SELECT similar_id FROM similar_plants WHERE plant_id = :plant "
+    "ORDER BY score DESC, similar_id LIMIT :count)"
+)
+# Entry bar of every plant's list (or of the listed plants'): its length and its lowest score
+SELECT_FLOORS = "SELECT plant_id, COUNT(*), MIN(score) FROM similar_plants GROUP BY plant_id"
+SELECT_SOME_FLOORS = (
+    "SELECT plant_id, COUNT(*), MIN(score) FROM similar_plants WHERE plant_id IN ({marks}) GROUP BY plant_id"
+)
+
+# Upper bound on ids per "IN (...)" statement (SQLite's host parameter limit)
+MAX_IN_PARAMETERS = 500
+
+
+# Function: encode
+# Purpose: Encoded attribute vectors of plants
+# Inputs: rows (sequence of mappings with the SELECT_FEATURES columns)
+# Returns: numpy float32 array (len(rows) x total bits); each group's bits scaled to unit length
+# Control structures:
+#   - Iteration: one column block per attribute group, filled from the bitmasks / text / ranges
+
+
+def encode(rows):
+    blocks = []
+    for criterion, column in MASK_COLUMNS.items():
+        masks = np.array([row[column] or 0 for row in rows], dtype=np.int64)
+        blocks.append((masks[:, None] >> np.arange(GROUPS[criterion])) & 1)
+
+    soils = [row["soil_type"] or "" for row in rows]
+    soil_bits = {soil: [any(k in soil.lower() for k in keywords) for keywords in SOIL_KEYWORDS]
+                 for soil in set(soils)}  # few distinct values, each matched once
+    blocks.append(np.array([soil_bits[soil] for soil in soils], dtype=np.int64).reshape(len(rows), len(SOIL_KEYWORDS)))
+
+    months = np.array([row["flowering_months"] or 0 for row in rows], dtype=np.int64)
+    blocks.append((months[:, None] >> np.arange(12)) & 1)
+
+    edges = np.array((0.0,) + HEIGHT_BANDS + (np.inf,))
+    low = np.array([np.nan if row["height_min"] is None else row["height_min"] for row in rows], dtype=np.float64)
+    high = np.array([np.nan if row["height_max"] is None else row["height_max"] for row in rows], dtype=np.float64)
+    with np.errstate(invalid="ignore"):  # unknown heights (NaN) touch no band
+        blocks.append(((low[:, None] < edges[1:]) & (high[:, None] >= edges[:-1])).astype(np.int64))
+
+    vectors = []
+    for bits in blocks:
+        counts = bits.sum(axis=1, keepdims=True)
+        vectors.append(np.divide(bits, np.sqrt(counts), out=np.zeros(bits.shape), where=counts > 0))
+    return np.hstack(vectors).astype(np.float32)
+
+
+def _read(conn, sql, parameters=()):
+    rows = conn.execute(sql, parameters).fetchall()
+    return np.array([row["id"] for row in rows], dtype=np.int64), encode(rows)
+
+
+# Encoded catalogue of the last database read in this process, at one catalogue state.
+# Arrays are replaced, never modified, so callers may keep using the ones they got.
+_matrix = {"database": None, "state": None, "ids": None, "vectors": None}
+_matrix_lock = threading.Lock()
+
+
+# Function: load
+# Purpose: Encoded catalogue as of the caller's read transaction
+# Inputs: conn (sqlite3 connection inside a transaction)
+# Returns: (int catalogue version, int64 ids in order, float32 vectors)
+# Control structures:
+#   - Selection: same catalogue state as the cached matrix → reuse it; a later version
+#     → re-encode only the rows changed since (change log) and drop the deleted ones;
+#     otherwise (first use, another database, older version) → encode every row
+#   - Selection: more changes than a quarter of the catalogue → encode every row
+
+
+def load(conn):
+    database = conn.execute("PRAGMA database_list").fetchone()[2]
+    state = tuple(conn.execute(SELECT_CATALOGUE_STATE).fetchone())
+    with _matrix_lock:
+        cached = _matrix["database"] == database and _matrix["state"]
+        if cached == state:
+            return state[0], _matrix["ids"], _matrix["vectors"]
+        ids = None
+        if cached and cached[0] < state[0]:
+            ids, vectors = _matrix["ids"], _matrix["vectors"]
+            changed_ids, changed = _read(conn, SELECT_CHANGED_FEATURES, (cached[0],))
+            removed = [row[0] for row in conn.execute(SELECT_REMOVED_IDS, (cached[0],))]
+            if len(changed_ids) + len(removed) <= len(ids) // 4:
+                keep = ~np.isin(ids, np.concatenate([changed_ids, np.array(removed, dtype=np.int64)]))
+                ids = np.concatenate([ids[keep], changed_ids])
+                order = np.argsort(ids, kind="stable")
+                ids, vectors = ids[order], np.vstack([vectors[keep], changed])[order]
+            else:
+                ids = None
+        if ids is None:
+            ids, vectors = _read(conn, SELECT_ALL_FEATURES)
+        _matrix.update(database=database, state=state, ids=ids, vectors=vectors)
+        return state[0], ids, vectors
+
+
+# Function: _ranking_keys
+# Purpose: Integer keys ordering every plant for a chunk of query vectors (higher = more similar)
+# Returns: (int64 keys chunk x plants, int64 rounded scores chunk x plants)
+# Notes:
+#   - key = rounded score * plants + (plants - 1 - row), so equal scores rank lower ids
+#     (rows are in id order) first and argpartition gives the exact same top-k as a sort
+
+
+def _ranking_keys(queries, vectors):
+    products = queries @ vectors.T
+    np.multiply(products, 10 ** SCORE_DECIMALS / len(GROUPS), out=products)
+    scores = np.rint(products, out=products).astype(np.int64)
+    n = vectors.shape[0]
+    keys = scores * n
+    keys += n - 1 - np.arange(n)
+    return keys, scores
+
+
+# Function: _top
+# Purpose: Best `count` rows per query, best first, plants with no overlap left out
+# Returns: list[list[(int row, int rounded score)]]
+
+
+def _top(queries, vectors, count):
+    keys, scores = _ranking_keys(queries, vectors)
+    n = keys.shape[1]
+    count = min(count, n)
+    if count == 0:
+        return [[] for _ in range(len(queries))]
+    best = np.argpartition(keys, n - count, axis=1)[:, n - count:]
+    best = np.take_along_axis(best, np.argsort(np.take_along_axis(keys, best, axis=1), axis=1)[:, ::-1], axis=1)
+    return [[(row, scores[i, row]) for row in best[i] if scores[i, row] > 0] for i in range(len(queries))]
+
+
+# Function: _positions
+# Purpose: Row positions of the plants that still exist (ids are sorted)
+# Returns: list[int]
+
+
+def _positions(ids, plant_ids):
+    plant_ids = np.array(sorted(plant_ids), dtype=np.int64)
+    rows = np.searchsorted(ids, plant_ids)
+    found = rows < len(ids)
+    found[found] = ids[rows[found]] == plant_ids[found]
+    return rows[found].tolist()
+
+
+def _chunks(rows, plants):
+    size = max(1, CHUNK_CELLS // max(plants, 1))
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def _score(rounded):
+    return rounded / 10 ** SCORE_DECIMALS
+
+
+def _in_chunks(values):
+    values = list(values)
+    for start in range(0, len(values), MAX_IN_PARAMETERS):
+        chunk = values[start:start + MAX_IN_PARAMETERS]
+        yield chunk, ", ".join("?" * len(chunk))
+
+
+# Entry bars of the table at one similar_plants_state version: the table's content at
+# a version does not depend on how it got there (rebuild or syncs), so any process may
+# reuse them. Arrays sorted by plant id, replaced rather than modified.
+_bars = {"database": None, "version": None, "bars": None}
+_bars_lock = threading.Lock()
+
+
+def _read_bars(conn, sql, parameters=()):
+    cursor = conn.cursor()
+    cursor.row_factory = None  # plain tuples convert to an array directly
+    floors = np.array(cursor.execute(sql, parameters).fetchall(), dtype=np.float64).reshape(-1, 3)
+    lowest = np.rint(floors[:, 2] * 10 ** SCORE_DECIMALS).astype(np.int64)
+    return floors[:, 0].astype(np.int64), floors[:, 1].astype(np.int64), lowest
+
+
+# Function: _entry_bars
+# Purpose: Length and lowest rounded score of every stored list, at the table's version
+# Returns: (int64 plant ids, int64 list lengths, int64 lowest rounded scores)
+
+
+def _entry_bars(conn, version):
+    database = conn.execute("PRAGMA database_list").fetchone()[2]
+    with _bars_lock:
+        if (_bars["database"], _bars["version"]) != (database, version):
+            _bars.update(database=database, version=version, bars=_read_bars(conn, SELECT_FLOORS))
+        return _bars["bars"]
+
+
+# Function: _patch_entry_bars
+# Purpose: Carry the cached entry bars over an applied Update (re-read the rewritten lists only)
+# Inputs: conn (inside the write transaction that applied it), update, rewritten (plant ids)
+
+
+def _patch_entry_bars(conn, update, rewritten):
+    database = conn.execute("PRAGMA database_list").fetchone()[2]
+    with _bars_lock:
+        if (_bars["database"], _bars["version"]) != (database, update.base):
+            return
+        plant_ids, listed, lowest = _bars["bars"]
+        keep = ~np.isin(plant_ids, np.array(rewritten, dtype=np.int64))
+        parts = [(plant_ids[keep], listed[keep], lowest[keep])]
+        for chunk, marks in _in_chunks(rewritten):
+            parts.append(_read_bars(conn, SELECT_SOME_FLOORS.format(marks=marks), chunk))
+        plant_ids, listed, lowest = (np.concatenate(columns) for columns in zip(*parts))
+        order = np.argsort(plant_ids, kind="stable")
+        _bars.update(version=update.version, bars=(plant_ids[order], listed[order], lowest[order]))
+
+
+# Function: init
+# Purpose: Create the tables (marked stale until the first rebuild, db.sync_similar_plants)
+# Inputs: conn (sqlite3 connection inside a write transaction)
+# Control structures:
+#   - Selection: state table from before versioned syncs → its lists were kept current
+#     inside every write, so they reflect the current catalogue version
+
+
+def init(conn):
+    conn.execute(CREATE_TABLE.format(table="similar_plants"))
+    if not set(INDEX_NAMES) & {row[0] for row in conn.execute(SELECT_INDEXES, ("similar_plants",))}:
+        conn.execute(CREATE_INDEX.format(index=INDEX_NAMES[0], table="similar_plants"))
+    conn.execute(CREATE_STATE)
+    if "version" not in {row[1] for row in conn.execute("PRAGMA table_info(similar_plants_state)")}:
+        conn.execute("ALTER TABLE similar_plants_state ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+        conn.execute("ALTER TABLE similar_plants_state ADD COLUMN builder TEXT")
+        conn.execute(SET_VERSION, (conn.execute(SELECT_CATALOGUE_STATE).fetchone()[0],))
+    conn.execute(INSERT_STATE)
+
+
+def is_stale(conn):
+    row = conn.execute(SELECT_STATE).fetchone()
+    return row is None or bool(row[0])
+
+
+# Neighbour-list changes computed by prepare from one read, written by apply:
+# base/version (catalogue versions the table reflects before/after), stale (too many
+# changes: mark the table stale instead), gone (ids whose rows are dropped on both
+# sides), replaced (ids whose lists are replaced by `lists`), lists and offers (rows)
+Update = namedtuple("Update", "base version stale gone replaced lists offers")
+
+
+# Function: prepare
+# Purpose: Compute the neighbour changes that bring the table up to the catalogue
+#          version of the caller's read transaction
+# Inputs: conn (sqlite3 connection inside a read transaction)
+# Returns: Update, or None when the table is stale or already current
+# Control structures:
+#   - Sequence: plants changed/removed since the table's version (change log) → plants
+#     that listed them → re-rank the changed plants and those plants → offer each
+#     changed plant to the other plants whose entry bar it clears
+
+
+def prepare(conn):
+    stale, base, _ = conn.execute(SELECT_STATE).fetchone()
+    version = conn.execute(SELECT_CATALOGUE_STATE).fetchone()[0]
+    if stale or base == version:
+        return None
+    changed = {row[0] for row in conn.execute(SELECT_CHANGED_IDS, (base,))}
+    removed = {row[0] for row in conn.execute(SELECT_REMOVED_IDS, (base,))}
+    if len(changed) + len(removed) > INCREMENTAL_MAX:
+        return Update(base, version, True, (), (), (), ())
+
+    gone = changed | removed
+    affected = set()
+    for chunk, marks in _in_chunks(gone):
+        affected.update(row[0] for row in conn.execute(
+            f"SELECT DISTINCT plant_id FROM similar_plants WHERE similar_id IN ({marks})", chunk))
+    affected -= gone
+
+    _, ids, vectors = load(conn)
+    targets = _positions(ids, changed | affected)
+    lists = []
+    for rows in _chunks(targets, len(ids)):
+        ranked = _top(vectors[rows], vectors, SIMILAR_COUNT + 1)
+        lists.extend(
+            (int(ids[row]), int(ids[other]), _score(score))
+            for row, neighbours in zip(rows, ranked)
+            for other, score in [n for n in neighbours if n[0] != row][:SIMILAR_COUNT]
+        )
+
+    offers = []
+    added = _positions(ids, changed)
+    if added:
+        plant_ids, lengths, lowest = _entry_bars(conn, base)
+        rows = np.minimum(np.searchsorted(ids, plant_ids), len(ids) - 1)
+        found = ids[rows] == plant_ids  # lists of removed plants are dropped by apply
+        listed = np.zeros(len(ids), dtype=np.int64)
+        floor = np.zeros(len(ids), dtype=np.int64)
+        listed[rows[found]] = lengths[found]
+        floor[rows[found]] = lowest[found]
+        floor[listed < SIMILAR_COUNT] = 1  # short lists take any plant with some overlap
+        floor[targets] = np.iinfo(np.int64).max  # already ranked against the current catalogue
+        for rows in _chunks(added, len(ids)):
+            _, scores = _ranking_keys(vectors[rows], vectors)
+            for row, row_scores in zip(rows, scores):
+                # ties with the lowest entry are offered too; the trim keeps the lower id
+                offers.extend((int(ids[other]), int(ids[row]), _score(row_scores[other]))
+                              for other in np.flatnonzero(row_scores >= floor))
+    return Update(base, version, False, sorted(gone), sorted(gone | affected), lists, offers)
+
+
+# Function: apply
+# Purpose: Write an Update computed by prepare
+# Inputs: conn (sqlite3 connection inside a write transaction), update (Update)
+# Returns: bool, False (nothing written) if the table changed since the update was prepared
+# Control structures:
+#   - Sequence: drop rows of/to the gone plants and the re-ranked lists → insert the
+#     new lists and the offers → trim the offered lists back to SIMILAR_COUNT → version
+#     → cached entry bars patched for the rewritten lists
+
+
+def apply(conn, update):
+    stale, base, _ = conn.execute(SELECT_STATE).fetchone()
+    if stale or base != update.base:
+        return False
+    if update.stale:
+        conn.execute(SET_STALE)
+        return True
+    for chunk, marks in _in_chunks(update.gone):
+        conn.execute(f"DELETE FROM similar_plants WHERE similar_id IN ({marks})", chunk)
+    for chunk, marks in _in_chunks(update.replaced):
+        conn.execute(f"DELETE FROM similar_plants WHERE plant_id IN ({marks})", chunk)
+    conn.executemany(INSERT_SIMILAR, update.lists)
+    conn.executemany(INSERT_SIMILAR, update.offers)
+    offered = sorted({offer[0] for offer in update.offers})
+    conn.executemany(TRIM_SIMILAR, ({"plant": plant_id, "count": SIMILAR_COUNT} for plant_id in offered))
+    conn.execute(SET_VERSION, (update.version,))
+    _patch_entry_bars(conn, update, sorted(set(update.replaced).union(offered)))
+    return True
+
+
+# Function: rebuild_batches
+# Purpose: Every plant's neighbours, computed from an encoded catalogue (no database access)
+# Inputs: ids, vectors (as returned by load)
+# Returns: generator of list[(plant_id, similar_id, score)], about REBUILD_BATCH_ROWS rows each
+# Control structures:
+#   - Iteration: distinct signatures ranked in chunks; each plant takes its signature's
+#     top SIMILAR_COUNT + 1 minus itself
+# Data structures:
+#   - inverse (plant row -> signature), members (signature -> plant rows)
+
+
+def rebuild_batches(ids, vectors):
+    if not len(ids):
+        return
+    signatures, inverse = np.unique(vectors, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    order = np.argsort(inverse, kind="stable")
+    members = np.split(order, np.flatnonzero(np.diff(inverse[order])) + 1)
+    batch = []
+    for chunk in _chunks(np.arange(len(signatures)), len(ids)):
+        ranked = _top(signatures[chunk], vectors, SIMILAR_COUNT + 1)
+        batch.extend(
+            (int(ids[row]), int(ids[other]), _score(score))
+            for signature, neighbours in zip(chunk, ranked)
+            for row in members[signature]
+            for other, score in [n for n in neighbours if n[0] != row][:SIMILAR_COUNT]
+        )
+        if len(batch) >= REBUILD_BATCH_ROWS:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# Function: start_rebuild / write_rebuild / finish_rebuild
+# Purpose: Fill similar_plants_next over several write transactions, then swap it in
+# Inputs: conn (sqlite3 connection inside a write transaction), builder (str token of
+#         this rebuild), rows (list of rows), version (catalogue version the rows reflect)
+# Returns: bool (write/finish), False if a later rebuild has taken over the table
+# Notes:
+#   - The swap drops similar_plants and renames similar_plants_next over it; plants
+#     changed since `version` are then synced incrementally (db.sync_similar_plants)
+
+
+def start_rebuild(conn, builder):
+    conn.execute(SET_BUILDER, (builder,))
+    conn.execute("DROP TABLE IF EXISTS similar_plants_next")
+    live = {row[0] for row in conn.execute(SELECT_INDEXES, ("similar_plants",))}
+    conn.execute(CREATE_TABLE.format(table="similar_plants_next"))
+    index = INDEX_NAMES[1] if INDEX_NAMES[0] in live else INDEX_NAMES[0]
+    conn.execute(CREATE_INDEX.format(index=index, table="similar_plants_next"))
+
+
+def write_rebuild(conn, builder, rows):
+    if conn.execute(SELECT_STATE).fetchone()[2] != builder:
+        return False
+    conn.executemany(INSERT_NEXT, rows)
+    return True
+
+
+def finish_rebuild(conn, builder, version):
+    if conn.execute(SELECT_STATE).fetchone()[2] != builder:
+        return False
+    conn.execute("DROP TABLE similar_plants")
+    conn.execute("ALTER TABLE similar_plants_next RENAME TO similar_plants")
+    conn.execute(FINISH_REBUILD, (version,))
+    return True
@@ -0,0 +1,165 @@
+# Module: snapshot
+# Purpose: Compact, memory-mappable columnar snapshot files
+# Features:
+#   - One file holds a JSON header, fixed-width NumPy arrays and string columns
+#     (UTF-8 blob + offsets), every section 8-byte aligned
+#   - Opened with mmap: arrays are zero-copy views of the page cache, so every
+#     worker process on the host shares one physical copy
+#   - Written to a temporary file and published with os.replace, so readers see
+#     either the old file or the complete new one, never a partial write
+#   - The same layout can be built in memory (bytes) when no directory is configured
+# Data structures:
+#   - header dict {"meta": {...}, "arrays": {name: [dtype, shape, offset]},
+#                  "strings": {name: [offsets offset, blob offset, blob length, count]}}
+#   - numpy arrays (read-only views), StringColumn (lazy per-row decode)
+
+import json
+import mmap
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+MAGIC = b"NMSNAP1\0"
+ALIGN = 8
+
+
+def _pad(length):
+    return -length % ALIGN
+
+
+# Class: StringColumn
+# Purpose: Read-only column of strings stored as one UTF-8 blob plus row offsets
+# Data structures:
+#   - numpy int64 offsets (count + 1), numpy uint8 blob; rows decoded on access
+
+
+class StringColumn:
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        return self.blob[self.offsets[index]:self.offsets[index + 1]].tobytes().decode("utf-8")
+
+    def __iter__(self):
+        data = self.blob.tobytes().decode("utf-8") if self.blob.size else ""
+        if data.isascii():  # Selection: byte offsets equal character offsets
+            bounds = self.offsets.tolist()
+            return (data[start:end] for start, end in zip(bounds, bounds[1:]))
+        return (self[i] for i in range(len(self)))
+
+
+# Class: Snapshot
+# Purpose: Parsed view over a snapshot buffer (mmap or bytes)
+# Data structures:
+#   - dict meta; dict name -> numpy array; dict name -> StringColumn
+
+
+class Snapshot:
+    def __init__(self, buffer):
+        self.buffer = buffer
+        view = memoryview(buffer)
+        if bytes(view[:len(MAGIC)]) != MAGIC:
+            raise ValueError("Not a catalogue snapshot file")
+        (header_length,) = struct.unpack_from("<Q", view, len(MAGIC))
+        start = len(MAGIC) + 8
+        header = json.loads(bytes(view[start:start + header_length]))
+        data = start + header_length + _pad(start + header_length)
+        self.meta = header["meta"]
+        self.arrays = {
+            name: np.frombuffer(buffer, dtype=np.dtype(dtype), count=int(np.prod(shape)),
+                                offset=data + offset).reshape(shape)
+            for name, (dtype, shape, offset) in header["arrays"].items()
+        }
+        self.strings = {
+            name: StringColumn(
+                np.frombuffer(buffer, dtype=np.int64, count=count + 1, offset=data + offsets_at),
+                np.frombuffer(buffer, dtype=np.uint8, count=blob_length, offset=data + blob_at),
+            )
+            for name, (offsets_at, blob_at, blob_length, count) in header["strings"].items()
+        }
+
+
+# Function: encode
+# Purpose: Serialise meta, arrays and string columns into the snapshot layout
+# Inputs: meta (JSON-serialisable dict), arrays (dict name -> ndarray),
+#         strings (dict name -> list[str])
+# Returns: iterator of bytes chunks (header first)
+
+
+def encode(meta, arrays, strings):
+    sections = []
+    layout = {"meta": meta, "arrays": {}, "strings": {}}
+    position = 0
+
+    def add(payload):
+        nonlocal position
+        at = position
+        sections.append(payload)
+        sections.append(b"\0" * _pad(len(payload)))
+        position += len(payload) + _pad(len(payload))
+        return at
+
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        layout["arrays"][name] = [array.dtype.str, list(array.shape), add(array.tobytes())]
+    for name, values in strings.items():
+        encoded = [value.encode("utf-8") for value in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        blob = b"".join(encoded)
+        layout["strings"][name] = [add(offsets.tobytes()), add(blob), len(blob), len(encoded)]
+
+    header = json.dumps(layout, separators=(",", ":")).encode("utf-8")
+    prefix = MAGIC + struct.pack("<Q", len(header)) + header
+    yield prefix + b"\0" * _pad(len(prefix))
+    yield from sections
+
+
+# Function: from_bytes
+# Purpose: In-memory snapshot (no file), same layout and accessors
+# Returns: Snapshot
+
+
+def from_bytes(meta, arrays, strings):
+    return Snapshot(b"".join(encode(meta, arrays, strings)))
+
+
+# Function: write
+# Purpose: Atomically publish a snapshot file
+# Inputs: path (str), meta, arrays, strings (see encode)
+# Control structures:
+#   - Sequence: temp file in the same directory → fsync → os.replace
+
+
+def write(path, meta, arrays, strings):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix=".snapshot-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in encode(meta, arrays, strings):
+                f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, 0o644)  # mkstemp creates 0600; workers may run as other users
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+# Function: open_mapped
+# Purpose: Map a snapshot file read-only (pages shared by every process mapping it)
+# Returns: Snapshot
+
+
+def open_mapped(path):
+    with open(path, "rb") as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return Snapshot(buffer)
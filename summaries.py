@@ -0,0 +1,262 @@
+# Module: summaries
+# Purpose: Cached PDF plant care summaries and multi-plant care booklets
+# Features:
+#   - One ReportLab story per plant (same layout as the original /generate_summary)
+#   - LRU cache of rendered PDFs keyed on (plant id, content hash of the row),
+#     so an edited row can never be served a stale document
+#   - Entries for a plant are purged when it is removed from the catalogue
+#   - Booklets for a whole results set, split into volumes rendered in parallel
+#     across a process pool (one PDF when it fits in a single volume, else a ZIP)
+#   - Build times and cache hit/miss counts reported to metrics.py
+#   - Awaitable variant for the ASGI server: the render runs in the process pool while
+#     the event loop keeps serving other connections
+#   - ReportLab is imported on the first render (in whichever process renders), so it
+#     costs nothing at web worker startup
+# Data structures:
+#   - OrderedDict cache key -> (document, size) (LRU order, bounded by total bytes)
+#   - list[dict] plant records; bytes (PDF / ZIP documents)
+
+import hashlib
+import io
+import json
+import multiprocessing
+import threading
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import metrics
+
+# Labelled fields printed under the title, in order
+SUMMARY_FIELDS = (
+    ("Flowering Time", "flowering_time"),
+    ("Height", "height"),
+    ("Ecological Function", "ecological_function"),
+    ("Sunlight", "sunlight"),
+    ("Water Level", "water_level"),
+    ("Salt/Wind Tolerance", "salt_wind_tolerance"),
+    ("Type", "type"),
+    ("Planting Space", "planting_space"),
+)
+
+CACHE_MAX_BYTES = 64 * 1024 * 1024   # rendered PDFs kept in memory per worker
+BOOKLET_VOLUME_SIZE = 100            # plants per booklet volume (one process each)
+BOOKLET_MAX_WORKERS = 4
+
+_styles = None
+
+
+def _get_styles():
+    global _styles
+    if _styles is None:
+        from reportlab.lib.styles import getSampleStyleSheet
+        _styles = getSampleStyleSheet()
+    return _styles
+
+
+# Function: row_hash
+# Purpose: Stable content hash of a plant record (cache key component)
+# Returns: str (hex digest)
+
+
+def row_hash(plant):
+    payload = json.dumps(plant, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
+# Function: plant_story
+# Purpose: ReportLab flowables for one plant's care summary
+# Returns: list of Flowables
+
+
+def plant_story(plant):
+    from reportlab.platypus import Paragraph, Spacer
+
+    styles = _get_styles()
+    story = [
+        Paragraph(f"<b>{plant['common_name']} ({plant['scientific_name']})</b>", styles["Title"]),
+        Spacer(1, 12),
+    ]
+    for label, key in SUMMARY_FIELDS:
+        story.append(Paragraph(f"<b>{label}:</b> {plant[key]}", styles["Normal"]))
+    return story
+
+
+# Function: render_pdf
+# Purpose: Build one PDF document from a list of plants (one page group per plant)
+# Returns: bytes
+
+
+def render_pdf(plants):
+    from reportlab.platypus import PageBreak, SimpleDocTemplate
+
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer)
+    story = []
+    for i, plant in enumerate(plants):
+        if i:
+            story.append(PageBreak())
+        story.extend(plant_story(plant))
+    doc.build(story)
+    return buffer.getvalue()
+
+
+# Class: SummaryCache
+# Purpose: Thread-safe LRU of rendered documents bounded by total size
+# Data structures:
+#   - OrderedDict key -> (value, size in bytes); int running byte total
+#   - key = (kind, tuple of plant ids, content hash)
+
+
+class SummaryCache:
+    def __init__(self, max_bytes=CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, value, size):
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+
+    # Method: discard
+    # Purpose: Drop every entry that contains the given plant id
+
+    def discard(self, plant_id):
+        with self._lock:
+            for key in [k for k in self._entries if plant_id in k[1]]:
+                self._bytes -= self._entries.pop(key)[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "hits": self.hits, "misses": self.misses}
+
+
+_cache = SummaryCache()
+
+
+# Function: get_summary
+# Purpose: Care summary PDF for one plant, rendered at most once per row version
+# Inputs: plant (dict)
+# Returns: bytes
+
+
+def get_summary(plant):
+    key = ("summary", (plant["id"],), row_hash(plant))
+    document = _cache.get(key)
+    if document is None:
+        with metrics.timed(metrics.PDF_SECONDS, "pdf", kind="summary"):
+            document = render_pdf([plant])
+        _cache.put(key, document, len(document))
+    return document
+
+
+# Function: get_summary_async
+# Purpose: get_summary for coroutines (asgi.py): a miss is rendered in the process pool
+#          and awaited, so no thread waits on ReportLab
+# Returns: bytes
+
+
+async def get_summary_async(plant):
+    import asyncio  # only the ASGI server (which has already imported it) calls this
+
+    key = ("summary", (plant["id"],), row_hash(plant))
+    document = _cache.get(key)
+    if document is None:
+        with metrics.timed(metrics.PDF_SECONDS, "pdf", kind="summary"):
+            document = await asyncio.wrap_future(_get_pool().submit(render_pdf, [plant]))
+        _cache.put(key, document, len(document))
+    return document
+
+
+# Function: cache_stats
+# Purpose: Document cache size and hit/miss counts (this process), for /metrics
+# Returns: dict
+
+
+def cache_stats():
+    return _cache.stats()
+
+
+# Function: invalidate
+# Purpose: Purge cached documents after the catalogue changes
+# Inputs: plant_id (int | None) — None clears everything
+
+
+def invalidate(plant_id=None):
+    if plant_id is None:
+        _cache.clear()
+    else:
+        _cache.discard(plant_id)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: worker processes must not inherit the web server's threads/locks
+            _pool = ProcessPoolExecutor(max_workers=BOOKLET_MAX_WORKERS,
+                                        mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+# Function: get_booklet
+# Purpose: Care booklet for a list of plants (e.g. a whole results set)
+# Inputs: plants (list[dict] full plant records, in booklet order)
+# Returns: (bytes, str mimetype, str file extension)
+# Control structures:
+#   - Selection: cache hit → return; single volume → one PDF; else ZIP of volumes
+#   - Iteration: volumes rendered concurrently in the process pool
+# Data structures:
+#   - list[list[dict]] volumes of at most BOOKLET_VOLUME_SIZE plants
+
+
+def get_booklet(plants):
+    key = ("booklet", tuple(p["id"] for p in plants),
+           hashlib.sha256("".join(row_hash(p) for p in plants).encode()).hexdigest())
+    cached = _cache.get(key)
+    if cached is not None:
+        return cached
+
+    volumes = [plants[i:i + BOOKLET_VOLUME_SIZE] for i in range(0, len(plants), BOOKLET_VOLUME_SIZE)]
+    with metrics.timed(metrics.PDF_SECONDS, "pdf", kind="booklet"):
+        documents = list(_get_pool().map(render_pdf, volumes))
+
+        if len(documents) == 1:
+            result = (documents[0], "application/pdf", "pdf")
+        else:
+            archive = io.BytesIO()
+            with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zf:
+                for number, document in enumerate(documents, start=1):
+                    zf.writestr(f"care_booklet_part_{number}.pdf", document)
+            result = (archive.getvalue(), "application/zip", "zip")
+
+    _cache.put(key, result, len(result[0]))
+    return result